@@ -0,0 +1,186 @@
+# affinity_router.py
+"""
+Document affinity front proxy
+
+Each app server process keeps its own in-memory index registry, so a
+question routed to a worker that has never seen the PDF reloads (or
+rebuilds) the index. This proxy sends every request for a document to the
+same backend, picked on a consistent-hash ring (utils/hash_ring.py):
+- Routing key: the X-Document-Id header (uploads), else the rag_doc cookie
+  the apps set after an upload (questions)
+- Requests without a key go to any healthy backend
+- An unreachable backend is skipped (per-backend circuit breaker) and the
+  document fails over to the next backend clockwise; only that backend's
+  documents move
+- Only connect failures fail over: a backend that drops the connection
+  after the request was sent returns 502 (the request is never replayed)
+- GET /router/status shows the ring, backend health and traffic
+
+Every backend must run with the same SECRET_KEY (required). The apps keep
+the current document in a signed session; with per-process random keys a
+request that fails over to another backend loses it.
+
+Usage:
+    SECRET_KEY=<shared> PORT=7861 python app_flask.py   # and PORT=7862, ... for the other backends
+    ROUTING_BACKENDS=http://127.0.0.1:7861,http://127.0.0.1:7862 python affinity_router.py
+    ROUTING_BACKENDS=... gunicorn -w 1 -k gthread --threads 32 -b 0.0.0.0:7860 affinity_router:app
+"""
+
+import logging
+import os
+import random
+import threading
+from collections import Counter
+from typing import Optional
+from urllib.parse import unquote
+
+import requests
+from urllib3.exceptions import ConnectTimeoutError
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+from config.server_config import ROUTING_CONFIG
+from utils.circuit_breaker import CircuitBreaker
+from utils.hash_ring import HashRing, document_key
+
+logger = logging.getLogger(__name__)
+
+# Connection-level headers that must not be forwarded (RFC 7230 §6.1)
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade", "host", "content-length"
+}
+
+app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = 200 * 1024 * 1024  # Same limit as the apps
+
+ring = HashRing(ROUTING_CONFIG["backends"], vnodes=ROUTING_CONFIG["vnodes"])
+breakers = {
+    backend: CircuitBreaker(f"backend {backend}", failure_threshold=1, reset_timeout=2.0, max_reset_timeout=30.0)
+    for backend in ring.nodes
+}
+_http = requests.Session()
+_stats_lock = threading.Lock()
+_routed = Counter()  # Requests sent per backend
+_failovers = Counter()  # Requests sent to a backend other than the key's owner
+
+
+def routing_key() -> Optional[str]:
+    """Document id of the current request, if any."""
+    name = request.headers.get(ROUTING_CONFIG["header"]) or request.cookies.get(ROUTING_CONFIG["cookie"])
+    if not name:
+        return None
+    return document_key(unquote(name)) or None
+
+
+def _candidates(key: Optional[str]) -> list:
+    """Backends to try in order: the key's owner first, then clockwise failover."""
+    if key is None:
+        backends = ring.nodes
+        random.shuffle(backends)
+        return backends
+    return ring.get_nodes(key)
+
+
+def _connect_failed(error: requests.ConnectionError) -> bool:
+    """True if the request never reached the backend (refused, unresolvable, connect timeout)."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    # requests wraps urllib3's MaxRetryError, whose reason is the connect error
+    # (NewConnectionError subclasses ConnectTimeoutError); a dropped connection is a ProtocolError
+    seen = set()
+    pending = [error]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, ConnectTimeoutError):
+            return True
+        if isinstance(current, BaseException):
+            pending.extend(current.args)
+            pending.extend((getattr(current, "reason", None), current.__cause__, current.__context__))
+    return False
+
+
+def _forward(backend: str) -> requests.Response:
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP}
+    forwarded_for = request.headers.get("X-Forwarded-For")
+    headers["X-Forwarded-For"] = f"{forwarded_for}, {request.remote_addr}" if forwarded_for else (request.remote_addr or "")
+    return _http.request(
+        request.method,
+        backend + request.full_path.rstrip("?"),
+        headers=headers,
+        data=request.get_data(),
+        stream=True,
+        allow_redirects=False,
+        timeout=(ROUTING_CONFIG["connect_timeout"], ROUTING_CONFIG["read_timeout"])
+    )
+
+
+@app.route('/router/status')
+def router_status():
+    with _stats_lock:
+        routed, failovers = dict(_routed), dict(_failovers)
+    return jsonify({
+        "backends": [
+            {
+                "url": backend,
+                "routed": routed.get(backend, 0),
+                "failovers_received": failovers.get(backend, 0),
+                "breaker": breakers[backend].get_stats()
+            }
+            for backend in ring.nodes
+        ],
+        "vnodes": ring.vnodes
+    })
+
+
+@app.route('/', defaults={'path': ''}, methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'HEAD', 'OPTIONS'])
+@app.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'HEAD', 'OPTIONS'])
+def proxy(path):
+    key = routing_key()
+    candidates = _candidates(key)
+    if not candidates:
+        return jsonify({'error': 'No backends configured (set ROUTING_BACKENDS)'}), 503
+
+    for position, backend in enumerate(candidates):
+        breaker = breakers[backend]
+        if not breaker.allow():
+            continue
+        try:
+            upstream = _forward(backend)
+        except requests.ConnectionError as e:
+            breaker.record_failure(e)
+            if not _connect_failed(e):
+                # Dropped after the request was sent: the backend may have acted on it, don't replay
+                logger.error(f"❌ Backend {backend} dropped the connection for /{path}: {e}")
+                return jsonify({'error': f'Backend error: {e}'}), 502
+            # Nothing reached the backend, so retrying elsewhere is safe even for POST
+            logger.warning(f"⚠️ Backend {backend} unreachable, failing over: {e}")
+            continue
+        except requests.RequestException as e:
+            # Read timeout or similar: the backend may have acted on it, don't replay
+            breaker.record_success()
+            logger.error(f"❌ Backend {backend} failed for /{path}: {e}")
+            return jsonify({'error': f'Backend error: {e}'}), 502
+        breaker.record_success()
+
+        with _stats_lock:
+            _routed[backend] += 1
+            if key is not None and position > 0:
+                _failovers[backend] += 1
+
+        headers = [(k, v) for k, v in upstream.raw.headers.items() if k.lower() not in HOP_BY_HOP]
+        # Stream the body through (NDJSON batch answers arrive incrementally)
+        body = stream_with_context(upstream.raw.stream(64 * 1024, decode_content=False))
+        response = Response(body, status=upstream.status_code, headers=headers)
+        response.call_on_close(upstream.close)
+        return response
+
+    return jsonify({'error': 'All backends are unavailable'}), 503
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"🎯 Routing {len(ring.nodes)} backends: {', '.join(ring.nodes) or 'none'}")
+    app.run(host='0.0.0.0', port=int(os.getenv('PORT', 7860)), threaded=True)
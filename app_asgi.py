@@ -0,0 +1,223 @@
+# app_asgi.py
+"""
+Async (ASGI) entry point serving the same routes and templates as app_flask.py
+
+Run with:
+    uvicorn app_asgi:app --host 0.0.0.0 --port 7860
+"""
+
+from quart import Quart, Response, render_template, request, jsonify, session
+import json
+import logging
+import os
+import traceback
+from werkzeug.utils import secure_filename
+from utils.tracing import request_trace, span, render_metrics
+from config.server_config import BATCH_CONFIG, ROUTING_CONFIG
+from config.index_config import UPLOAD_INDEX_CONFIG
+from rag_pipeline import (
+    create_vectorstore_from_pdf, evict_index, index_file_path, get_index_status,
+    answer_question_async, answer_questions_batch_async, run_blocking
+)
+import secrets
+
+logger = logging.getLogger(__name__)
+
+app = Quart(__name__)
+# Shared by all workers; a per-process random key breaks sessions across workers
+app.secret_key = os.getenv('SECRET_KEY') or secrets.token_hex(16)
+if not os.getenv('SECRET_KEY') and ROUTING_CONFIG['backends']:
+    # Behind the affinity router a question may reach another backend than its upload did
+    logger.warning("⚠️ SECRET_KEY is not set: sessions signed by one backend are rejected by the others "
+                   "after a failover. Set the same SECRET_KEY on every backend.")
+app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['MAX_CONTENT_LENGTH'] = 200 * 1024 * 1024  # 200MB max file size
+
+# Create uploads folder if it doesn't exist
+os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+@app.route('/')
+async def index():
+    return await render_template('index.html')
+
+@app.route('/upload', methods=['POST'])
+async def upload_file():
+    try:
+        files = await request.files
+        if 'file' not in files:
+            return jsonify({'error': 'No file provided'}), 400
+
+        file = files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+
+        if not file.filename.endswith('.pdf'):
+            return jsonify({'error': 'Invalid file type. Please upload a PDF'}), 400
+
+        filename = secure_filename(file.filename)
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        await file.save(filepath)
+
+        # Delete any old cache for this file to avoid MemoryError
+        evict_index(filepath)
+        cache_file = index_file_path(filepath)
+        if os.path.exists(cache_file):
+            try:
+                os.remove(cache_file)
+            except Exception:
+                pass
+
+        # Create vector store (CPU-bound, off the event loop)
+        vector_store, multi_level_retriever, raptor_tree = await run_blocking(create_vectorstore_from_pdf, filepath, **UPLOAD_INDEX_CONFIG)
+        
+        if vector_store is None:
+            return jsonify({'error': 'Failed to process PDF. The file may be empty or a scanned image.'}), 500
+
+        # Store filepath in session
+        session['current_pdf'] = filepath
+        
+        response = jsonify({
+            'success': True,
+            'message': 'PDF processed and AI indexed successfully',
+            'filename': filename,
+            'index': get_index_status(filepath)
+        })
+        # Lets affinity_router.py keep this session's questions on the worker holding the index
+        response.set_cookie(ROUTING_CONFIG['cookie'], filename, httponly=True, samesite='Lax')
+        return response
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': f'Server error during upload: {str(e)}'}), 500
+
+@app.route('/ask', methods=['POST'])
+async def ask_question_route():
+    try:
+        data = await request.get_json()
+        query = data.get('question', '')
+
+        if not query:
+            return jsonify({'error': 'No question provided'}), 400
+
+        # Optional per-stage timing breakdown in the response
+        want_timings = bool(data.get('timings')) or request.args.get('timings') == '1'
+
+        if 'current_pdf' not in session:
+            return jsonify({'error': 'Please upload a PDF first'}), 400
+
+        with request_trace(want_timings) as timings, span("ask.total"):
+            result = await _answer_for_session(session['current_pdf'], query)
+
+        if result is None:
+            return jsonify({'error': 'Vector store not found. Please re-upload the PDF'}), 400
+
+        # Handle both dict and str return types
+        if isinstance(result, dict):
+            response = {
+                'success': True,
+                'answer': result.get('answer', 'No answer generated.'),
+                'context': result.get('context', ''),
+                'sources': result.get('sources', [])
+            }
+        else:
+            # result is a plain string (e.g. from cache)
+            response = {
+                'success': True,
+                'answer': str(result),
+                'context': '',
+                'sources': []
+            }
+
+        if want_timings:
+            response['timings'] = {stage: round(ms, 3) for stage, ms in timings.items()}
+
+        return jsonify(response)
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+async def _answer_for_session(filepath, query):
+    """Load the session's index and answer; None if the index is missing."""
+    # Load vector store
+    vector_store, multi_level_retriever, raptor_tree = await run_blocking(create_vectorstore_from_pdf, filepath, **UPLOAD_INDEX_CONFIG)
+
+    if not vector_store:
+        return None
+
+    # Get answer — always request dict format
+    return await answer_question_async(
+        vector_store,
+        query,
+        multi_level_retriever=multi_level_retriever,
+        raptor_tree=raptor_tree,
+        return_context=True,
+        return_sources=True
+    )
+
+@app.route('/ask_batch', methods=['POST'])
+async def ask_batch_route():
+    """Answer a list of questions; streams one JSON line per question as it finishes."""
+    try:
+        data = await request.get_json() or {}
+        questions, error = _batch_questions(data)
+        if error:
+            return jsonify({'error': error}), 400
+
+        if 'current_pdf' not in session:
+            return jsonify({'error': 'Please upload a PDF first'}), 400
+
+        vector_store, multi_level_retriever, raptor_tree = await run_blocking(
+            create_vectorstore_from_pdf, session['current_pdf'], **UPLOAD_INDEX_CONFIG
+        )
+        if not vector_store:
+            return jsonify({'error': 'Vector store not found. Please re-upload the PDF'}), 400
+
+        async def lines():
+            async for result in answer_questions_batch_async(
+                vector_store,
+                questions,
+                multi_level_retriever=multi_level_retriever,
+                raptor_tree=raptor_tree,
+                return_sources=True,
+                return_context=bool(data.get('return_context'))
+            ):
+                yield json.dumps(result) + '\n'
+
+        return Response(lines(), mimetype='application/x-ndjson')
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+def _batch_questions(data):
+    """(questions, None) from an /ask_batch body, or (None, error message)."""
+    questions = data.get('questions')
+    if not isinstance(questions, list) or not questions:
+        return None, 'Provide a non-empty "questions" list'
+    if not all(isinstance(q, str) and q.strip() for q in questions):
+        return None, 'Every question must be a non-empty string'
+    if len(questions) > BATCH_CONFIG['max_questions']:
+        return None, f"At most {BATCH_CONFIG['max_questions']} questions per batch"
+    return questions, None
+
+@app.route('/index_status')
+async def index_status():
+    """Which retrieval tiers of the session's index are live (progressive indexing)."""
+    if 'current_pdf' not in session:
+        return jsonify({'error': 'Please upload a PDF first'}), 400
+    # Loading picks up tiers another worker finished since this one last read the index
+    vector_store, _, _ = await run_blocking(
+        create_vectorstore_from_pdf, session['current_pdf'], **UPLOAD_INDEX_CONFIG
+    )
+    if not vector_store:
+        return jsonify({'error': 'Vector store not found. Please re-upload the PDF'}), 400
+    return jsonify(get_index_status(session['current_pdf']))
+
+@app.route('/metrics')
+async def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5000))
+    app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,95 @@
+# ask_batch.py
+"""
+Answer a file of questions against one PDF (nightly/evaluation runs)
+
+Questions are read from a text file (one per line) or a JSONL file (a
+"question" field per line); "-" reads stdin. Results are written as JSON
+lines, in completion order, as soon as each answer is ready.
+
+Usage:
+    python ask_batch.py sample.pdf questions.txt -o answers.jsonl
+    cat questions.jsonl | python ask_batch.py sample.pdf - --concurrency 8 --context
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from config.server_config import BATCH_CONFIG
+
+
+def read_questions(path: str) -> list:
+    """Non-empty questions from a .txt or .jsonl file (or stdin)."""
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with stream:
+        questions = []
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                line = str(json.loads(line).get("question", "")).strip()
+            if line:
+                questions.append(line)
+    return questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", help="PDF to answer from (indexed on first use)")
+    parser.add_argument("questions", help="Questions file (.txt or .jsonl), or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONFIG["llm_concurrency"], help="Concurrent LLM requests")
+    parser.add_argument("--chunk", type=int, default=BATCH_CONFIG["retrieval_chunk"], help="Questions per retrieval pass")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--context", action="store_true", help="Include the prompt context in each result")
+    parser.add_argument("--no-cache", action="store_true", help="Skip the QA cache")
+    args = parser.parse_args()
+
+    questions = read_questions(args.questions)
+    if not questions:
+        parser.error("no questions to answer")
+
+    from rag_pipeline import create_vectorstore_from_pdf, answer_questions_batch
+
+    # Offline run: wait for every tier rather than answering early questions from FAISS only
+    vector_store, multi_level_retriever, raptor_tree = create_vectorstore_from_pdf(args.pdf, progressive=False)
+    if vector_store is None:
+        sys.exit(f"Could not index {args.pdf}")
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start = time.perf_counter()
+    answered = failed = cached = 0
+    with output:
+        for result in answer_questions_batch(
+            vector_store,
+            questions,
+            top_k=args.top_k,
+            return_sources=True,
+            return_context=args.context,
+            use_cache=not args.no_cache,
+            multi_level_retriever=multi_level_retriever,
+            raptor_tree=raptor_tree,
+            llm_concurrency=args.concurrency,
+            retrieval_chunk=args.chunk
+        ):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            if "error" in result:
+                failed += 1
+            else:
+                answered += 1
+                cached += result["cached"]
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"{answered} answered ({cached} cached), {failed} failed in {elapsed:.1f}s "
+        f"({len(questions) / elapsed:.2f} questions/s)",
+        file=sys.stderr
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/affinity_routing.py
+"""
+Index registry hit rate with and without document affinity routing
+
+Simulates W app workers, each with its own IndexRegistry (the real class,
+LRU of --registry-size entries), serving a Zipf-skewed stream of questions
+over D documents:
+- random: any worker takes the request (gunicorn's accept behaviour)
+- ring: the worker owning the document on the HashRing (affinity_router.py)
+A registry miss costs one index load (--load-ms, e.g. unpickling FAISS +
+BM25 + RAPTOR), reported as total load time.
+
+Then measures how many documents change owner when a worker is added or
+removed, for the ring and for plain hash-modulo-N routing.
+
+Usage:
+    python -m benchmarks.affinity_routing
+    python -m benchmarks.affinity_routing --workers 8 --documents 200 --registry-size 8 --requests 50000
+"""
+
+import argparse
+import logging
+import random
+import time
+from bisect import bisect
+from itertools import accumulate
+from typing import Callable, List
+
+from utils.hash_ring import HashRing, _point
+from utils.index_registry import IndexRegistry
+
+
+def zipf_stream(documents: List[str], n: int, s: float, seed: int) -> List[str]:
+    """n document ids drawn with popularity ∝ 1 / rank^s."""
+    rng = random.Random(seed)
+    ranked = documents[:]
+    rng.shuffle(ranked)
+    cumulative = list(accumulate(1.0 / (rank ** s) for rank in range(1, len(ranked) + 1)))
+    total = cumulative[-1]
+    return [ranked[bisect(cumulative, rng.random() * total)] for _ in range(n)]
+
+
+def simulate(stream: List[str], workers: List[str], registry_size: int, route: Callable[[str], str]) -> dict:
+    """Replay a request stream against per-worker registries."""
+    registries = {worker: IndexRegistry(max_entries=registry_size) for worker in workers}
+    for doc in stream:
+        registry = registries[route(doc)]
+        path = f"/indexes/{doc}.pkl"
+        if registry.get(path) is None:
+            registry.put(path, (doc, None, None))
+    hits = sum(r.hits for r in registries.values())
+    misses = sum(r.misses for r in registries.values())
+    return {
+        "hit_rate": hits / len(stream),
+        "loads": misses,
+        # Distinct documents in memory across workers (duplicates waste registry slots)
+        "distinct_resident": len(set().union(*(r._entries for r in registries.values())))
+    }
+
+
+def moved_fraction(documents: List[str], before: Callable[[str], str], after: Callable[[str], str]) -> float:
+    return sum(before(doc) != after(doc) for doc in documents) / len(documents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--documents", type=int, default=100)
+    parser.add_argument("--registry-size", type=int, default=8, help="Indexes kept per worker (INDEX_REGISTRY_SIZE)")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Popularity skew")
+    parser.add_argument("--load-ms", type=float, default=400.0, help="Cost of one index load")
+    parser.add_argument("--vnodes", type=int, default=160)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    logging.getLogger("utils.index_registry").setLevel(logging.WARNING)
+
+    documents = [f"doc_{i:04d}.pdf" for i in range(args.documents)]
+    workers = [f"http://127.0.0.1:{7861 + i}" for i in range(args.workers)]
+    stream = zipf_stream(documents, args.requests, args.zipf, args.seed)
+    ring = HashRing(workers, vnodes=args.vnodes)
+    rng = random.Random(args.seed)
+
+    print(f"{args.workers} workers x {args.registry_size} cached indexes, {args.documents} documents, "
+          f"{args.requests} requests (zipf {args.zipf})\n")
+    print(f"{'routing':<10}{'hit rate':>10}{'loads':>9}{'load time':>12}{'distinct in memory':>20}")
+    for name, route in (
+        ("random", lambda doc: rng.choice(workers)),
+        ("ring", ring.get_node),
+    ):
+        start = time.perf_counter()
+        result = simulate(stream, workers, args.registry_size, route)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10}{result['hit_rate']:>10.1%}{result['loads']:>9}"
+              f"{result['loads'] * args.load_ms / 1000:>11.1f}s{result['distinct_resident']:>20}"
+              f"   (simulated in {elapsed:.2f}s)")
+
+    print(f"\nPer-worker documents on the ring: {list(ring.get_stats(documents).values())}")
+
+    # Rebalancing: documents that change worker on a membership change
+    keys = [f"doc_{i:06d}.pdf" for i in range(20000)]
+    added = f"http://127.0.0.1:{7861 + args.workers}"
+    grown = HashRing(workers + [added], vnodes=args.vnodes)
+    shrunk = HashRing(workers[1:], vnodes=args.vnodes)
+
+    def modulo(nodes):
+        return lambda key: nodes[_point(key) % len(nodes)]
+
+    print(f"\n{'change':<22}{'ring moved':>12}{'modulo moved':>14}{'ideal':>8}")
+    print(f"{'add 1 worker':<22}"
+          f"{moved_fraction(keys, ring.get_node, grown.get_node):>12.1%}"
+          f"{moved_fraction(keys, modulo(workers), modulo(workers + [added])):>14.1%}"
+          f"{1 / (args.workers + 1):>8.1%}")
+    print(f"{'remove 1 worker':<22}"
+          f"{moved_fraction(keys, ring.get_node, shrunk.get_node):>12.1%}"
+          f"{moved_fraction(keys, modulo(workers), modulo(workers[1:])):>14.1%}"
+          f"{1 / args.workers:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# benchmarks/ask_overhead.py
+"""
+/ask CPU overhead outside the LLM call, with and without the chunk analysis
+
+Runs _prepare_context (retrieval, keyword boost, rerank, context, key facts)
+and _finalize_answer's verification for each query on the same FAISS
+index twice: once as indexes built before the analysis existed, once
+with the ingestion-time ChunkAnalysis attached. Also times each scorer alone.
+
+Query embeddings come from a deterministic fake embedder by default so the
+numbers isolate scoring; --real-embeddings uses the configured model.
+
+Usage:
+    python -m benchmarks.ask_overhead --paragraphs 2000 --queries 300
+    python -m benchmarks.ask_overhead --top-k 10 --real-embeddings
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+
+from benchmarks.common import synthetic_texts
+from utils.chunking import chunk_text
+
+
+def build_store(chunks, real_embeddings: bool):
+    from langchain_community.vectorstores.faiss import FAISS
+
+    if real_embeddings:
+        from utils.embedding import get_embedding_model
+        embedding_model = get_embedding_model()
+    else:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        embedding_model = DeterministicFakeEmbedding(size=384)
+    embeddings = embedding_model.embed_documents(chunks)
+    return FAISS.from_embeddings(
+        list(zip(chunks, embeddings)),
+        embedding_model,
+        metadatas=[{"chunk_id": i, "source": "synthetic.pdf"} for i in range(len(chunks))]
+    )
+
+
+def time_ask(rag, vector_store, queries, top_k: int, answer: str) -> list:
+    """Seconds per query for context preparation plus answer verification."""
+    elapsed = []
+    for query in queries:
+        start = time.perf_counter()
+        context, _, _, grounding = rag._prepare_context(
+            vector_store, query, top_k, 1.5, True, None, False, None, False, False
+        )
+        rag.verify_answer(answer, context, query, grounding=grounding)
+        elapsed.append(time.perf_counter() - start)
+    return elapsed
+
+
+def time_scorers(rag, vector_store, analysis, queries, top_k: int, answer: str) -> dict:
+    """Mean milliseconds per call of each scorer, legacy vs indexed."""
+    from langchain_core.documents import Document
+    from retrieval.chunk_analysis import resolve_chunk_ids
+    from retrieval.context_builder import build_context
+
+    docs_by_id = vector_store.docstore._dict
+    all_docs = list(docs_by_id.values())
+    rng = random.Random(0)
+    results = {name: [0.0, 0.0] for name in ("keyword_overlap", "rerank_contexts", "verify_answer", "key_facts")}
+
+    for query in queries:
+        docs = rng.sample(all_docs, top_k * 2)
+        scored = [(doc, rng.random()) for doc in docs]
+        terms = query.lower().split()
+        context = "\n\n".join(doc.page_content for doc in docs[:top_k])
+        ids = resolve_chunk_ids(docs)
+
+        t = time.perf_counter()
+        for doc in docs:
+            len(set(terms).intersection(doc.page_content.lower().split()))
+        results["keyword_overlap"][0] += time.perf_counter() - t
+        t = time.perf_counter()
+        analysis.keyword_overlap(ids, terms)
+        results["keyword_overlap"][1] += time.perf_counter() - t
+
+        t = time.perf_counter()
+        rag.rerank_contexts(query, scored)
+        results["rerank_contexts"][0] += time.perf_counter() - t
+        t = time.perf_counter()
+        rag.rerank_contexts(query, scored, analysis=analysis, chunk_ids=ids)
+        results["rerank_contexts"][1] += time.perf_counter() - t
+
+        t = time.perf_counter()
+        rag.verify_answer(answer, context, query)
+        results["verify_answer"][0] += time.perf_counter() - t
+        t = time.perf_counter()
+        rag.verify_answer(answer, context, query, grounding=(analysis, analysis.vocabulary(ids[:top_k])))
+        results["verify_answer"][1] += time.perf_counter() - t
+
+        plain = [Document(page_content=doc.page_content, metadata=doc.metadata) for doc in docs[:top_k]]
+        t = time.perf_counter()
+        build_context(plain, extract_facts=rag.extract_key_facts, key_facts=True)
+        results["key_facts"][0] += time.perf_counter() - t
+        t = time.perf_counter()
+        build_context(plain, extract_facts=rag.extract_key_facts, key_facts=True, analysis=analysis)
+        results["key_facts"][1] += time.perf_counter() - t
+
+    n = len(queries)
+    return {name: (legacy / n * 1000, indexed / n * 1000) for name, (legacy, indexed) in results.items()}
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--real-embeddings", action="store_true")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    import rag_pipeline as rag
+    from retrieval.chunk_analysis import ChunkAnalysis
+
+    paragraphs = synthetic_texts(args.paragraphs, 40, 160, seed=args.seed)
+    chunks = chunk_text("\n\n".join(paragraphs), chunk_size=800, chunk_overlap=200)
+    vector_store = build_store(chunks, args.real_embeddings)
+
+    start = time.perf_counter()
+    analysis = ChunkAnalysis(chunks)
+    build_seconds = time.perf_counter() - start
+
+    rng = random.Random(args.seed)
+    queries = []
+    for _ in range(args.queries):
+        words = rng.choice(paragraphs).split()
+        queries.append(" ".join(words[:10]).rstrip(".") + "?")
+    answer = " ".join(rng.choice(paragraphs).split()[:60])
+
+    # Warm-up (query embedding LRU, docstore lookups)
+    time_ask(rag, vector_store, queries[:10], args.top_k, answer)
+    legacy = time_ask(rag, vector_store, queries, args.top_k, answer)
+    vector_store.chunk_analysis = analysis
+    time_ask(rag, vector_store, queries[:10], args.top_k, answer)
+    indexed = time_ask(rag, vector_store, queries, args.top_k, answer)
+
+    stats = analysis.get_stats()
+    print(f"{len(chunks)} chunks, vocabulary {stats['vocabulary']}, "
+          f"analysis built in {build_seconds * 1000:.0f} ms, {stats['array_bytes'] / 1024:.0f} KB arrays")
+    print(f"\n/ask overhead excluding the LLM ({args.queries} queries, top-{args.top_k})")
+    print(f"{'':<10} {'mean':>9} {'p50':>9} {'p95':>9}")
+    for name, values in (("legacy", legacy), ("indexed", indexed)):
+        print(f"{name:<10} {statistics.mean(values) * 1000:>7.2f}ms "
+              f"{percentile(values, 0.5) * 1000:>7.2f}ms {percentile(values, 0.95) * 1000:>7.2f}ms")
+
+    print(f"\n{'scorer':<18} {'legacy':>10} {'indexed':>10}")
+    for name, (old, new) in time_scorers(rag, vector_store, analysis, queries, args.top_k, answer).items():
+        print(f"{name:<18} {old:>8.3f}ms {new:>8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/async_load.py
+"""
+/ask load test: sync Flask worker vs async (ASGI) app, with a stubbed LLM
+
+Each client sends one question at a time. The sync case models a single
+gunicorn sync worker (one request at a time); the async case is a single
+event loop with the bounded CPU pool. With LLM latency L, the sync worker
+tops out near 1/L requests/sec while the async app scales with clients.
+
+Usage:
+    python -m benchmarks.async_load --llm-latency 0.5 --requests 64
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.common import install_stub_llm, synthetic_texts
+
+CONCURRENCY_LEVELS = (1, 8, 32)
+
+
+def build_store(n_chunks: int):
+    from langchain_community.vectorstores.faiss import FAISS
+    from utils.embedding import get_embedding_model
+
+    return FAISS.from_texts(synthetic_texts(n_chunks), get_embedding_model())
+
+
+def patch_loader(module, store):
+    module.create_vectorstore_from_pdf = lambda filepath, **kwargs: (store, None, None)
+
+
+def summarize(label, concurrency, latencies, elapsed):
+    p50, p95 = np.percentile(latencies, [50, 95])
+    print(f"{label:<6} clients={concurrency:<3} {len(latencies) / elapsed:>8.2f} req/s "
+          f"p50={p50 * 1000:>7.0f}ms p95={p95 * 1000:>7.0f}ms")
+
+
+def run_sync(app, concurrency: int, n_requests: int):
+    worker_lock = threading.Lock()  # One sync worker handles one request at a time
+
+    def one(i):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['current_pdf'] = "benchmark.pdf"
+        start = time.perf_counter()
+        with worker_lock:
+            response = client.post('/ask', json={"question": f"What is the orbit of planet sync-{concurrency}-{i}?"})
+        assert response.status_code == 200, response.data
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(n_requests)))
+    summarize("sync", concurrency, latencies, time.perf_counter() - start)
+
+
+async def run_async(app, concurrency: int, n_requests: int):
+    client = app.test_client()
+    async with client.session_transaction() as sess:
+        sess['current_pdf'] = "benchmark.pdf"
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post('/ask', json={"question": f"What is the orbit of planet async-{concurrency}-{i}?"})
+            assert response.status_code == 200, await response.get_data()
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one(i) for i in range(n_requests)))
+    summarize("async", concurrency, latencies, time.perf_counter() - start)
+
+
+def run(llm_latency: float, n_requests: int, n_chunks: int):
+    import app_flask
+    import app_asgi
+
+    install_stub_llm(llm_latency)
+    store = build_store(n_chunks)
+    patch_loader(app_flask, store)
+    patch_loader(app_asgi, store)
+
+    print("=" * 80)
+    print(f"/ask LOAD TEST - stub LLM {llm_latency}s, {n_requests} requests per level")
+    print("=" * 80)
+
+    for concurrency in CONCURRENCY_LEVELS:
+        # Questions are unique per run so the QA cache never short-circuits
+        run_sync(app_flask.app, concurrency, min(n_requests, 16))
+        asyncio.run(run_async(app_asgi.app, concurrency, n_requests))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--chunks", type=int, default=200)
+    args = parser.parse_args()
+    run(args.llm_latency, args.requests, args.chunks)
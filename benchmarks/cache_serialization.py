@@ -0,0 +1,100 @@
+# benchmarks/cache_serialization.py
+"""
+Redis value size and round trips: pickle + per-key calls vs the new encoding + bulk calls
+
+Payload sizes are compared per value type. Throughput compares N embedding
+writes/reads one key at a time against mset/mget, against fakeredis by
+default or a real server with --redis-url (where round trips dominate).
+
+Usage:
+    python -m benchmarks.cache_serialization --n 5000
+    python -m benchmarks.cache_serialization --n 5000 --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import math
+import pickle
+import time
+
+import numpy as np
+
+from benchmarks.common import synthetic_texts
+from cache import serialization
+from cache.redis_cache import RedisCache
+
+
+def payload_sizes(dim: int):
+    rng = np.random.default_rng(0)
+    answer = {
+        "answer": " ".join(synthetic_texts(1, 80, 120)),
+        "metadata": {"context_length": 2400, "num_sources": 5, "verification": "✓ Verified"},
+    }
+    values = {
+        "answer": answer,
+        "embedding": rng.standard_normal(dim).astype(np.float32),
+        "embedding (list)": rng.standard_normal(dim).tolist(),
+        "chunks (200)": synthetic_texts(200, 80, 160),
+    }
+
+    print(f"{'value':<18} {'pickle':>10} {'encoded':>10} {'ratio':>8}")
+    for name, value in values.items():
+        legacy = len(pickle.dumps(value))
+        if name == "embedding (list)":
+            # cache_embeddings stores lists as float32 arrays
+            value = np.asarray(value, dtype=np.float32)
+        encoded = len(serialization.dumps(value))
+        print(f"{name:<18} {legacy:>9}B {encoded:>9}B {encoded / legacy:>7.2f}x")
+
+
+def make_client(redis_url: str):
+    if redis_url:
+        import redis
+        return redis.Redis.from_url(redis_url)
+    import fakeredis
+    return fakeredis.FakeRedis()
+
+
+def round_trips(n: int, dim: int, redis_url: str, batch_size: int):
+    client = make_client(redis_url)
+    cache = RedisCache(client=client, pipeline_batch_size=batch_size)
+    texts = [f"chunk {i}" for i in range(n)]
+    matrix = np.random.default_rng(1).standard_normal((n, dim)).astype(np.float32)
+    keys = cache._embedding_keys(texts, "bench")
+
+    client.flushdb()
+    start = time.perf_counter()
+    for key, vector in zip(keys, matrix):
+        client.set(key, pickle.dumps(vector.tolist()), ex=3600)
+    single_set = time.perf_counter() - start
+    start = time.perf_counter()
+    for key in keys:
+        pickle.loads(client.get(key))
+    single_get = time.perf_counter() - start
+
+    client.flushdb()
+    start = time.perf_counter()
+    cache.cache_embeddings_many(texts, matrix, namespace="bench")
+    bulk_set = time.perf_counter() - start
+    start = time.perf_counter()
+    cached = cache.get_embeddings_many(texts, namespace="bench")
+    bulk_get = time.perf_counter() - start
+    assert all(v is not None for v in cached)
+    client.flushdb()
+
+    trips = math.ceil(n / batch_size)
+    print(f"\n{n} embeddings (dim {dim}) on {'Redis ' + redis_url if redis_url else 'fakeredis'}")
+    print(f"{'mode':<26} {'round trips':>12} {'set':>10} {'get':>10}")
+    print(f"{'per-key pickle':<26} {n:>12} {single_set * 1000:>8.0f}ms {single_get * 1000:>8.0f}ms")
+    print(f"{'pipelined float32':<26} {trips:>12} {bulk_set * 1000:>8.0f}ms {bulk_get * 1000:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--redis-url", default="", help="Real Redis (a scratch db; it is flushed)")
+    args = parser.parse_args()
+
+    payload_sizes(args.dim)
+    round_trips(args.n, args.dim, args.redis_url, args.batch_size)
@@ -0,0 +1,92 @@
+# benchmarks/common.py
+"""
+Shared helpers for benchmark scripts
+- Deterministic synthetic text generation
+- Timing and memory helpers
+- A local stand-in for the OpenRouter LLM
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import Callable, List, Tuple
+
+_VOCABULARY = (
+    "planet orbit star galaxy energy gravity light atmosphere surface moon "
+    "system solar mass radius temperature water carbon oxygen pressure layer "
+    "core mantle crust volcano ocean climate season rotation axis distance "
+    "telescope observation theory model data signal wave particle field force"
+).split()
+
+
+def synthetic_texts(
+    n: int,
+    min_words: int = 20,
+    max_words: int = 180,
+    seed: int = 42
+) -> List[str]:
+    """
+    Generate chunk-like texts with a spread of lengths
+
+    Args:
+        n: Number of texts
+        min_words: Shortest text in words
+        max_words: Longest text in words
+        seed: Random seed
+
+    Returns:
+        List of texts
+    """
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        n_words = rng.randint(min_words, max_words)
+        words = [rng.choice(_VOCABULARY) for _ in range(n_words)]
+        sentences = [" ".join(words[i:i + 12]).capitalize() + "." for i in range(0, n_words, 12)]
+        texts.append(" ".join(sentences))
+    return texts
+
+
+def timed(fn: Callable, *args, **kwargs) -> Tuple[object, float]:
+    """Run fn and return (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (Linux /proc, psutil elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 ** 2
+
+
+def stub_llm(latency: float = 0.5, answer: str = "This is a stubbed answer from the benchmark LLM."):
+    """
+    LangChain runnable standing in for ChatOpenAI
+
+    Sleeps for `latency` seconds (time.sleep for invoke, asyncio.sleep for
+    ainvoke) and returns a fixed AIMessage.
+    """
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+
+    def _invoke(prompt):
+        time.sleep(latency)
+        return AIMessage(content=answer)
+
+    async def _ainvoke(prompt):
+        await asyncio.sleep(latency)
+        return AIMessage(content=answer)
+
+    return RunnableLambda(_invoke, afunc=_ainvoke)
+
+
+def install_stub_llm(latency: float = 0.5):
+    """Route every rag_pipeline LLM call to stub_llm."""
+    import rag_pipeline
+    rag_pipeline.get_llm = lambda model_name=None: stub_llm(latency)
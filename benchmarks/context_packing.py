@@ -0,0 +1,86 @@
+# benchmarks/context_packing.py
+"""
+Prompt tokens with and without context packing
+
+Chunks synthetic text like ingestion does (800/200 overlap), retrieves the
+top-k chunks per query with BM25 (no models needed), and builds the prompt
+context both ways:
+- before: every reranked passage plus five key facts (the old prompt)
+- after: retrieval/context_builder.build_context with the given budget
+
+Usage:
+    python -m benchmarks.context_packing --queries 200 --top-k 5 --budget 1500
+    python -m benchmarks.context_packing --top-k 8 --budget 800 --key-facts
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+
+from langchain_core.documents import Document
+
+from benchmarks.common import synthetic_texts
+from rag_pipeline import extract_key_facts
+from retrieval.bm25_retriever import BM25Retriever
+from retrieval.context_builder import build_context
+from utils.chunking import chunk_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--budget", type=int, default=1500)
+    parser.add_argument("--dedup-threshold", type=float, default=0.8)
+    parser.add_argument("--key-facts", action="store_true", help="Keep key facts in the packed prompt")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.getLogger("retrieval.context_builder").setLevel(logging.WARNING)
+
+    paragraphs = synthetic_texts(args.paragraphs, 40, 160, seed=args.seed)
+    chunks = chunk_text("\n\n".join(paragraphs), chunk_size=800, chunk_overlap=200)
+    by_text = {text: i for i, text in enumerate(chunks)}
+    bm25 = BM25Retriever(chunks)
+
+    rng = random.Random(args.seed)
+    before, after, elapsed = [], [], []
+    merged = duplicates = over_budget = 0
+    for _ in range(args.queries):
+        words = rng.choice(paragraphs).split()
+        start = rng.randrange(max(1, len(words) - 8))
+        query = " ".join(words[start:start + 8])
+
+        docs = [
+            Document(page_content=text, metadata={"chunk_id": by_text[text], "source": "synthetic.pdf"})
+            for text, _ in bm25.retrieve(query, top_k=args.top_k)
+        ]
+        t0 = time.perf_counter()
+        packed = build_context(
+            docs, extract_facts=extract_key_facts, token_budget=args.budget,
+            dedup_threshold=args.dedup_threshold, key_facts=args.key_facts
+        )
+        elapsed.append(time.perf_counter() - t0)
+
+        before.append(packed.tokens_before)
+        after.append(packed.tokens_after)
+        merged += packed.merged
+        duplicates += packed.duplicates
+        over_budget += packed.over_budget
+
+    mean_before, mean_after = statistics.mean(before), statistics.mean(after)
+    print(f"{len(chunks)} chunks, {args.queries} queries, top-{args.top_k}, budget {args.budget} tokens")
+    print(f"{'':<16} {'mean':>8} {'p95':>8} {'max':>8}")
+    for name, values in (("tokens before", before), ("tokens after", after)):
+        ordered = sorted(values)
+        print(f"{name:<16} {mean_before if name.endswith('before') else mean_after:>8.0f} "
+              f"{ordered[int(0.95 * (len(ordered) - 1))]:>8} {ordered[-1]:>8}")
+    print(f"\nreduction: {1 - mean_after / mean_before:.1%} "
+          f"(merged {merged}, near-duplicates {duplicates}, over budget {over_budget})")
+    print(f"build_context: {statistics.mean(elapsed) * 1000:.2f} ms mean")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/embedding_throughput.py
+"""
+Embedding throughput benchmark (chunks/sec)
+
+Usage:
+    python -m benchmarks.embedding_throughput --chunks 2000
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from benchmarks.common import synthetic_texts, timed
+from utils.embedding import BatchEmbeddingEngine, get_langchain_embedding_model
+
+
+def run(n_chunks: int):
+    texts = synthetic_texts(n_chunks)
+    cpus = os.cpu_count() or 1
+
+    configs = [
+        # Default-thread configs first: torch thread settings are process-wide
+        ("engine tokens=8192 threads=default", dict(max_tokens_per_batch=8192)),
+        ("engine tokens=16384 threads=default", dict(max_tokens_per_batch=16384)),
+        (f"engine tokens=8192 threads={cpus}", dict(max_tokens_per_batch=8192, num_threads=cpus)),
+        ("engine tokens=4096 threads=1", dict(max_tokens_per_batch=4096, num_threads=1)),
+    ]
+    if cpus >= 4:
+        configs.append((
+            f"engine pool=2x{cpus // 2} threads",
+            dict(max_tokens_per_batch=8192, num_threads=cpus // 2, num_workers=2, min_texts_per_worker=64)
+        ))
+
+    print("=" * 80)
+    print(f"EMBEDDING THROUGHPUT - {n_chunks} chunks")
+    print("=" * 80)
+
+    # Reference: LangChain HuggingFaceEmbeddings, batch_size=32
+    baseline_model = get_langchain_embedding_model(batch_size=32)
+    baseline_model.embed_documents(texts[:32])  # Warm-up
+    baseline, elapsed = timed(baseline_model.embed_documents, texts)
+    baseline = np.asarray(baseline, dtype=np.float32)
+    print(f"{'baseline batch_size=32':<40} {n_chunks / elapsed:>10.1f} chunks/sec")
+
+    for name, kwargs in configs:
+        engine = BatchEmbeddingEngine(**kwargs)
+        engine.encode(texts[:32])  # Warm-up (model load, pool start)
+        vectors, elapsed = timed(engine.encode, texts)
+        engine.close()
+
+        max_diff = float(np.abs(vectors - baseline).max())
+        print(f"{name:<40} {n_chunks / elapsed:>10.1f} chunks/sec  (max |Δ| vs baseline {max_diff:.2e})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000, help="Number of synthetic chunks")
+    args = parser.parse_args()
+    run(args.chunks)
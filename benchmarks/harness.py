@@ -0,0 +1,264 @@
+# benchmarks/harness.py
+"""
+Offline end-to-end benchmark for ingestion and question answering
+
+For each corpus size and retrieval mode (hybrid, multi_level, raptor):
+1. Writes a synthetic PDF and ingests it (chunks/sec, pages/sec, RSS delta)
+2. Reloads the pickled index (load time, index size on disk)
+3. Answers unique questions with a stubbed LLM and the QA cache off,
+   recording end-to-end and per-stage p50/p95/p99 from the request trace
+
+Results are written as JSON to benchmarks/results/<timestamp>-<sha>.json so
+runs can be compared across commits.
+
+Usage:
+    python -m benchmarks.harness --sizes 100,400 --queries 50
+    python -m benchmarks.harness --compare benchmarks/results/old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.common import current_rss_mb, install_stub_llm
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+
+MODES = {
+    "hybrid": {"use_multi_level": False, "use_raptor": False},
+    "multi_level": {"use_multi_level": True, "use_raptor": False},
+    "raptor": {"use_multi_level": False, "use_raptor": True},
+}
+PERCENTILES = (50, 95, 99)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment() -> dict:
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+    for module in ("torch", "faiss", "sentence_transformers"):
+        try:
+            info[module] = __import__(module).__version__
+        except (ImportError, AttributeError):
+            info[module] = None
+    return info
+
+
+def make_questions(paragraphs, n: int, seed: int):
+    """Questions built from words of random paragraphs; unique so no cache can answer them."""
+    rng = random.Random(seed)
+    questions = []
+    for i in range(n):
+        words = rng.choice(paragraphs).split()
+        start = rng.randrange(max(1, len(words) - 6))
+        questions.append(f"What does the document say about {' '.join(words[start:start + 6])}? (q{i})")
+    return questions
+
+
+def summarize(values) -> dict:
+    values = np.asarray(values, dtype=np.float64)
+    result = {"mean": float(values.mean()), "n": int(values.size)}
+    for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        result[f"p{p}"] = float(v)
+    return result
+
+
+def bench_mode(pdf_path: str, paragraphs, n_pages: int, mode: str, n_queries: int, top_k: int, seed: int) -> dict:
+    import rag_pipeline
+    from utils.tracing import request_trace
+
+    flags = MODES[mode]
+
+    # 1. Ingestion
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    with request_trace() as ingest_stages:
+        vector_store, mlr, raptor_tree = rag_pipeline.create_vectorstore_from_pdf(
+            pdf_path, use_cache=False, progressive=False, **flags
+        )
+    ingest_s = time.perf_counter() - start
+    if vector_store is None:
+        raise RuntimeError(f"Ingestion failed for {pdf_path}")
+    n_chunks = vector_store.index.ntotal
+    pickle_path = rag_pipeline.index_file_path(pdf_path)
+
+    # 2. Index load (from the pickle: ingestion left the index in the registry)
+    rag_pipeline.evict_index(pdf_path)
+    start = time.perf_counter()
+    vector_store, mlr, raptor_tree = rag_pipeline.create_vectorstore_from_pdf(pdf_path, use_cache=True, **flags)
+    load_s = time.perf_counter() - start
+
+    # 3. Question answering
+    totals = []
+    stages = {}
+    for query in make_questions(paragraphs, n_queries, seed):
+        start = time.perf_counter()
+        with request_trace() as trace:
+            rag_pipeline.answer_question(
+                vector_store, query, top_k=top_k, use_cache=False,
+                multi_level_retriever=mlr, use_multi_level=flags["use_multi_level"],
+                raptor_tree=raptor_tree, use_raptor=flags["use_raptor"]
+            )
+        totals.append((time.perf_counter() - start) * 1000)
+        for stage, ms in trace.items():
+            stages.setdefault(stage, []).append(ms)
+
+    return {
+        "pages": n_pages,
+        "chunks": n_chunks,
+        "ingest": {
+            "seconds": ingest_s,
+            "chunks_per_sec": n_chunks / ingest_s,
+            "pages_per_sec": n_pages / ingest_s,
+            "stages_ms": dict(ingest_stages),
+        },
+        "index": {
+            "load_seconds": load_s,
+            "pickle_bytes": os.path.getsize(pickle_path) if os.path.exists(pickle_path) else None,
+        },
+        "memory": {"rss_delta_mb": current_rss_mb() - rss_before, "rss_mb": current_rss_mb()},
+        "answer_ms": summarize(totals),
+        "stages_ms": {stage: summarize(values) for stage, values in sorted(stages.items())},
+    }
+
+
+def run(sizes, modes, n_queries: int, top_k: int, llm_latency: float, seed: int) -> dict:
+    install_stub_llm(llm_latency)
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "settings": {"sizes": sizes, "modes": modes, "queries": n_queries, "top_k": top_k,
+                     "llm_latency": llm_latency, "seed": seed},
+        "results": {},
+    }
+
+    # create_vectorstore_from_pdf pickles into the working directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            for size in sizes:
+                for mode in modes:
+                    pdf_path = os.path.join(workdir, f"synthetic-{size}-{mode}.pdf")
+                    paragraphs = write_synthetic_pdf(pdf_path, n_paragraphs=size, seed=seed)
+                    from PyPDF2 import PdfReader
+                    n_pages = len(PdfReader(pdf_path).pages)
+
+                    print(f"▶ size={size} mode={mode}", flush=True)
+                    result = bench_mode(pdf_path, paragraphs, n_pages, mode, n_queries, top_k, seed)
+                    report["results"][f"{mode}/{size}"] = result
+                    print(f"  ingest {result['ingest']['chunks_per_sec']:.1f} chunks/s, "
+                          f"load {result['index']['load_seconds'] * 1000:.1f} ms, "
+                          f"answer p50 {result['answer_ms']['p50']:.1f} ms "
+                          f"p95 {result['answer_ms']['p95']:.1f} ms", flush=True)
+        finally:
+            os.chdir(cwd)
+
+    return report
+
+
+def write_report(report: dict, output_dir: str = RESULTS_DIR) -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(output_dir, f"{stamp}-{report['revision']}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def _flatten(prefix: str, value, out: dict):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, item, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = float(value)
+
+
+def compare(old: dict, new: dict, threshold: float = 0.10) -> int:
+    """
+    Print relative changes between two reports
+
+    Returns:
+        Number of latency/time metrics that got worse by more than threshold
+    """
+    old_flat, new_flat = {}, {}
+    _flatten("", old["results"], old_flat)
+    _flatten("", new["results"], new_flat)
+
+    print(f"\n{old['revision']} → {new['revision']}")
+    regressions = 0
+    for key in sorted(old_flat.keys() & new_flat.keys()):
+        before, after = old_flat[key], new_flat[key]
+        if before == 0:
+            continue
+        change = (after - before) / before
+        # Throughput is better when higher; everything else timed is better when lower
+        higher_is_better = key.endswith("_per_sec")
+        worse = -change if higher_is_better else change
+        timed_metric = higher_is_better or "_ms" in key or "seconds" in key
+        flag = ""
+        if timed_metric and worse > threshold:
+            flag = "  ⚠️ regression"
+            regressions += 1
+        print(f"{key:<70} {before:>12.2f} {after:>12.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,400", help="Comma-separated corpus sizes in paragraphs")
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated subset of " + ",".join(MODES))
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Stub LLM latency in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", metavar="OLD_JSON", help="Compare against a previous report")
+    parser.add_argument("--new", metavar="NEW_JSON", help="With --compare: compare two reports without running")
+    args = parser.parse_args()
+
+    if args.compare and args.new:
+        with open(args.compare) as f_old, open(args.new) as f_new:
+            sys.exit(1 if compare(json.load(f_old), json.load(f_new)) else 0)
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {sorted(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    report = run(sizes, modes, args.queries, args.top_k, args.llm_latency, args.seed)
+    path = write_report(report, args.output_dir)
+    print(f"\n📄 Results written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            sys.exit(1 if compare(json.load(f), report) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/import_time.py
+"""
+Import-time budget for the app entry points
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter,
+reports the cumulative import time and the slowest top-level imports, and
+fails when the total exceeds the budget or a heavy dependency is imported
+eagerly. Heavy dependencies must load at the feature that needs them.
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module app_flask --budget-ms 1500
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = 1500
+
+# Must not be imported by `import rag_pipeline` (or the apps)
+HEAVY_MODULES = (
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "optimum",
+    "llama_index",
+    "umap",
+    "sklearn",
+    "faiss",
+    "langchain_openai",
+    "langchain_community",
+    "redis",
+    "rank_bm25",
+)
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module: str, repeats: int = 3):
+    """
+    Import a module in fresh interpreters and keep the fastest run
+
+    Returns:
+        (total_ms, entries) where entries are (cumulative_us, depth, name)
+    """
+    best = None
+    for _ in range(repeats):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=REPO_ROOT, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+        entries = []
+        for line in proc.stderr.splitlines():
+            match = _LINE.match(line)
+            if match:
+                _, cumulative, indent, name = match.groups()
+                entries.append((int(cumulative), len(indent) // 2, name))
+
+        # Top-level entries (depth 0) add up to the whole import
+        total_ms = sum(us for us, depth, _ in entries if depth == 0) / 1000
+        if best is None or total_ms < best[0]:
+            best = (total_ms, entries)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="rag_pipeline")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15, help="Slowest direct imports to show")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    total_ms, entries = measure(args.module, args.repeats)
+    imported = {name for _, _, name in entries}
+
+    print(f"import {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)\n")
+    print(f"Slowest imports made directly by {args.module}:")
+    for us, _, name in sorted((e for e in entries if e[1] == 1), reverse=True)[:args.top]:
+        print(f"  {us / 1000:>8.1f} ms  {name}")
+
+    eager = [m for m in HEAVY_MODULES if m in imported]
+    failed = False
+    if eager:
+        print(f"\n❌ Heavy modules imported eagerly: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"\n❌ Import time {total_ms:.0f} ms is over budget ({args.budget_ms:.0f} ms)")
+        failed = True
+    if not failed:
+        print("\n✅ Within budget")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
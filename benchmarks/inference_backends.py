@@ -0,0 +1,178 @@
+# benchmarks/inference_backends.py
+"""
+Parity, latency and memory check for CPU inference backends
+
+Every backend is compared against fp32 torch:
+- Embeddings: per-text cosine similarity and top-k neighbour overlap
+- Reranker: top-1 agreement and pairwise ranking agreement per query
+- Summarizer: latency per cluster (and summary similarity)
+
+Exits non-zero if a backend falls below the parity thresholds, or fell
+back to torch because it could not be loaded (its row would otherwise
+just repeat the torch numbers).
+
+Usage:
+    python -m benchmarks.inference_backends --backends int8 onnx
+"""
+
+import argparse
+import sys
+import time
+from itertools import combinations
+
+import numpy as np
+
+from benchmarks.common import current_rss_mb, synthetic_texts, timed
+from utils.embedding import BatchEmbeddingEngine
+from utils.inference_backend import loaded_backend
+from retrieval.reranker import CrossEncoderReranker
+from raptor.summarizer import RAPTORSummarizer
+
+MIN_COSINE = 0.98
+MIN_TOPK_OVERLAP = 0.8
+MIN_PAIRWISE_AGREEMENT = 0.9
+
+
+def pairwise_agreement(a: np.ndarray, b: np.ndarray) -> float:
+    """Fraction of item pairs ordered the same way by both score vectors."""
+    pairs = list(combinations(range(len(a)), 2))
+    if not pairs:
+        return 1.0
+    same = sum(1 for i, j in pairs if np.sign(a[i] - a[j]) == np.sign(b[i] - b[j]))
+    return same / len(pairs)
+
+
+def backend_check(model_name: str, backend: str) -> dict:
+    """Row fields recording the backend a model loaded with; a fallback fails the row."""
+    actual = loaded_backend(model_name, backend)
+    if actual == backend:
+        return {"backend": backend}
+    return {"backend": f"fell back to {actual}" if actual else "not loaded", "ok": False}
+
+
+def bench_embeddings(backend, texts, queries, reference, top_k=10):
+    rss_before = current_rss_mb()
+    engine = BatchEmbeddingEngine(backend=backend)
+    engine.encode(texts[:8])  # Load + warm-up
+    rss_delta = current_rss_mb() - rss_before
+
+    vectors, elapsed = timed(engine.encode, texts)
+    query_vectors = engine.encode(queries)
+
+    cosine = np.sum(vectors * reference["docs"], axis=1)
+
+    overlaps = []
+    for q_ref, q_new in zip(reference["queries"], query_vectors):
+        top_ref = set(np.argsort(-(reference["docs"] @ q_ref))[:top_k])
+        top_new = set(np.argsort(-(vectors @ q_new))[:top_k])
+        overlaps.append(len(top_ref & top_new) / top_k)
+
+    result = {
+        "chunks_per_sec": len(texts) / elapsed,
+        "rss_mb": rss_delta,
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        f"overlap@{top_k}": float(np.mean(overlaps)),
+        "ok": cosine.min() >= MIN_COSINE and np.mean(overlaps) >= MIN_TOPK_OVERLAP,
+    }
+    result.update(backend_check(engine.model_name, backend))
+    return result
+
+
+def bench_reranker(backend, queries, candidates, reference):
+    rss_before = current_rss_mb()
+    reranker = CrossEncoderReranker(backend=backend)
+    reranker.model.predict([[queries[0], candidates[0]]])  # Warm-up
+    rss_delta = current_rss_mb() - rss_before
+
+    latencies, top1, agreement, all_scores = [], [], [], []
+    for query, ref_scores in zip(queries, reference or [None] * len(queries)):
+        start = time.perf_counter()
+        scores = np.asarray(reranker.model.predict([[query, doc] for doc in candidates]))
+        latencies.append(time.perf_counter() - start)
+        all_scores.append(scores)
+        if ref_scores is not None:
+            top1.append(int(np.argmax(scores) == np.argmax(ref_scores)))
+            agreement.append(pairwise_agreement(scores, ref_scores))
+
+    result = {
+        "p50_ms_per_query": float(np.percentile(latencies, 50) * 1000),
+        "rss_mb": rss_delta,
+        "scores": all_scores,
+    }
+    if reference:
+        result.update(
+            top1_agreement=float(np.mean(top1)),
+            pairwise_agreement=float(np.mean(agreement)),
+            ok=np.mean(agreement) >= MIN_PAIRWISE_AGREEMENT,
+        )
+    result.update(backend_check(reranker.model_name, backend))
+    return result
+
+
+def bench_summarizer(backend, clusters, embedder, reference):
+    rss_before = current_rss_mb()
+    summarizer = RAPTORSummarizer(backend=backend)
+    rss_delta = current_rss_mb() - rss_before
+
+    summaries, elapsed = timed(lambda: [summarizer.summarize_cluster(c, i) for i, c in enumerate(clusters)])
+    result = {"sec_per_cluster": elapsed / len(clusters), "rss_mb": rss_delta, "summaries": summaries}
+    if reference:
+        similarity = np.sum(embedder.encode(summaries) * embedder.encode(reference), axis=1)
+        result["mean_summary_cosine"] = float(similarity.mean())
+    result.update(backend_check(summarizer.model_name, backend))
+    return result
+
+
+def report(title, results):
+    print(f"\n{title}")
+    for backend, metrics in results.items():
+        shown = {k: (round(v, 4) if isinstance(v, float) else v) for k, v in metrics.items()
+                 if k not in ("scores", "summaries")}
+        print(f"  {backend:<6} {shown}")
+
+
+def run(backends, n_chunks, n_queries, skip_summarizer):
+    texts = synthetic_texts(n_chunks, seed=1)
+    queries = synthetic_texts(n_queries, min_words=5, max_words=12, seed=2)
+    candidates = texts[:20]
+    failed = False
+
+    # Embeddings
+    rss_before = current_rss_mb()
+    fp32 = BatchEmbeddingEngine(backend="torch")
+    reference = {"docs": fp32.encode(texts), "queries": fp32.encode(queries)}
+    fp32_rss = current_rss_mb() - rss_before
+    results = {b: bench_embeddings(b, texts, queries, reference) for b in ["torch"] + backends}
+    results["torch"]["rss_mb"] = fp32_rss  # Already loaded for the reference
+    report("EMBEDDINGS (all-MiniLM-L6-v2)", results)
+    failed |= not all(r["ok"] for r in results.values())
+
+    # Reranker
+    results = {"torch": bench_reranker("torch", queries, candidates, None)}
+    for b in backends:
+        results[b] = bench_reranker(b, queries, candidates, results["torch"]["scores"])
+    report("RERANKER (ms-marco-MiniLM-L-6-v2, 20 candidates/query)", results)
+    failed |= not all(r.get("ok", True) for r in results.values())
+
+    # Summarizer
+    if not skip_summarizer:
+        clusters = [texts[i:i + 5] for i in range(0, 20, 5)]
+        results = {"torch": bench_summarizer("torch", clusters, fp32, None)}
+        for b in backends:
+            results[b] = bench_summarizer(b, clusters, fp32, results["torch"]["summaries"])
+        report("SUMMARIZER (flan-t5-base)", results)
+        failed |= not all(r.get("ok", True) for r in results.values())
+
+    print("\nPARITY:", "FAILED" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["int8", "onnx"], choices=["int8", "onnx"])
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--skip-summarizer", action="store_true")
+    args = parser.parse_args()
+    sys.exit(run(args.backends, args.chunks, args.queries, args.skip_summarizer))
@@ -0,0 +1,79 @@
+# benchmarks/micro_batching.py
+"""
+Micro-batching benchmark at 1, 8 and 32 concurrent clients
+
+Each client repeatedly embeds a query and reranks 10 candidate passages,
+the per-request model work of /ask. Runs once with direct model calls
+and once through the shared micro-batchers.
+
+Usage:
+    python -m benchmarks.micro_batching --requests 256 --max-wait-ms 5
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.common import synthetic_texts
+from config.server_config import MICRO_BATCH_CONFIG
+from retrieval.reranker import CrossEncoderReranker
+from utils.embedding import get_embedding_model, with_micro_batching
+from utils.micro_batcher import get_all_batcher_stats
+
+CONCURRENCY_LEVELS = (1, 8, 32)
+
+
+def run_level(embedder, reranker, queries, passages, concurrency):
+    def one(i):
+        query = queries[i % len(queries)]
+        start = time.perf_counter()
+        embedder.embed_query(query)
+        reranker.rerank(query, passages[i % 10:i % 10 + 10], top_k=5)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(len(queries))))
+    elapsed = time.perf_counter() - start
+
+    p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+    return len(queries) / elapsed, p50, p95
+
+
+def run(n_requests: int, max_wait_ms: float, max_batch_size: int):
+    MICRO_BATCH_CONFIG.update(max_wait_ms=max_wait_ms, max_batch_size=max_batch_size)
+
+    queries = synthetic_texts(n_requests, min_words=5, max_words=15, seed=3)
+    passages = synthetic_texts(20, seed=4)
+
+    base = get_embedding_model()
+    reranker = CrossEncoderReranker()
+    base.embed_query("warm-up")
+    reranker.rerank("warm-up", passages[:2])
+
+    print("=" * 80)
+    print(f"MICRO-BATCHING - {n_requests} requests, max_wait={max_wait_ms}ms, max_batch={max_batch_size}")
+    print("=" * 80)
+    print(f"{'mode':<10} {'clients':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+
+    for concurrency in CONCURRENCY_LEVELS:
+        for mode in ("direct", "batched"):
+            MICRO_BATCH_CONFIG["enabled"] = mode == "batched"
+            embedder = with_micro_batching(base) if mode == "batched" else base
+            throughput, p50, p95 = run_level(embedder, reranker, queries, passages, concurrency)
+            print(f"{mode:<10} {concurrency:>7} {throughput:>9.1f} {p50:>9.1f} {p95:>9.1f}")
+
+    print("\nBatcher stats (all batched runs):")
+    for stats in get_all_batcher_stats():
+        print(f"  {stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=MICRO_BATCH_CONFIG["max_wait_ms"])
+    parser.add_argument("--max-batch-size", type=int, default=MICRO_BATCH_CONFIG["max_batch_size"])
+    args = parser.parse_args()
+    run(args.requests, args.max_wait_ms, args.max_batch_size)
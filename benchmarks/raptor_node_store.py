@@ -0,0 +1,172 @@
+# benchmarks/raptor_node_store.py
+"""
+RAPTOR node storage: list of RAPTORNode objects vs the columnar NodeStore
+
+Builds the same synthetic tree (--leaves chunks, levels of --branching
+children per summary) in both layouts and reports:
+- Python heap held by a tree loaded from its pickle, as a worker holds it
+  (tracemalloc, numpy buffers included)
+- Pickle size, dump and load time (the index pickle is dominated by the
+  tree for large documents)
+- Collapsed-tree scoring of one query (gather + cosine over every level)
+- Reading every node's text through the node API (the compatibility path)
+
+Usage:
+    python -m benchmarks.raptor_node_store
+    python -m benchmarks.raptor_node_store --leaves 50000 --dim 384 --repeats 5
+"""
+
+import argparse
+import gc
+import pickle
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.common import synthetic_texts
+from raptor.node_store import NodeStore
+from raptor.raptor_tree import RAPTORNode
+
+TreeLevels = List[Tuple[List[str], np.ndarray, List[List[int]]]]
+
+
+def synthetic_levels(leaves: int, branching: int, dim: int, dtype, seed: int) -> TreeLevels:
+    """(texts, embeddings, children) per level, leaves first."""
+    rng = np.random.default_rng(seed)
+    texts = synthetic_texts(leaves, 60, 180, seed=seed)
+    levels = [(texts, rng.standard_normal((leaves, dim)).astype(dtype), [[] for _ in range(leaves)])]
+    start, count = 0, leaves
+    while count > branching:
+        parents = -(-count // branching)
+        children = [list(range(start + p * branching, start + min((p + 1) * branching, count))) for p in range(parents)]
+        summaries = synthetic_texts(parents, 40, 90, seed=seed + len(levels))
+        levels.append((summaries, rng.standard_normal((parents, dim)).astype(dtype), children))
+        start, count = start + count, parents
+    return levels
+
+
+def build_legacy(levels: TreeLevels) -> Tuple[List[RAPTORNode], Dict[int, List[int]]]:
+    nodes, level_indices = [], {}
+    for level, (texts, embeddings, children) in enumerate(levels):
+        start = len(nodes)
+        for i, text in enumerate(texts):
+            nodes.append(RAPTORNode(
+                text=text,
+                # The tree stored each node's own row, not a view of a shared matrix
+                embedding=embeddings[i].copy(),
+                level=level,
+                children=list(children[i]),
+                cluster_id=i,
+                is_summary=level > 0
+            ))
+        level_indices[level] = list(range(start, len(nodes)))
+    return nodes, level_indices
+
+
+def build_columnar(levels: TreeLevels, dtype) -> Tuple[NodeStore, Dict[int, range]]:
+    store, level_indices = NodeStore(dtype), {}
+    for level, (texts, embeddings, children) in enumerate(levels):
+        level_indices[level] = store.append_level(
+            texts, embeddings, level, children, cluster_ids=range(len(texts))
+        )
+    return store, level_indices
+
+
+def heap_bytes(payload: bytes):
+    """Unpickle a structure and return (structure, bytes it holds on the Python heap)."""
+    gc.collect()
+    tracemalloc.start()
+    structure = pickle.loads(payload)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, current
+
+
+def median_time(fn: Callable, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def score_legacy(nodes, level_indices, query) -> List[Tuple[int, float]]:
+    results = []
+    for node_indices in level_indices.values():
+        matrix = np.asarray([nodes[i].embedding for i in node_indices], dtype=np.float32)
+        similarities = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+        results.extend(zip(node_indices, similarities.tolist()))
+    results.sort(key=lambda x: x[1], reverse=True)
+    return results[:10]
+
+
+def score_columnar(store, level_indices, query) -> List[Tuple[int, float]]:
+    results = []
+    for node_indices in level_indices.values():
+        matrix = store.matrix(node_indices).astype(np.float32, copy=False)
+        similarities = matrix @ query / (store.norms(node_indices) * np.linalg.norm(query))
+        results.extend(zip(node_indices, similarities.tolist()))
+    results.sort(key=lambda x: x[1], reverse=True)
+    return results[:10]
+
+
+def measure(name: str, build: Callable, score: Callable, query: np.ndarray, repeats: int) -> Dict:
+    payload = pickle.dumps(build(), protocol=pickle.HIGHEST_PROTOCOL)
+    (nodes, level_indices), heap = heap_bytes(payload)
+    score(nodes, level_indices, query)  # Warm the store's norm cache, as a served tree would be
+    return {
+        "name": name,
+        "nodes": len(nodes),
+        "heap_mb": heap / 1024 ** 2,
+        "pickle_mb": len(payload) / 1024 ** 2,
+        "dump_s": median_time(lambda: pickle.dumps((nodes, level_indices), protocol=pickle.HIGHEST_PROTOCOL), repeats),
+        "load_s": median_time(lambda: pickle.loads(payload), repeats),
+        "score_ms": median_time(lambda: score(nodes, level_indices, query), repeats) * 1000,
+        "texts_ms": median_time(lambda: [node.text for node in nodes], repeats) * 1000,
+        "top": [i for i, _ in score(nodes, level_indices, query)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leaves", type=int, default=50000)
+    parser.add_argument("--branching", type=int, default=6, help="Children per summary node")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--dtype", default="float32", choices=("float32", "float16"))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    dtype = np.dtype(args.dtype)
+    levels = synthetic_levels(args.leaves, args.branching, args.dim, dtype, args.seed)
+    query = np.random.default_rng(args.seed + 1).standard_normal(args.dim).astype(np.float32)
+    print(f"Tree: {sum(len(t) for t, _, _ in levels)} nodes over {len(levels)} levels, dim={args.dim}, {args.dtype}")
+
+    results = [
+        measure("list[RAPTORNode]", lambda: build_legacy(levels), score_legacy, query, args.repeats),
+        measure("NodeStore", lambda: build_columnar(levels, dtype), score_columnar, query, args.repeats),
+    ]
+    if results[0]["top"] != results[1]["top"]:
+        print("⚠️ Layouts returned different top nodes")
+
+    print(f"\n{'layout':<18}{'heap':>10}{'pickle':>10}{'dump':>9}{'load':>9}{'score':>10}{'texts':>10}")
+    for r in results:
+        print(
+            f"{r['name']:<18}{r['heap_mb']:>8.1f}MB{r['pickle_mb']:>8.1f}MB{r['dump_s'] * 1000:>7.0f}ms"
+            f"{r['load_s'] * 1000:>7.0f}ms{r['score_ms']:>8.1f}ms{r['texts_ms']:>8.1f}ms"
+        )
+    legacy, columnar = results
+    print(
+        f"\nNodeStore: {legacy['heap_mb'] / columnar['heap_mb']:.1f}x less heap, "
+        f"{legacy['load_s'] / columnar['load_s']:.1f}x faster load, "
+        f"{legacy['score_ms'] / columnar['score_ms']:.1f}x faster scoring"
+    )
+
+
+if __name__ == "__main__":
+    main()
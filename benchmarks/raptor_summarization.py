@@ -0,0 +1,137 @@
+# benchmarks/raptor_summarization.py
+"""
+RAPTOR tree build time and retrieval quality: abstractive vs extractive summaries
+
+For each summarization mode, ingests the same PDF(s) with a RAPTOR tree
+(synchronously, no cached index) and reports:
+- RAPTOR build time, split into clustering, summarization and embedding
+- Summary nodes and mean summary length
+- recall@k / MRR of the raptor_collapsed mode on the evaluation set
+  (raptor_leaf only searches chunks, so it is the same for both modes)
+
+Usage:
+    python -m benchmarks.raptor_summarization --synthetic 300 --questions 60
+    python -m benchmarks.raptor_summarization --dataset eval.jsonl
+    python -m benchmarks.raptor_summarization --synthetic 300 --fake-embeddings  # timing only
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.common import install_stub_llm
+from evaluation.retrieval_eval import (
+    DEFAULT_K_VALUES, EvalExample, evaluate_document, load_eval_set, summarize_results, synthetic_eval_set
+)
+from utils.tracing import request_trace
+
+SUMMARIZATION_MODES = ("abstractive", "extractive")
+EVAL_MODES = ("raptor_collapsed",)
+
+
+def run_mode(examples: List[EvalExample], mode: str, index_dir: str, k_values) -> Dict:
+    """Build every document's tree with one summarization mode and score it."""
+    import rag_pipeline
+
+    by_document: Dict[str, List[EvalExample]] = {}
+    for example in examples:
+        by_document.setdefault(example.document, []).append(example)
+
+    stages: Dict[str, float] = {}
+    per_document = []
+    summary_lengths = []
+    summary_nodes = 0
+    generator_loaded = True
+    for document, doc_examples in by_document.items():
+        with request_trace() as trace:
+            vector_store, _, raptor_tree = rag_pipeline.create_vectorstore_from_pdf(
+                document,
+                use_cache=False,
+                use_raptor=True,
+                raptor_summarization=mode,
+                index_dir=index_dir,
+                progressive=False
+            )
+        if vector_store is None or raptor_tree is None:
+            raise RuntimeError(f"RAPTOR build failed for {document}")
+        for stage, ms in trace.items():
+            stages[stage] = stages.get(stage, 0.0) + ms
+        summaries = [node.text for node in raptor_tree.nodes if node.is_summary]
+        summary_nodes += len(summaries)
+        summary_lengths.extend(len(text) for text in summaries)
+        generator_loaded &= getattr(raptor_tree.summarizer, "summarizer", True) is not None
+        per_document.append(evaluate_document(
+            vector_store, doc_examples, EVAL_MODES, k_values, raptor_tree=raptor_tree
+        ))
+
+    return {
+        "build_s": stages.get("ingest.raptor", 0.0) / 1000,
+        "cluster_s": stages.get("raptor.cluster", 0.0) / 1000,
+        "summarize_s": stages.get("raptor.summarize", 0.0) / 1000,
+        "embed_s": stages.get("raptor.embed", 0.0) / 1000,
+        "summary_nodes": summary_nodes,
+        "mean_summary_chars": float(np.mean(summary_lengths)) if summary_lengths else 0.0,
+        "quality": summarize_results(per_document),
+        "generator_loaded": generator_loaded,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dataset", help="JSONL evaluation set (see evaluation/retrieval_eval.py)")
+    source.add_argument("--synthetic", type=int, metavar="PARAGRAPHS", help="Generate a synthetic PDF of this size")
+    parser.add_argument("--questions", type=int, default=50, help="Questions for --synthetic")
+    parser.add_argument("--modes", default=",".join(SUMMARIZATION_MODES))
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="Deterministic fake embeddings: build timing only, recall is meaningless")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    import rag_pipeline
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        rag_pipeline.get_embedding_model = lambda: DeterministicFakeEmbedding(size=384)
+    install_stub_llm(0.0)
+    k_values = DEFAULT_K_VALUES
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="raptor-summaries-") as workdir:
+        if args.dataset:
+            examples = load_eval_set(args.dataset)
+        else:
+            from benchmarks.synthetic_pdf import write_synthetic_pdf
+            pdf_path = os.path.join(workdir, f"synthetic-{args.synthetic}.pdf")
+            paragraphs = write_synthetic_pdf(pdf_path, n_paragraphs=args.synthetic, seed=args.seed)
+            examples = synthetic_eval_set(pdf_path, paragraphs, args.questions, args.seed)
+
+        results = {}
+        for mode in modes:
+            start = time.perf_counter()
+            results[mode] = run_mode(examples, mode, os.path.join(workdir, mode), k_values)
+            print(f"{mode}: done in {time.perf_counter() - start:.1f}s")
+
+    print(f"\n{'mode':<13}{'build':>9}{'cluster':>9}{'summarize':>11}{'embed':>8}{'nodes':>7}{'chars':>7}"
+          + "".join(f"{f'recall@{k}':>10}" for k in k_values) + f"{'mrr':>8}")
+    for mode, result in results.items():
+        metrics = result["quality"].get(EVAL_MODES[0], {}).get("metrics", {})
+        print(
+            f"{mode:<13}{result['build_s']:>8.1f}s{result['cluster_s']:>8.1f}s{result['summarize_s']:>10.1f}s"
+            f"{result['embed_s']:>7.1f}s{result['summary_nodes']:>7}{result['mean_summary_chars']:>7.0f}"
+            + "".join(f"{metrics.get(f'recall@{k}', 0.0):>10.3f}" for k in k_values)
+            + f"{metrics.get('mrr', 0.0):>8.3f}"
+        )
+    if "abstractive" in results and not results["abstractive"]["generator_loaded"]:
+        print("\n⚠️ FLAN-T5 could not be loaded: abstractive numbers are its concatenation fallback")
+    if args.fake_embeddings:
+        print("\n⚠️ Fake embeddings: compare build times only")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/sharding_parity.py
+"""
+ShardedRetriever vs MultiLevelRetriever: same results, and what the fan-out costs
+
+Builds one FAISS index over synthetic chunks, a MultiLevelRetriever over it
+and a ShardedRetriever over the same store (--shards processes), then for
+every query compares:
+- BM25 and semantic candidates (scores must match within --tolerance)
+- Final multi-level top-k (scores must match; texts may differ only where
+  candidates tie, since equal scores can come back in either order)
+and reports per-query latency of both.
+
+Exits 1 if any query's results differ beyond ties.
+
+Query embeddings come from a deterministic fake embedder by default;
+--real-embeddings uses the configured model. The reranker is off unless
+--reranker is given (it runs in the coordinator, identically for both).
+
+Usage:
+    python -m benchmarks.sharding_parity
+    python -m benchmarks.sharding_parity --paragraphs 5000 --shards 8 --queries 200
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import sys
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from benchmarks.ask_overhead import build_store
+from benchmarks.common import synthetic_texts
+from utils.chunking import chunk_text
+
+Hits = List[Tuple[str, float]]
+
+
+def scores_match(a: Hits, b: Hits, tolerance: float) -> bool:
+    if len(a) != len(b):
+        return False
+    return bool(np.allclose([s for _, s in a], [s for _, s in b], rtol=tolerance, atol=tolerance))
+
+
+def compare(local: Hits, sharded: Hits, tolerance: float) -> str:
+    """
+    "same", "tie" or "different"
+
+    Equal scores at every rank with different texts is a tie: hits with the
+    same score were ordered (or cut at k) differently.
+    """
+    if not scores_match(local, sharded, tolerance):
+        return "different"
+    if [t for t, _ in local] == [t for t, _ in sharded]:
+        return "same"
+    return "tie"
+
+
+def timed_ms(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--intermediate-k", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    parser.add_argument("--reranker", action="store_true")
+    parser.add_argument("--real-embeddings", action="store_true")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    from retrieval.multi_level_retriever import create_multi_level_retriever
+    from retrieval.query_context import build_query_context
+    from retrieval.sharding import create_sharded_retriever
+
+    paragraphs = synthetic_texts(args.paragraphs, 40, 160, seed=args.seed)
+    chunks = chunk_text("\n\n".join(paragraphs), chunk_size=800, chunk_overlap=200)
+    vector_store = build_store(chunks, args.real_embeddings)
+    local = create_multi_level_retriever(chunks, vector_store, use_reranker=args.reranker)
+    sharded = create_sharded_retriever(vector_store, num_shards=args.shards, use_reranker=args.reranker)
+
+    rng = random.Random(args.seed)
+    queries = [" ".join(rng.choice(paragraphs).split()[:8]).rstrip(".") + "?" for _ in range(args.queries)]
+
+    outcomes = {"bm25": {}, "semantic": {}, "multi_level": {}}
+    latency = {"local": [], "sharded": []}
+    differing = []
+    try:
+        sharded.retrieve_bm25(queries[0], args.intermediate_k)  # Open one connection per shard
+        for query in queries:
+            results = {}
+            for name, retriever in (("local", local), ("sharded", sharded)):
+                context = build_query_context(query, vector_store.embedding_function)
+                final, ms = timed_ms(
+                    retriever.retrieve_multi_level, query, top_k=args.top_k,
+                    intermediate_k=args.intermediate_k, query_context=context
+                )
+                latency[name].append(ms)
+                results[name] = {
+                    "bm25": retriever.retrieve_bm25(query, args.intermediate_k),
+                    "semantic": retriever.retrieve_semantic(query, args.intermediate_k),
+                    "multi_level": final,
+                }
+            for stage, counts in outcomes.items():
+                outcome = compare(results["local"][stage], results["sharded"][stage], args.tolerance)
+                counts[outcome] = counts.get(outcome, 0) + 1
+                if outcome == "different":
+                    differing.append((stage, query))
+        partial = sharded.partial_queries
+    finally:
+        sharded.close()
+
+    print(f"{len(chunks)} chunks over {len(sharded.shards)} shards, {args.queries} queries, "
+          f"top-{args.top_k} of {args.intermediate_k} candidates")
+    print(f"\n{'stage':<14}{'same':>8}{'tie':>8}{'different':>11}")
+    for stage, counts in outcomes.items():
+        print(f"{stage:<14}{counts.get('same', 0):>8}{counts.get('tie', 0):>8}{counts.get('different', 0):>11}")
+
+    print(f"\n{'retriever':<14}{'p50':>10}{'p95':>10}")
+    for name, values in latency.items():
+        ordered = sorted(values)
+        print(f"{name:<14}{statistics.median(values):>8.2f}ms{ordered[int(0.95 * (len(ordered) - 1))]:>8.2f}ms")
+    if partial:
+        print(f"\n⚠️ {partial} queries merged without every shard (raise SHARD_TIMEOUT)")
+
+    for stage, query in differing[:5]:
+        print(f"❌ {stage} differs for: {query}")
+    sys.exit(1 if differing else 0)
+
+
+if __name__ == "__main__":
+    main()
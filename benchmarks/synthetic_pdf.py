@@ -0,0 +1,97 @@
+# benchmarks/synthetic_pdf.py
+"""
+Synthetic PDF generation for offline benchmarks
+- Deterministic text from benchmarks.common.synthetic_texts
+- Minimal single-font PDF writer (no external dependencies)
+- Text is extractable with PyPDF2, like a real text PDF
+"""
+
+import textwrap
+from typing import List
+
+from benchmarks.common import synthetic_texts
+
+LINES_PER_PAGE = 50
+CHARS_PER_LINE = 90
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, paragraphs: List[str]) -> int:
+    """
+    Write paragraphs to a text PDF
+
+    Args:
+        path: Output file path
+        paragraphs: Paragraph texts
+
+    Returns:
+        Number of pages written
+    """
+    lines = []
+    for paragraph in paragraphs:
+        lines.extend(textwrap.wrap(paragraph, CHARS_PER_LINE))
+        lines.append("")
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+
+    # Object 1: catalog, 2: page tree, 3: font, then (page, content) pairs
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    page_ids = []
+    for n, page_lines in enumerate(pages):
+        page_id, content_id = 4 + 2 * n, 5 + 2 * n
+        page_ids.append(page_id)
+
+        stream = ["BT", "/F1 10 Tf", "12 TL", "50 800 Td"]
+        for line in page_lines:
+            stream.append(f"({_escape(line)}) Tj T*")
+        stream.append("ET")
+        data = "\n".join(stream).encode("latin-1", errors="replace")
+
+        objects[content_id] = b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream"
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids).encode()
+    objects[2] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += b"%d 0 obj\n" % obj_id + objects[obj_id] + b"\nendobj\n"
+
+    xref_offset = len(out)
+    size = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for obj_id in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[obj_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref_offset)
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+    return len(pages)
+
+
+def write_synthetic_pdf(path: str, n_paragraphs: int = 200, seed: int = 42) -> List[str]:
+    """
+    Generate a synthetic corpus and write it as a PDF
+
+    Args:
+        path: Output file path
+        n_paragraphs: Corpus size in paragraphs (~100 words each)
+        seed: Random seed
+
+    Returns:
+        The paragraphs written
+    """
+    paragraphs = synthetic_texts(n_paragraphs, min_words=60, max_words=140, seed=seed)
+    write_pdf(path, paragraphs)
+    return paragraphs
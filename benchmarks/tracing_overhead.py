@@ -0,0 +1,40 @@
+# benchmarks/tracing_overhead.py
+"""
+Cost of a span() with tracing disabled, enabled, and inside a request trace
+
+Usage:
+    python -m benchmarks.tracing_overhead --iterations 1000000
+"""
+
+import argparse
+import time
+
+from utils.tracing import Tracer, request_trace
+
+
+def per_span_ns(tracer: Tracer, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with tracer.span("stage"):
+            pass
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def run(iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    loop_ns = (time.perf_counter() - start) / iterations * 1e9
+
+    print(f"{'empty loop':<28} {loop_ns:>8.1f} ns/iteration")
+    print(f"{'span, tracing disabled':<28} {per_span_ns(Tracer(enabled=False), iterations):>8.1f} ns/span")
+    print(f"{'span, tracing enabled':<28} {per_span_ns(Tracer(enabled=True), iterations):>8.1f} ns/span")
+    with request_trace():
+        print(f"{'span, request trace only':<28} {per_span_ns(Tracer(enabled=False), iterations):>8.1f} ns/span")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    args = parser.parse_args()
+    run(args.iterations)
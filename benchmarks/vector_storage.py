@@ -0,0 +1,86 @@
+# benchmarks/vector_storage.py
+"""
+Recall@k and bytes-per-chunk for compressed vector storage
+
+Ground truth is exact float32 search. Every setting reports its recall@k
+delta against it, its serialized size per chunk and its query latency.
+The RAPTOR float16 node matrix is compared the same way.
+
+Usage:
+    python -m benchmarks.vector_storage --chunks 5000 --k 5
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import synthetic_texts
+from utils.embedding import BatchEmbeddingEngine
+from utils.vector_storage import build_index, bytes_per_vector
+
+SETTINGS = [
+    ("flat", dict(storage="flat")),
+    ("sq8", dict(storage="sq8", refine="none")),
+    ("sq8 + fp16 rescore", dict(storage="sq8", refine="fp16")),
+    ("pq48x8", dict(storage="pq", pq_m=48, refine="none")),
+    ("pq48x8 + fp16 rescore", dict(storage="pq", pq_m=48, refine="fp16")),
+    ("pq48x8 + exact rescore", dict(storage="pq", pq_m=48, refine="flat")),
+    ("pq24x8 + fp16 rescore", dict(storage="pq", pq_m=24, refine="fp16")),
+]
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)]))
+
+
+def run(n_chunks: int, n_queries: int, k: int, random_vectors: bool):
+    if random_vectors:
+        rng = np.random.default_rng(0)
+        docs = rng.standard_normal((n_chunks, 384)).astype(np.float32)
+        queries = docs[rng.choice(n_chunks, n_queries)] + 0.1 * rng.standard_normal((n_queries, 384)).astype(np.float32)
+        docs /= np.linalg.norm(docs, axis=1, keepdims=True)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    else:
+        engine = BatchEmbeddingEngine()
+        docs = engine.encode(synthetic_texts(n_chunks, seed=1))
+        queries = engine.encode(synthetic_texts(n_queries, min_words=5, max_words=15, seed=2))
+
+    truth = np.argsort(-(queries @ docs.T), axis=1)[:, :k]
+
+    print("=" * 80)
+    print(f"VECTOR STORAGE - {n_chunks} chunks, {n_queries} queries, recall@{k}")
+    print("=" * 80)
+    print(f"{'setting':<26} {'bytes/chunk':>12} {f'recall@{k}':>10} {'Δ recall':>9} {'ms/query':>9}")
+
+    baseline_recall = None
+    for name, kwargs in SETTINGS:
+        index = build_index(docs, min_train_size=256, **kwargs)
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        ms_per_query = (time.perf_counter() - start) * 1000 / n_queries
+
+        recall = recall_at_k(truth, found)
+        baseline_recall = recall if baseline_recall is None else baseline_recall
+        print(f"{name:<26} {bytes_per_vector(index):>12.1f} {recall:>10.4f} "
+              f"{recall - baseline_recall:>+9.4f} {ms_per_query:>9.3f}")
+
+    # RAPTOR node matrix: float64 (np.array default) vs float32 vs float16
+    print("\nRAPTOR node matrix")
+    for dtype in (np.float64, np.float32, np.float16):
+        matrix = docs.astype(dtype)
+        scores = queries @ matrix.astype(np.float32).T
+        found = np.argsort(-scores, axis=1)[:, :k]
+        print(f"  {np.dtype(dtype).name:<8} {matrix.nbytes / n_chunks:>8.0f} bytes/node  "
+              f"recall@{k} {recall_at_k(truth, found):.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--random", action="store_true", help="Use random unit vectors instead of embedding text")
+    args = parser.parse_args()
+    run(args.chunks, args.queries, args.k, args.random)
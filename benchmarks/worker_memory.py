@@ -0,0 +1,132 @@
+# benchmarks/worker_memory.py
+"""
+Per-worker memory of gunicorn with and without preload_app
+
+Starts gunicorn with gunicorn.conf.py for each mode, waits for the workers
+to finish loading models, and reads /proc/<pid>/smaps_rollup (Linux):
+- RSS: resident pages, shared pages counted in every process
+- PSS: shared pages split across the processes sharing them
+- USS: private pages, i.e. what one more worker costs
+
+Usage:
+    python -m benchmarks.worker_memory --workers 4
+    python -m benchmarks.worker_memory --workers 4 --app app_flask:app --worker-class sync
+"""
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def smaps_rollup(pid: int) -> dict:
+    """RSS, PSS and USS of a process in MB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) / 1024
+    return {
+        "rss": fields.get("Rss", 0.0),
+        "pss": fields.get("Pss", 0.0),
+        "uss": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+def children(pid: int):
+    """Direct child pids (gunicorn workers)."""
+    result = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Field 4 is the parent pid; the command name may contain spaces
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            result.append(int(entry))
+    return sorted(result)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_settled(master: int, workers: int, timeout: float, interval: float = 2.0):
+    """Wait for all workers and for their RSS to stop growing (models loaded)."""
+    deadline = time.time() + timeout
+    previous = None
+    while time.time() < deadline:
+        time.sleep(interval)
+        pids = children(master)
+        if len(pids) < workers:
+            continue
+        total = sum(smaps_rollup(pid)["rss"] for pid in [master] + pids)
+        if previous is not None and abs(total - previous) < 1.0:
+            return pids
+        previous = total
+    raise TimeoutError("gunicorn workers did not settle")
+
+
+def measure(app: str, worker_class: str, workers: int, preload: bool, timeout: float) -> dict:
+    env = dict(
+        os.environ,
+        PRELOAD_APP="1" if preload else "0",
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_WORKER_CLASS=worker_class,
+        PORT=str(free_port()),
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", app],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        pids = wait_until_settled(proc.pid, workers, timeout)
+        master = smaps_rollup(proc.pid)
+        per_worker = [smaps_rollup(pid) for pid in pids]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+    return {
+        "master": master,
+        "workers": per_worker,
+        "total_pss": master["pss"] + sum(w["pss"] for w in per_worker),
+        "mean_worker_uss": sum(w["uss"] for w in per_worker) / len(per_worker),
+        "mean_worker_rss": sum(w["rss"] for w in per_worker) / len(per_worker),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--app", default="app_asgi:app")
+    parser.add_argument("--worker-class", default="uvicorn.workers.UvicornWorker")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for workers to load")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("❌ /proc/<pid>/smaps_rollup is required (Linux 4.14+)")
+
+    print(f"{'mode':<10} {'worker RSS':>12} {'worker USS':>12} {'master PSS':>12} {'total PSS':>12}")
+    for preload in (False, True):
+        result = measure(args.app, args.worker_class, args.workers, preload, args.timeout)
+        print(f"{'preload' if preload else 'per-worker':<10} "
+              f"{result['mean_worker_rss']:>10.0f}MB {result['mean_worker_uss']:>10.0f}MB "
+              f"{result['master']['pss']:>10.0f}MB {result['total_pss']:>10.0f}MB")
+
+    print("\nworker USS is the incremental memory of one more worker.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# bulk_index.py
+"""
+Pre-index a directory of PDFs
+
+Builds <pdf name>.pkl for every PDF under a directory in parallel worker
+processes, skipping files whose content was already indexed with the same
+options (see utils/bulk_indexer.py). Point the app at the same directory
+with INDEX_DIR to serve the indexes.
+
+Usage:
+    python bulk_index.py pdfs/ --index-dir indexes --workers 4 --timeout 300
+    python bulk_index.py pdfs/ --index-dir indexes --multi-level --raptor --force
+    python bulk_index.py pdfs/ --index-dir indexes --raptor --raptor-summarization extractive
+"""
+
+import argparse
+import logging
+import sys
+
+from config.index_config import BULK_INDEX_CONFIG, INDEX_STORAGE, RAPTOR_CONFIG, VECTOR_STORAGE
+from utils.bulk_indexer import BulkIndexer
+
+
+def print_report(report: dict):
+    print(f"\n{report['files_found']} PDFs found: {report['indexed']} indexed, "
+          f"{report['skipped']} skipped, {report['failed']} failed ({report['timeouts']} timeouts)")
+    print(f"{report['seconds']:.1f}s, {report['files_per_second']:.2f} files/s, "
+          f"{report['mb_per_second']:.2f} MB/s, {report['chunks_per_second']:.0f} chunks/s")
+    if report["interrupted"]:
+        print("Interrupted before all files were processed")
+    for failure in report["failures"]:
+        print(f"  ❌ {failure['pdf']}: {failure['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="Directory of PDFs (or a single PDF)")
+    parser.add_argument("--index-dir", default=INDEX_STORAGE["dir"] or ".", help="Where indexes, manifest and report go")
+    parser.add_argument("--workers", type=int, default=BULK_INDEX_CONFIG["workers"])
+    parser.add_argument("--timeout", type=float, default=BULK_INDEX_CONFIG["timeout"], help="Seconds per file")
+    parser.add_argument("--no-recursive", action="store_true", help="Only the top-level directory")
+    parser.add_argument("--force", action="store_true", help="Re-index files already in the manifest")
+    parser.add_argument("--chunk-size", type=int, default=800)
+    parser.add_argument("--semantic-chunking", action="store_true")
+    parser.add_argument("--multi-level", action="store_true", help="Also build the BM25 + reranker retriever")
+    parser.add_argument("--raptor", action="store_true", help="Also build the RAPTOR tree")
+    parser.add_argument("--raptor-summarization", default=RAPTOR_CONFIG["summarization"], choices=("abstractive", "extractive"),
+                        help="RAPTOR cluster summaries: FLAN-T5 or central sentences (much faster)")
+    parser.add_argument("--vector-storage", default=VECTOR_STORAGE["type"], choices=("flat", "sq8", "pq"))
+    parser.add_argument("--verbose", action="store_true", help="Per-stage logs from the workers")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    options = {
+        "chunk_size": args.chunk_size,
+        "use_semantic_chunking": args.semantic_chunking,
+        "use_multi_level": args.multi_level,
+        "use_raptor": args.raptor,
+        "vector_storage": args.vector_storage
+    }
+    if args.raptor:
+        # Only part of the manifest's skip check when a tree is built
+        options["raptor_summarization"] = args.raptor_summarization
+
+    indexer = BulkIndexer(
+        index_dir=args.index_dir,
+        workers=args.workers,
+        timeout=args.timeout,
+        options=options,
+        force=args.force,
+        worker_log_level=logging.INFO if args.verbose else logging.WARNING
+    )
+    report = indexer.run(args.root, recursive=not args.no_recursive)
+    print_report(report)
+    sys.exit(1 if report["failed"] or report["interrupted"] else 0)
+
+
+if __name__ == "__main__":
+    main()
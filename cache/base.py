@@ -0,0 +1,203 @@
+# cache/base.py
+"""
+Shared cache interface
+- Key generation (prefix:md5)
+- QA, embedding and chunk helpers built on get/set
+- Bulk mget/mset (backends may batch them into fewer round trips)
+- Backends implement get, set, delete, clear_all and get_stats
+"""
+
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from config.redis_config import CACHE_TTL, CACHE_PREFIX
+
+
+class BaseCache:
+    """
+    Base class for cache backends
+
+    Subclasses provide the raw key/value operations; the specialized
+    methods below behave the same on every backend.
+    """
+
+    def _generate_key(self, prefix: str, data: str) -> str:
+        """
+        Generate cache key from data hash
+
+        Args:
+            prefix: Key prefix (e.g., 'qa', 'emb')
+            data: Data to hash
+
+        Returns:
+            Cache key in format: prefix:hash
+        """
+        hash_obj = hashlib.md5(data.encode('utf-8'))
+        return f"{prefix}:{hash_obj.hexdigest()}"
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def clear_all(self):
+        raise NotImplementedError
+
+    def get_stats(self) -> dict:
+        raise NotImplementedError
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[Any]]:
+        """Get many values; None for each missing key."""
+        return [self.get(key) for key in keys]
+
+    def mset(self, mapping: Dict[str, Any], ttl: Optional[int] = None):
+        """Set many values with the same TTL."""
+        for key, value in mapping.items():
+            self.set(key, value, ttl=ttl)
+
+    # -------------------- Specialized Cache Methods --------------------
+
+    def cache_embeddings(self, text: str, embeddings: List[float]) -> str:
+        """
+        Cache document embeddings
+
+        Args:
+            text: Original text
+            embeddings: Embedding vectors
+
+        Returns:
+            Cache key
+        """
+        key = self._generate_key(CACHE_PREFIX["embeddings"], text)
+        self.set(key, np.asarray(embeddings, dtype=np.float32), ttl=CACHE_TTL["embeddings"])
+        return key
+
+    def get_embeddings(self, text: str) -> Optional[List[float]]:
+        """
+        Get cached embeddings
+
+        Args:
+            text: Original text
+
+        Returns:
+            Cached embeddings or None
+        """
+        key = self._generate_key(CACHE_PREFIX["embeddings"], text)
+        value = self.get(key)
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        return value
+
+    def _embedding_keys(self, texts: Sequence[str], namespace: str) -> List[str]:
+        # The namespace (e.g. the model name) keeps different models apart
+        prefix = f"{namespace}\x00" if namespace else ""
+        return [self._generate_key(CACHE_PREFIX["embeddings"], prefix + text) for text in texts]
+
+    def cache_embeddings_many(self, texts: Sequence[str], embeddings, namespace: str = ""):
+        """
+        Cache many embeddings in one batch
+
+        Args:
+            texts: Original texts
+            embeddings: (len(texts), dim) array
+            namespace: Model name or other key namespace
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        keys = self._embedding_keys(texts, namespace)
+        self.mset(dict(zip(keys, matrix)), ttl=CACHE_TTL["embeddings"])
+
+    def get_embeddings_many(self, texts: Sequence[str], namespace: str = "") -> List[Optional[np.ndarray]]:
+        """
+        Get many cached embeddings in one batch
+
+        Args:
+            texts: Original texts
+            namespace: Model name or other key namespace
+
+        Returns:
+            float32 vector or None per text
+        """
+        values = self.mget(self._embedding_keys(texts, namespace))
+        return [None if value is None else np.asarray(value, dtype=np.float32) for value in values]
+
+    def answer_key(self, query: str) -> str:
+        """Cache key of a question's answer."""
+        return self._generate_key(CACHE_PREFIX["qa"], query)
+
+    def cache_answer(self, query: str, answer: str, metadata: Optional[dict] = None):
+        """
+        Cache QA pair
+
+        Args:
+            query: User question
+            answer: Generated answer
+            metadata: Optional metadata (sources, confidence, etc.)
+        """
+        key = self.answer_key(query)
+        value = {
+            "answer": answer,
+            "metadata": metadata or {}
+        }
+        self.set(key, value, ttl=CACHE_TTL["qa_pairs"])
+
+    def get_answer(self, query: str) -> Optional[dict]:
+        """
+        Get cached answer
+
+        Args:
+            query: User question
+
+        Returns:
+            Cached answer dict or None
+        """
+        return self.get(self.answer_key(query))
+
+    def get_answers_many(self, queries: Sequence[str]) -> List[Optional[dict]]:
+        """
+        Get many cached answers in one batch
+
+        Args:
+            queries: User questions
+
+        Returns:
+            Cached answer dict or None per question
+        """
+        return self.mget([self.answer_key(query) for query in queries])
+
+    def cache_chunks(self, pdf_name: str, chunks: List[str]):
+        """
+        Cache document chunks
+
+        Args:
+            pdf_name: PDF filename
+            chunks: List of text chunks
+        """
+        key = self._generate_key(CACHE_PREFIX["chunks"], pdf_name)
+        self.set(key, chunks, ttl=CACHE_TTL["default"])
+
+    def get_chunks(self, pdf_name: str) -> Optional[List[str]]:
+        """
+        Get cached chunks
+
+        Args:
+            pdf_name: PDF filename
+
+        Returns:
+            Cached chunks or None
+        """
+        key = self._generate_key(CACHE_PREFIX["chunks"], pdf_name)
+        return self.get(key)
+
+    @staticmethod
+    def _calculate_hit_rate(hits: int, misses: int) -> str:
+        """Calculate cache hit rate percentage"""
+        total = hits + misses
+        if total == 0:
+            return "0%"
+        rate = (hits / total) * 100
+        return f"{rate:.2f}%"
@@ -0,0 +1,242 @@
+# cache/memory_cache.py
+"""
+In-process cache backend
+- Same interface as RedisCache (QA pairs, embeddings, chunks)
+- Per-entry TTL expiry
+- LRU eviction under a byte budget
+- Thread-safe, with hit/miss/eviction counters
+- TwoTierCache: in-process L1 in front of Redis for hot lookups
+"""
+
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from config.redis_config import MEMORY_CACHE_CONFIG
+from cache.base import BaseCache
+
+logger = logging.getLogger(__name__)
+
+
+def _sizeof(value: Any) -> int:
+    """Approximate memory footprint of a cached value in bytes."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
+
+
+class InMemoryCache(BaseCache):
+    """
+    In-memory cache with TTL and a byte budget
+
+    How it works:
+    1. Entries live in an OrderedDict in least-recently-used order
+    2. Each entry stores its expiry time and estimated size
+    3. Expired entries are dropped when read or when space is needed
+    4. Writes evict from the LRU end until the total fits max_bytes
+    """
+
+    def __init__(
+        self,
+        ttl: int = 86400,
+        max_bytes: int = MEMORY_CACHE_CONFIG["max_bytes"],
+        clock=time.monotonic
+    ):
+        """
+        Initialize in-memory cache
+
+        Args:
+            ttl: Default time-to-live in seconds
+            max_bytes: Total size budget; LRU entries are evicted above it
+            clock: Time source (monotonic seconds)
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.connected = False
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key → (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        logger.info(f"✅ In-memory cache ready ({max_bytes / 1024 ** 2:.0f} MB budget)")
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _purge_expired(self, now: float):
+        expired = [key for key, (expires_at, _, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get cached value
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None (missing or expired)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """
+        Set cached value with TTL
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Time-to-live in seconds (optional)
+        """
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            logger.debug(f"Value for {key} ({size} bytes) exceeds the cache budget, not cached")
+            # The key now means the new value; serving the previous one would be stale
+            self.delete(key)
+            return
+
+        with self._lock:
+            now = self._clock()
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (now + (ttl or self.ttl), size, value)
+            self._bytes += size
+
+            if self._bytes > self.max_bytes:
+                self._purge_expired(now)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        """Delete cached value"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear_all(self):
+        """Clear all cache"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> dict:
+        """
+        Get cache statistics
+
+        Returns:
+            Dict with cache stats
+        """
+        with self._lock:
+            return {
+                "connected": False,
+                "type": "memory",
+                "total_keys": len(self._entries),
+                "used_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self._calculate_hit_rate(self.hits, self.misses)
+            }
+
+
+class TwoTierCache(BaseCache):
+    """
+    In-process L1 in front of a shared L2 (Redis)
+
+    Reads try L1 first and fill it from L2 on a miss; writes and deletes go
+    to both. L1 entries use a short TTL, which bounds how long a value
+    changed by another process can be served stale.
+    """
+
+    def __init__(self, l1: InMemoryCache, l2: BaseCache):
+        """
+        Args:
+            l1: In-process cache
+            l2: Shared cache
+        """
+        self.l1 = l1
+        self.l2 = l2
+        self.ttl = l2.ttl
+
+    @property
+    def connected(self) -> bool:
+        return self.l2.connected
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        value = self.l2.get(key)
+        if value is not None:
+            self.l1.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        self.l2.set(key, value, ttl=ttl)
+        self.l1.set(key, value, ttl=min(ttl or self.l1.ttl, self.l1.ttl))
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[Any]]:
+        values = self.l1.mget(keys)
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            fetched = self.l2.mget([keys[i] for i in missing])
+            for i, value in zip(missing, fetched):
+                if value is not None:
+                    values[i] = value
+                    self.l1.set(keys[i], value)
+        return values
+
+    def mset(self, mapping: Dict[str, Any], ttl: Optional[int] = None):
+        self.l2.mset(mapping, ttl=ttl)
+        self.l1.mset(mapping, ttl=min(ttl or self.l1.ttl, self.l1.ttl))
+
+    def delete(self, key: str):
+        self.l1.delete(key)
+        self.l2.delete(key)
+
+    def clear_all(self):
+        self.l1.clear_all()
+        self.l2.clear_all()
+
+    def get_stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "type": "two_tier",
+            "l1": self.l1.get_stats(),
+            "l2": self.l2.get_stats()
+        }
@@ -1,57 +1,119 @@
 # cache/redis_cache.py
 import redis
-import pickle
-import hashlib
 import logging
-from typing import Optional, Any, List
-from config.redis_config import REDIS_CONFIG, CACHE_TTL, CACHE_PREFIX
+from typing import Any, Dict, List, Optional, Sequence
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+from config.redis_config import (
+    REDIS_CONFIG, REDIS_POOL_CONFIG, CIRCUIT_BREAKER_CONFIG, MEMORY_CACHE_CONFIG, SERIALIZATION_CONFIG
+)
+from cache.base import BaseCache
+from cache import serialization
+from cache.memory_cache import InMemoryCache, TwoTierCache
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED
 
 logger = logging.getLogger(__name__)
 
+# Errors that mean Redis is unreachable or unhealthy (OSError covers socket errors)
+REDIS_FAILURES = (redis.ConnectionError, redis.TimeoutError, redis.BusyLoadingError, OSError)
 
-class RedisCache:
+
+def create_redis_client(
+    config: dict = REDIS_CONFIG,
+    pool_config: dict = REDIS_POOL_CONFIG
+) -> redis.Redis:
+    """
+    Pooled Redis client
+    - Blocking pool: callers wait up to pool_timeout for a free connection
+    - Idle connections are PINGed before reuse (health_check_interval)
+    - Commands retry on connection errors/timeouts with exponential backoff
+    - The pool reconnects lazily, so this never fails when Redis is down
+    """
+    retry = Retry(
+        ExponentialBackoff(cap=pool_config["retry_backoff_cap"], base=pool_config["retry_backoff_base"]),
+        pool_config["retries"]
+    )
+    pool = redis.BlockingConnectionPool(
+        max_connections=pool_config["max_connections"],
+        timeout=pool_config["pool_timeout"],
+        health_check_interval=pool_config["health_check_interval"],
+        retry=retry,
+        retry_on_error=[redis.ConnectionError, redis.TimeoutError],
+        socket_keepalive=True,
+        **config
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+class RedisCache(BaseCache):
     """
     Redis caching layer for RAG system
     - Caches embeddings, QA pairs, and vector stores
     - TTL: 24 hours (86400 seconds)
     - Automatic key generation with MD5 hashing
+    - Compact encoding (cache/serialization.py) and pipelined bulk calls
+    - Pooled client; a circuit breaker switches to a local in-memory cache
+      while Redis is down and back once a probe succeeds
     """
     
-    def __init__(self, ttl: int = 86400):
+    def __init__(
+        self,
+        ttl: int = 86400,
+        client=None,
+        pipeline_batch_size: int = SERIALIZATION_CONFIG["pipeline_batch_size"],
+        breaker: Optional[CircuitBreaker] = None,
+        fallback: Optional[BaseCache] = None
+    ):
         """
         Initialize Redis connection
         
         Args:
             ttl: Time-to-live in seconds (default: 24 hours)
+            client: Existing Redis client (e.g. fakeredis.FakeRedis()); pooled client from REDIS_CONFIG if None
+            pipeline_batch_size: Commands per round trip in mget/mset
+            breaker: Circuit breaker (CIRCUIT_BREAKER_CONFIG if None)
+            fallback: Cache used while the circuit is open (in-memory if None)
         """
         self.ttl = ttl
-        self.connected = False
+        self.pipeline_batch_size = pipeline_batch_size
+        self.client = client if client is not None else create_redis_client()
+        self.breaker = breaker or CircuitBreaker(
+            "Redis", failure_exceptions=REDIS_FAILURES, **CIRCUIT_BREAKER_CONFIG
+        )
+        self.fallback = fallback if fallback is not None else InMemoryCache(ttl=ttl)
+        self.fallback_calls = 0
         
+        # Boot check; if Redis is down the circuit opens and recovers later
         try:
-            self.client = redis.Redis(**REDIS_CONFIG)
-            # Test connection
             self.client.ping()
-            self.connected = True
             logger.info("✅ Redis connected successfully")
-        except redis.ConnectionError as e:
+        except REDIS_FAILURES as e:
+            self.breaker.trip(e)
             logger.warning(f"⚠️ Redis connection failed: {e}")
-            logger.warning("Cache will be disabled. Install Redis or use mock cache.")
-            self.client = None
-            self.connected = False
+            logger.warning("Using the in-memory cache until Redis is reachable.")
+    
+    @property
+    def connected(self) -> bool:
+        """Whether calls currently go to Redis."""
+        return self.breaker.state == CLOSED
     
-    def _generate_key(self, prefix: str, data: str) -> str:
+    def _run(self, operation: str, fn, *args, **kwargs):
         """
-        Generate cache key from data hash
+        Run a Redis command through the breaker
         
-        Args:
-            prefix: Key prefix (e.g., 'qa', 'emb')
-            data: Data to hash
-            
         Returns:
-            Cache key in format: prefix:hash
+            (True, result) on success, (False, None) when the fallback should be used
         """
-        hash_obj = hashlib.md5(data.encode('utf-8'))
-        return f"{prefix}:{hash_obj.hexdigest()}"
+        try:
+            return True, self.breaker.call(fn, *args, **kwargs)
+        except CircuitOpenError:
+            pass
+        except REDIS_FAILURES as e:
+            logger.warning(f"⚠️ Cache {operation} failed, using in-memory fallback: {e}")
+        except Exception as e:
+            logger.error(f"Cache {operation} error: {e}")
+        self.fallback_calls += 1
+        return False, None
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -63,19 +125,19 @@ class RedisCache:
         Returns:
             Cached value or None
         """
-        if not self.connected:
-            return None
-        
-        try:
-            data = self.client.get(key)
-            if data:
-                logger.debug(f"✅ Cache HIT: {key}")
-                return pickle.loads(data)
+        ok, data = self._run("get", self.client.get, key)
+        if not ok:
+            return self.fallback.get(key)
+        if not data:
             logger.debug(f"❌ Cache MISS: {key}")
             return None
+        try:
+            value = serialization.loads(data)
         except Exception as e:
-            logger.error(f"Cache get error: {e}")
+            logger.error(f"Cache decode error for {key}: {e}")
             return None
+        logger.debug(f"✅ Cache HIT: {key}")
+        return value
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None):
         """
@@ -86,222 +148,170 @@ class RedisCache:
             value: Value to cache
             ttl: Time-to-live in seconds (optional)
         """
-        if not self.connected:
+        ttl = ttl or self.ttl
+        ok, _ = self._run("set", self.client.set, key, serialization.dumps(value), ex=ttl)
+        if not ok:
+            self.fallback.set(key, value, ttl=ttl)
             return
-        
-        try:
-            ttl = ttl or self.ttl
-            serialized = pickle.dumps(value)
-            self.client.setex(key, ttl, serialized)
-            logger.debug(f"💾 Cached: {key} (TTL: {ttl}s)")
-        except Exception as e:
-            logger.error(f"Cache set error: {e}")
+        logger.debug(f"💾 Cached: {key} (TTL: {ttl}s)")
     
-    def delete(self, key: str):
-        """Delete cached value"""
-        if not self.connected:
-            return
-        
-        try:
-            self.client.delete(key)
-            logger.debug(f"🗑️ Deleted: {key}")
-        except Exception as e:
-            logger.error(f"Cache delete error: {e}")
-    
-    def clear_all(self):
-        """Clear all cache (use with caution!)"""
-        if not self.connected:
-            return
-        
-        try:
-            self.client.flushdb()
-            logger.info("🗑️ All cache cleared")
-        except Exception as e:
-            logger.error(f"Cache clear error: {e}")
+    def _mget(self, keys: Sequence[str]) -> list:
+        results = []
+        for start in range(0, len(keys), self.pipeline_batch_size):
+            results.extend(self.client.mget(keys[start:start + self.pipeline_batch_size]))
+        return results
     
-    # -------------------- Specialized Cache Methods --------------------
-    
-    def cache_embeddings(self, text: str, embeddings: List[float]) -> str:
+    def mget(self, keys: Sequence[str]) -> List[Optional[Any]]:
         """
-        Cache document embeddings
+        Get many values, pipeline_batch_size keys per round trip
         
         Args:
-            text: Original text
-            embeddings: Embedding vectors
+            keys: Cache keys
             
         Returns:
-            Cache key
-        """
-        key = self._generate_key(CACHE_PREFIX["embeddings"], text)
-        self.set(key, embeddings, ttl=CACHE_TTL["embeddings"])
-        return key
-    
-    def get_embeddings(self, text: str) -> Optional[List[float]]:
+            Value or None per key
         """
-        Get cached embeddings
+        if not keys:
+            return []
         
-        Args:
-            text: Original text
-            
-        Returns:
-            Cached embeddings or None
-        """
-        key = self._generate_key(CACHE_PREFIX["embeddings"], text)
-        return self.get(key)
+        ok, batch = self._run("mget", self._mget, keys)
+        if not ok:
+            return self.fallback.mget(keys)
+        try:
+            return [serialization.loads(data) if data else None for data in batch]
+        except Exception as e:
+            logger.error(f"Cache decode error: {e}")
+            return [None] * len(keys)
     
-    def cache_answer(self, query: str, answer: str, metadata: Optional[dict] = None):
-        """
-        Cache QA pair
-        
-        Args:
-            query: User question
-            answer: Generated answer
-            metadata: Optional metadata (sources, confidence, etc.)
-        """
-        key = self._generate_key(CACHE_PREFIX["qa"], query)
-        value = {
-            "answer": answer,
-            "metadata": metadata or {}
-        }
-        self.set(key, value, ttl=CACHE_TTL["qa_pairs"])
+    def _mset(self, items: list, ttl: int):
+        for start in range(0, len(items), self.pipeline_batch_size):
+            pipe = self.client.pipeline(transaction=False)
+            for key, data in items[start:start + self.pipeline_batch_size]:
+                pipe.set(key, data, ex=ttl)
+            pipe.execute()
     
-    def get_answer(self, query: str) -> Optional[dict]:
+    def mset(self, mapping: Dict[str, Any], ttl: Optional[int] = None):
         """
-        Get cached answer
+        Set many values with TTL through a non-transactional pipeline
         
         Args:
-            query: User question
-            
-        Returns:
-            Cached answer dict or None
-        """
-        key = self._generate_key(CACHE_PREFIX["qa"], query)
-        return self.get(key)
-    
-    def cache_chunks(self, pdf_name: str, chunks: List[str]):
+            mapping: Key → value
+            ttl: Time-to-live in seconds (optional)
         """
-        Cache document chunks
+        if not mapping:
+            return
         
-        Args:
-            pdf_name: PDF filename
-            chunks: List of text chunks
-        """
-        key = self._generate_key(CACHE_PREFIX["chunks"], pdf_name)
-        self.set(key, chunks, ttl=CACHE_TTL["default"])
+        ttl = ttl or self.ttl
+        items = [(key, serialization.dumps(value)) for key, value in mapping.items()]
+        ok, _ = self._run("mset", self._mset, items, ttl)
+        if not ok:
+            self.fallback.mset(mapping, ttl=ttl)
+            return
+        logger.debug(f"💾 Cached {len(items)} keys (TTL: {ttl}s)")
     
-    def get_chunks(self, pdf_name: str) -> Optional[List[str]]:
-        """
-        Get cached chunks
-        
-        Args:
-            pdf_name: PDF filename
-            
-        Returns:
-            Cached chunks or None
-        """
-        key = self._generate_key(CACHE_PREFIX["chunks"], pdf_name)
-        return self.get(key)
+    def delete(self, key: str):
+        """Delete cached value"""
+        # Always drop the local copy too, so it can't resurface on the next outage
+        self.fallback.delete(key)
+        ok, _ = self._run("delete", self.client.delete, key)
+        if ok:
+            logger.debug(f"🗑️ Deleted: {key}")
+    
+    def clear_all(self):
+        """Clear all cache (use with caution!)"""
+        self.fallback.clear_all()
+        ok, _ = self._run("clear", self.client.flushdb)
+        if ok:
+            logger.info("🗑️ All cache cleared")
+    
+    def _pool_stats(self) -> dict:
+        pool = self.client.connection_pool
+        stats = {"max_connections": getattr(pool, "max_connections", None)}
+        created = getattr(pool, "_connections", None)
+        if isinstance(created, list):
+            stats["open_connections"] = sum(1 for conn in created if conn is not None)
+        return stats
     
     def get_stats(self) -> dict:
         """
         Get cache statistics
         
         Returns:
-            Dict with cache stats
+            Dict with cache stats, circuit breaker state and the fallback's stats
         """
+        stats = {
+            "connected": self.connected,
+            "type": "redis",
+            "breaker": self.breaker.get_stats(),
+            "fallback_calls": self.fallback_calls,
+            "fallback": self.fallback.get_stats()
+        }
         if not self.connected:
-            return {"connected": False}
+            return stats
         
-        try:
-            info = self.client.info()
-            return {
-                "connected": True,
-                "used_memory": info.get("used_memory_human", "N/A"),
-                "total_keys": self.client.dbsize(),
-                "hits": info.get("keyspace_hits", 0),
-                "misses": info.get("keyspace_misses", 0),
-                "hit_rate": self._calculate_hit_rate(
-                    info.get("keyspace_hits", 0),
-                    info.get("keyspace_misses", 0)
-                )
-            }
-        except Exception as e:
-            logger.error(f"Stats error: {e}")
-            return {"connected": True, "error": str(e)}
+        ok, info = self._run("info", self.client.info)
+        if not ok:
+            stats["connected"] = self.connected
+            return stats
+        _, total_keys = self._run("dbsize", self.client.dbsize)
+        stats.update({
+            "used_memory": info.get("used_memory_human", "N/A"),
+            "total_keys": total_keys,
+            "hits": info.get("keyspace_hits", 0),
+            "misses": info.get("keyspace_misses", 0),
+            "hit_rate": self._calculate_hit_rate(
+                info.get("keyspace_hits", 0),
+                info.get("keyspace_misses", 0)
+            ),
+            "pool": self._pool_stats()
+        })
+        return stats
     
-    @staticmethod
-    def _calculate_hit_rate(hits: int, misses: int) -> str:
-        """Calculate cache hit rate percentage"""
-        total = hits + misses
-        if total == 0:
-            return "0%"
-        rate = (hits / total) * 100
-        return f"{rate:.2f}%"
+# -------------------- In-Memory Fallback --------------------
 
+# Kept for existing imports; the in-memory backend now implements TTL and eviction
+MockCache = InMemoryCache
 
-# -------------------- Mock Cache for Development --------------------
 
-class MockCache:
-    """
-    Mock cache for development when Redis is not available
-    Uses in-memory dictionary (not persistent)
-    """
-    
-    def __init__(self, ttl: int = 86400):
-        self.cache = {}
-        self.ttl = ttl
-        self.connected = False
-        logger.warning("⚠️ Using MockCache (in-memory only)")
-    
-    def _generate_key(self, prefix: str, data: str) -> str:
-        hash_obj = hashlib.md5(data.encode('utf-8'))
-        return f"{prefix}:{hash_obj.hexdigest()}"
-    
-    def get(self, key: str) -> Optional[Any]:
-        return self.cache.get(key)
-    
-    def set(self, key: str, value: Any, ttl: Optional[int] = None):
-        self.cache[key] = value
-    
-    def delete(self, key: str):
-        self.cache.pop(key, None)
-    
-    def clear_all(self):
-        self.cache.clear()
-    
-    def cache_answer(self, query: str, answer: str, metadata: Optional[dict] = None):
-        key = self._generate_key(CACHE_PREFIX["qa"], query)
-        self.set(key, {"answer": answer, "metadata": metadata or {}})
-    
-    def get_answer(self, query: str) -> Optional[dict]:
-        key = self._generate_key(CACHE_PREFIX["qa"], query)
-        return self.get(key)
-    
-    def get_stats(self) -> dict:
-        return {
-            "connected": False,
-            "type": "mock",
-            "total_keys": len(self.cache)
-        }
+def redis_client_of(cache: BaseCache):
+    """Redis client behind a cache while Redis is healthy, else None (e.g. for locks)."""
+    if isinstance(cache, TwoTierCache):
+        cache = cache.l2
+    if isinstance(cache, RedisCache) and cache.connected:
+        return cache.client
+    return None
 
 
 # -------------------- Cache Factory --------------------
 
-def get_cache(use_redis: bool = True, ttl: int = 86400):
+def get_cache(
+    use_redis: bool = True,
+    ttl: int = 86400,
+    two_tier: bool = MEMORY_CACHE_CONFIG["l1_enabled"],
+    client=None
+):
     """
-    Get cache instance (Redis or Mock)
+    Get cache instance (Redis, Redis behind an in-process L1, or in-memory)
     
     Args:
-        use_redis: Try to use Redis (falls back to Mock if unavailable)
+        use_redis: Use Redis (served from memory while it is unavailable)
         ttl: Time-to-live in seconds
+        two_tier: Put an in-process L1 in front of Redis
+        client: Existing Redis client to use instead of REDIS_CONFIG
         
     Returns:
         Cache instance
     """
     if use_redis:
-        cache = RedisCache(ttl=ttl)
-        if cache.connected:
-            return cache
+        # Returned even if Redis is down now: it serves from memory and
+        # switches back once Redis answers again
+        cache = RedisCache(ttl=ttl, client=client)
+        if two_tier:
+            l1 = InMemoryCache(
+                ttl=min(ttl, MEMORY_CACHE_CONFIG["l1_ttl"]),
+                max_bytes=MEMORY_CACHE_CONFIG["l1_max_bytes"]
+            )
+            return TwoTierCache(l1, cache)
+        return cache
     
-    # Fallback to mock cache
-    return MockCache(ttl=ttl)
+    return InMemoryCache(ttl=ttl)
@@ -0,0 +1,116 @@
+# cache/serialization.py
+"""
+Compact value encoding for the Redis cache
+- float32 arrays as raw bytes (embeddings)
+- msgpack (JSON if msgpack is missing) for answers, chunks and other plain data
+- pickle only for values neither format can hold
+- Optional zstd compression above a size threshold
+
+Encoded values start with a one-byte format tag and a one-byte compression
+tag. Values written by older versions (bare pickles) are still readable.
+"""
+
+import json
+import logging
+import pickle
+from typing import Any
+
+import numpy as np
+from config.redis_config import SERIALIZATION_CONFIG
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Format tags
+FLOAT32 = b"F"
+MSGPACK = b"M"
+JSON = b"J"
+PICKLE = b"P"
+
+# Compression tags
+RAW = b"-"
+ZSTD = b"Z"
+
+_PICKLE_PREFIX = b"\x80"  # Pickle protocol 2+ opcode; legacy values start with it
+
+
+def _encode_plain(value: Any):
+    """msgpack, then JSON, for plain data; None if neither can hold it."""
+    if msgpack is not None:
+        try:
+            return MSGPACK, msgpack.packb(value, use_bin_type=True)
+        except (TypeError, ValueError, OverflowError):
+            return None
+    try:
+        return JSON, json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    except (TypeError, ValueError):
+        return None
+
+
+def dumps(
+    value: Any,
+    compress_threshold: int = SERIALIZATION_CONFIG["compress_threshold"],
+    level: int = SERIALIZATION_CONFIG["zstd_level"]
+) -> bytes:
+    """
+    Encode a value for storage
+
+    Args:
+        value: float32-compatible ndarray, plain data, or any picklable object
+        compress_threshold: Compress payloads at least this large (0 = never)
+        level: zstd compression level
+
+    Returns:
+        Tagged bytes
+    """
+    if isinstance(value, np.ndarray) and value.dtype.kind == "f":
+        tag, payload = FLOAT32, np.ascontiguousarray(value, dtype=np.float32).tobytes()
+    else:
+        encoded = _encode_plain(value)
+        if encoded is None:
+            encoded = PICKLE, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        tag, payload = encoded
+
+    if zstandard is not None and compress_threshold and len(payload) >= compress_threshold:
+        compressed = zstandard.ZstdCompressor(level=level).compress(payload)
+        if len(compressed) < len(payload):
+            return tag + ZSTD + compressed
+
+    return tag + RAW + payload
+
+
+def loads(data: bytes) -> Any:
+    """
+    Decode bytes written by dumps (or a legacy pickle)
+
+    float32 values come back as read-only 1-D numpy arrays.
+    """
+    if data[:1] == _PICKLE_PREFIX:
+        return pickle.loads(data)
+
+    tag, compression, payload = data[:1], data[1:2], data[2:]
+    if compression == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read a compressed cache value")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+
+    if tag == FLOAT32:
+        return np.frombuffer(payload, dtype=np.float32)
+    if tag == MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("msgpack is required to read this cache value")
+        return msgpack.unpackb(payload, raw=False)
+    if tag == JSON:
+        return json.loads(payload.decode("utf-8"))
+    if tag == PICKLE:
+        return pickle.loads(payload)
+    raise ValueError(f"Unknown cache value format {tag!r}")
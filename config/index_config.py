@@ -0,0 +1,53 @@
+# config/index_config.py
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# FAISS chunk vector storage
+VECTOR_STORAGE = {
+    "type": os.getenv("VECTOR_STORAGE", "flat"),  # "flat" (float32), "sq8" (int8 scalar) or "pq" (product quantized)
+    "pq_m": int(os.getenv("VECTOR_PQ_M", 48)),  # Sub-quantizers; must divide the embedding dimension
+    "pq_nbits": int(os.getenv("VECTOR_PQ_NBITS", 8)),
+    "refine": os.getenv("VECTOR_REFINE", "fp16"),  # Shortlist re-scoring: "none", "fp16" or "flat" (exact float32)
+    "rescore_factor": int(os.getenv("VECTOR_RESCORE_FACTOR", 4)),  # Shortlist size = k * factor
+    "min_train_size": int(os.getenv("VECTOR_MIN_TRAIN_SIZE", 1000)),  # Below this, PQ stays flat
+}
+
+# RAPTOR tree node embeddings
+RAPTOR_CONFIG = {
+    "embedding_dtype": os.getenv("RAPTOR_EMBEDDING_DTYPE", "float32"),  # "float32" or "float16"
+    "summarization": os.getenv("RAPTOR_SUMMARIZATION", "abstractive"),  # "abstractive" (FLAN-T5) or "extractive"
+    "extractive_max_chars": int(os.getenv("RAPTOR_EXTRACTIVE_MAX_CHARS", 1000)),  # Extractive summary budget
+    # Per-level build checkpoints and the cluster summary cache, e.g. "raptor_checkpoints" ("" = off)
+    "checkpoint_dir": os.getenv("RAPTOR_CHECKPOINT_DIR", ""),
+    "summary_cache_mb": float(os.getenv("RAPTOR_SUMMARY_CACHE_MB", 64)),  # Least recently used summaries pruned past this
+}
+
+# Where pickled indexes (<pdf name>.pkl) are written and looked up
+INDEX_STORAGE = {
+    "dir": os.getenv("INDEX_DIR", ""),  # "" = current directory
+}
+
+# Offline bulk indexing (bulk_index.py)
+BULK_INDEX_CONFIG = {
+    "workers": int(os.getenv("BULK_INDEX_WORKERS", max(1, (os.cpu_count() or 2) // 2))),  # Indexing processes
+    "timeout": float(os.getenv("BULK_INDEX_TIMEOUT", 600)),  # Seconds before a file's worker is killed
+    "manifest": os.getenv("BULK_INDEX_MANIFEST", "index_manifest.json"),  # Content hashes of indexed PDFs (in the index dir)
+    "report": os.getenv("BULK_INDEX_REPORT", "bulk_index_report.json"),  # Summary of the last run (in the index dir)
+}
+
+# Progressive indexing: the FAISS tier is served as soon as embeddings finish,
+# BM25/reranker and RAPTOR are built in the background and swapped in when ready
+PROGRESSIVE_INDEX_CONFIG = {
+    "enabled": os.getenv("PROGRESSIVE_INDEXING", "1") == "1",
+    "workers": int(os.getenv("PROGRESSIVE_INDEX_WORKERS", 1)),  # Background tier builds per process
+    # An upgrade lease held by another host counts as dead after this many seconds (same host: pid check)
+    "lease_stale_after": float(os.getenv("PROGRESSIVE_LEASE_STALE_AFTER", 3600)),
+}
+
+# Tiers the apps build for uploaded PDFs (passed to create_vectorstore_from_pdf)
+UPLOAD_INDEX_CONFIG = {
+    "use_multi_level": os.getenv("UPLOAD_MULTI_LEVEL", "0") == "1",
+    "use_raptor": os.getenv("UPLOAD_RAPTOR", "0") == "1",
+}
@@ -0,0 +1,33 @@
+# config/model_config.py
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Embedding engine configuration
+EMBEDDING_CONFIG = {
+    "model_name": os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"),
+    "max_tokens_per_batch": int(os.getenv("EMBEDDING_MAX_TOKENS_PER_BATCH", 8192)),  # Padded tokens per forward pass
+    "max_batch_size": int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", 128)),
+    "num_threads": int(os.getenv("EMBEDDING_NUM_THREADS", 0)),  # 0 = torch default
+    "num_workers": int(os.getenv("EMBEDDING_NUM_WORKERS", 0)),  # 0 = no process pool
+    "min_texts_per_worker": int(os.getenv("EMBEDDING_MIN_TEXTS_PER_WORKER", 256)),
+    "query_cache_size": int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 1024)),  # LRU of recent query embeddings
+}
+
+# Inference backend per model: "torch" (fp32), "int8" (dynamic quantization) or "onnx" (ONNX Runtime)
+INFERENCE_BACKEND = {
+    "embedding": os.getenv("EMBEDDING_BACKEND", "torch"),
+    "reranker": os.getenv("RERANKER_BACKEND", "torch"),
+    "summarizer": os.getenv("SUMMARIZER_BACKEND", "torch"),
+}
+
+# Prompt context assembly (see retrieval/context_builder.py)
+CONTEXT_CONFIG = {
+    "packing": os.getenv("CONTEXT_PACKING", "1") == "1",  # 0 = join every reranked passage as before
+    "token_budget": int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500)),  # Max prompt tokens for passages (+ key facts)
+    "merge_adjacent": os.getenv("CONTEXT_MERGE_ADJACENT", "1") == "1",  # Join neighbouring chunks, dropping the overlap
+    "dedup_threshold": float(os.getenv("CONTEXT_DEDUP_THRESHOLD", 0.8)),  # Shingle containment above which a passage is dropped
+    "key_facts": os.getenv("CONTEXT_KEY_FACTS", "0") == "1",  # Repeat extracted key facts after the passages
+    "tokenizer": os.getenv("CONTEXT_TOKENIZER", "cl100k_base"),  # tiktoken encoding; ~4 chars/token without tiktoken
+}
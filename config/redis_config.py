@@ -10,7 +10,7 @@ REDIS_CONFIG = {
     "port": int(os.getenv("REDIS_PORT", 6379)),
     "db": int(os.getenv("REDIS_DB", 0)),
     "password": os.getenv("REDIS_PASSWORD", None),
-    "decode_responses": False,  # We'll use pickle for complex objects
+    "decode_responses": False,  # Values are binary (see cache/serialization.py)
     "socket_timeout": 5,
     "socket_connect_timeout": 5,
 }
@@ -30,3 +30,35 @@ CACHE_PREFIX = {
     "vector_store": "vs",
     "chunks": "chunks",
 }
+
+# In-process cache (used without Redis, and as the optional L1 in front of it)
+MEMORY_CACHE_CONFIG = {
+    "max_bytes": int(os.getenv("MEMORY_CACHE_MAX_MB", 256)) * 1024 * 1024,  # LRU eviction above this size
+    "l1_enabled": os.getenv("CACHE_L1", "0") == "1",  # Two-tier: in-process L1 in front of Redis
+    "l1_ttl": int(os.getenv("CACHE_L1_TTL", 300)),  # Bounds staleness of entries changed by other processes
+    "l1_max_bytes": int(os.getenv("CACHE_L1_MAX_MB", 64)) * 1024 * 1024,
+}
+
+# Redis value encoding and batching
+SERIALIZATION_CONFIG = {
+    "compress_threshold": int(os.getenv("CACHE_COMPRESS_THRESHOLD", 4096)),  # zstd above this many bytes (0 = off)
+    "zstd_level": int(os.getenv("CACHE_ZSTD_LEVEL", 3)),
+    "pipeline_batch_size": int(os.getenv("CACHE_PIPELINE_BATCH_SIZE", 1000)),  # Commands per round trip
+    "ingest_embeddings": os.getenv("CACHE_INGEST_EMBEDDINGS", "1") == "1",  # Reuse chunk embeddings across ingestions
+}
+
+# Connection pool and failure handling
+REDIS_POOL_CONFIG = {
+    "max_connections": int(os.getenv("REDIS_MAX_CONNECTIONS", 32)),  # Per process
+    "pool_timeout": float(os.getenv("REDIS_POOL_TIMEOUT", 2)),  # Seconds to wait for a free connection
+    "health_check_interval": int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30)),  # PING idle connections before reuse
+    "retries": int(os.getenv("REDIS_RETRIES", 2)),  # Per command, on connection errors and timeouts
+    "retry_backoff_base": float(os.getenv("REDIS_RETRY_BACKOFF_BASE", 0.05)),
+    "retry_backoff_cap": float(os.getenv("REDIS_RETRY_BACKOFF_CAP", 0.5)),
+}
+
+CIRCUIT_BREAKER_CONFIG = {
+    "failure_threshold": int(os.getenv("REDIS_BREAKER_FAILURES", 3)),  # Consecutive failures before opening
+    "reset_timeout": float(os.getenv("REDIS_BREAKER_RESET", 5)),  # Seconds open before the first probe
+    "max_reset_timeout": float(os.getenv("REDIS_BREAKER_MAX_RESET", 120)),  # Backoff cap while Redis stays down
+}
@@ -0,0 +1,71 @@
+# config/server_config.py
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Serving configuration
+SERVER_CONFIG = {
+    "cpu_workers": int(os.getenv("RAG_CPU_WORKERS", os.cpu_count() or 4)),  # Bounded pool for retrieval/reranking
+    "index_registry_size": int(os.getenv("INDEX_REGISTRY_SIZE", 8)),  # Loaded indexes kept in memory (LRU)
+}
+
+# Model/index preloading for forked gunicorn workers (see gunicorn.conf.py)
+PRELOAD_CONFIG = {
+    "models": os.getenv("PRELOAD_MODELS", "1") == "1",  # Embedder and cross-encoder
+    "summarizer": os.getenv("PRELOAD_SUMMARIZER", "0") == "1",  # FLAN-T5, only needed to build RAPTOR trees
+    "indexes": [p for p in os.getenv("PRELOAD_INDEXES", "").split(",") if p.strip()],  # PDF paths with cached indexes
+    "torch_threads_per_worker": int(os.getenv("TORCH_THREADS_PER_WORKER", 0)),  # 0 = CPUs / workers
+}
+
+# Cross-request micro-batching of query embeddings and cross-encoder pairs
+MICRO_BATCH_CONFIG = {
+    "enabled": os.getenv("MICRO_BATCHING", "0") == "1",
+    "max_wait_ms": float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", 5)),  # Collection window after the first request
+    "max_batch_size": int(os.getenv("MICRO_BATCH_MAX_SIZE", 64)),  # Queries (or rerank pairs) per forward pass
+}
+
+# Per-stage latency tracing
+TRACING_CONFIG = {
+    "enabled": os.getenv("TRACING", "0") == "1",  # Record histograms for /metrics
+    # Histogram bucket upper bounds in seconds
+    "buckets": (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+}
+
+# Request coalescing: identical in-flight questions/ingestions run once (see utils/single_flight.py)
+SINGLE_FLIGHT_CONFIG = {
+    "enabled": os.getenv("SINGLE_FLIGHT", "1") == "1",
+    "distributed": os.getenv("SINGLE_FLIGHT_REDIS", "1") == "1",  # Also coalesce across workers with a Redis lock
+    "answer_timeout": float(os.getenv("SINGLE_FLIGHT_ANSWER_TIMEOUT", 90)),  # Max wait for another request's answer
+    "ingest_timeout": float(os.getenv("SINGLE_FLIGHT_INGEST_TIMEOUT", 900)),  # Max wait for another upload's index
+    "poll_interval": float(os.getenv("SINGLE_FLIGHT_POLL_INTERVAL", 0.2)),  # Seconds between Redis lock checks
+    "lock_ttl": float(os.getenv("SINGLE_FLIGHT_LOCK_TTL", 30)),  # Redis lock lifetime, renewed while the leader runs
+}
+
+# Batch question answering (/ask_batch and ask_batch.py)
+BATCH_CONFIG = {
+    "llm_concurrency": int(os.getenv("BATCH_LLM_CONCURRENCY", 4)),  # LLM requests in flight per batch
+    "retrieval_chunk": int(os.getenv("BATCH_RETRIEVAL_CHUNK", 64)),  # Questions embedded/searched per retrieval pass
+    "max_questions": int(os.getenv("BATCH_MAX_QUESTIONS", 500)),  # Largest batch /ask_batch accepts
+}
+
+# Sharded retrieval tier (see retrieval/sharding.py)
+SHARDING_CONFIG = {
+    "enabled": os.getenv("SHARDING", "0") == "1",  # Serve loaded indexes' multi-level tier from shard processes
+    "num_shards": int(os.getenv("SHARDS", 4)),  # Shard processes per sharded index
+    "timeout": float(os.getenv("SHARD_TIMEOUT", 2.0)),  # Seconds to wait for shards before merging without the slow ones
+    "start_timeout": float(os.getenv("SHARD_START_TIMEOUT", 120)),  # Seconds for a shard to build its indexes and listen
+    "host": os.getenv("SHARD_HOST", "127.0.0.1"),  # Interface shards listen on
+    "retire_after": float(os.getenv("SHARD_RETIRE_AFTER", 30)),  # Seconds evicted shards keep serving in-flight queries
+}
+
+# Document affinity routing in front of the app workers (see affinity_router.py)
+ROUTING_CONFIG = {
+    # Backend base URLs, one per app server process, e.g. http://127.0.0.1:7861,http://127.0.0.1:7862
+    "backends": [b.strip().rstrip("/") for b in os.getenv("ROUTING_BACKENDS", "").split(",") if b.strip()],
+    "vnodes": int(os.getenv("ROUTING_VNODES", 160)),  # Virtual ring points per backend
+    "header": os.getenv("ROUTING_HEADER", "X-Document-Id"),  # Request header naming the document
+    "cookie": os.getenv("ROUTING_COOKIE", "rag_doc"),  # Cookie the apps set to the current document
+    "connect_timeout": float(os.getenv("ROUTING_CONNECT_TIMEOUT", 2)),  # Seconds; unreachable backends fail over
+    "read_timeout": float(os.getenv("ROUTING_READ_TIMEOUT", 600)),  # Seconds; uploads index the PDF in the request
+}
@@ -0,0 +1,67 @@
+# evaluation/metrics.py
+"""
+Ranking metrics for retrieval evaluation
+- Each retrieved item carries the set of chunk ids it covers (a RAPTOR
+  summary covers all of its leaf chunks)
+- Binary relevance: an item counts once, for gold chunks not already covered
+"""
+
+import math
+from typing import Dict, Iterable, List, Sequence, Set
+
+
+def _gains(retrieved: Sequence[Iterable[int]], gold: Set[int], k: int) -> List[int]:
+    """1 for each of the first k items that covers a new gold chunk, else 0."""
+    seen = set()
+    gains = []
+    for ids in retrieved[:k]:
+        new = (set(ids) & gold) - seen
+        seen |= new
+        gains.append(1 if new else 0)
+    return gains
+
+
+def recall_at_k(retrieved: Sequence[Iterable[int]], gold: Set[int], k: int) -> float:
+    """Fraction of gold chunks covered by the top k items."""
+    if not gold:
+        return 0.0
+    covered = set()
+    for ids in retrieved[:k]:
+        covered |= set(ids) & gold
+    return len(covered) / len(gold)
+
+
+def reciprocal_rank(retrieved: Sequence[Iterable[int]], gold: Set[int]) -> float:
+    """1 / rank of the first item covering a gold chunk (0 if none)."""
+    for rank, ids in enumerate(retrieved, 1):
+        if set(ids) & gold:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(retrieved: Sequence[Iterable[int]], gold: Set[int], k: int) -> float:
+    """Binary nDCG@k; the ideal ranking puts one gold chunk at each rank."""
+    if not gold:
+        return 0.0
+    dcg = sum(g / math.log2(rank + 1) for rank, g in enumerate(_gains(retrieved, gold, k), 1))
+    idcg = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(gold), k) + 1))
+    return dcg / idcg
+
+
+def score_ranking(retrieved: Sequence[Iterable[int]], gold: Set[int], k_values: Sequence[int]) -> Dict[str, float]:
+    """
+    All metrics for one query
+
+    Args:
+        retrieved: Chunk ids covered by each retrieved item, best first
+        gold: Relevant chunk ids
+        k_values: Cutoffs for recall and nDCG
+
+    Returns:
+        Dict like {"recall@5": ..., "ndcg@5": ..., "mrr": ...}
+    """
+    scores = {"mrr": reciprocal_rank(retrieved, gold)}
+    for k in k_values:
+        scores[f"recall@{k}"] = recall_at_k(retrieved, gold, k)
+        scores[f"ndcg@{k}"] = ndcg_at_k(retrieved, gold, k)
+    return scores
@@ -0,0 +1,415 @@
+# evaluation/retrieval_eval.py
+"""
+Retrieval quality evaluation across answer_question's retrieval modes
+- Labelled sets: (document, question, gold chunk ids or answer span)
+- Modes: semantic, hybrid, multi_level, raptor_collapsed, raptor_leaf
+- recall@k, MRR and nDCG@k side by side with retrieval latency
+- Fully offline: the LLM is stubbed and the QA cache is bypassed
+
+Dataset format (JSONL, one example per line):
+    {"document": "notes.pdf", "question": "...", "gold_chunk_ids": [3, 4]}
+    {"document": "notes.pdf", "question": "...", "answer": "exact answer span"}
+
+Chunk ids are the "chunk_id" metadata assigned at ingestion, so they are
+only meaningful for the chunking settings the set was labelled with.
+
+Usage:
+    python -m evaluation.retrieval_eval --dataset eval.jsonl
+    python -m evaluation.retrieval_eval --synthetic 200 --questions 50
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from evaluation.metrics import score_ranking
+
+logger = logging.getLogger(__name__)
+
+# Retrieval flags per mode, as passed to answer_question
+MODES = {
+    "semantic": {"use_hybrid": False, "use_multi_level": False, "use_raptor": False, "raptor_collapse_tree": True},
+    "hybrid": {"use_hybrid": True, "use_multi_level": False, "use_raptor": False, "raptor_collapse_tree": True},
+    "multi_level": {"use_hybrid": True, "use_multi_level": True, "use_raptor": False, "raptor_collapse_tree": True},
+    "raptor_collapsed": {"use_hybrid": True, "use_multi_level": False, "use_raptor": True, "raptor_collapse_tree": True},
+    "raptor_leaf": {"use_hybrid": True, "use_multi_level": False, "use_raptor": True, "raptor_collapse_tree": False},
+}
+DEFAULT_K_VALUES = (1, 3, 5, 10)
+
+
+@dataclass
+class EvalExample:
+    """
+    One labelled question
+
+    Attributes:
+        document: PDF path the question is about
+        question: Query text
+        gold_chunk_ids: Relevant chunk ids (resolved from answer if empty)
+        answer: Optional answer span; chunks containing it are relevant
+    """
+    document: str
+    question: str
+    gold_chunk_ids: List[int] = field(default_factory=list)
+    answer: Optional[str] = None
+
+
+def load_eval_set(path: str) -> List[EvalExample]:
+    """
+    Load a JSONL evaluation set
+
+    Args:
+        path: JSONL file path (relative document paths resolve against it)
+
+    Returns:
+        List of EvalExample
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+    examples = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            document = row["document"]
+            if not os.path.isabs(document):
+                document = os.path.join(base_dir, document)
+            examples.append(EvalExample(
+                document=document,
+                question=row["question"],
+                gold_chunk_ids=[int(i) for i in row.get("gold_chunk_ids", [])],
+                answer=row.get("answer")
+            ))
+    return examples
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class ChunkMapper:
+    """
+    Maps retrieved texts back to chunk ids
+
+    Chunk texts come from the FAISS docstore metadata. RAPTOR nodes map to
+    the leaf chunks beneath them (leaf node i is chunk i).
+    """
+
+    def __init__(self, vector_store, raptor_tree=None):
+        self.chunks: Dict[int, str] = {}
+        self.text_to_ids: Dict[str, Set[int]] = {}
+        for doc in vector_store.docstore._dict.values():
+            chunk_id = doc.metadata.get("chunk_id")
+            if chunk_id is None:
+                continue
+            self.chunks[chunk_id] = doc.page_content
+            self.text_to_ids.setdefault(doc.page_content, set()).add(chunk_id)
+
+        self.node_to_ids: Dict[str, Set[int]] = {}
+        if raptor_tree is not None:
+            for idx, node in enumerate(raptor_tree.nodes):
+                self.node_to_ids.setdefault(node.text, set()).update(self._leaves(raptor_tree, idx))
+
+    @staticmethod
+    def _leaves(raptor_tree, idx: int) -> Set[int]:
+        leaves = set()
+        stack = [idx]
+        while stack:
+            node_idx = stack.pop()
+            node = raptor_tree.nodes[node_idx]
+            if node.children:
+                stack.extend(node.children)
+            else:
+                leaves.add(node_idx)
+        return leaves
+
+    def ids_for(self, text: str, raptor: bool = False) -> Set[int]:
+        """Chunk ids covered by a retrieved text."""
+        if raptor and text in self.node_to_ids:
+            return self.node_to_ids[text]
+        return self.text_to_ids.get(text, set())
+
+    def resolve_gold(self, example: EvalExample) -> Set[int]:
+        """Gold chunk ids, or every chunk containing the answer span."""
+        if example.gold_chunk_ids:
+            return set(example.gold_chunk_ids)
+        if not example.answer:
+            return set()
+        span_text = _normalize(example.answer)
+        return {cid for cid, text in self.chunks.items() if span_text in _normalize(text)}
+
+
+def _summarize_ms(values: Sequence[float]) -> Dict[str, float]:
+    p50, p95 = np.percentile(values, [50, 95])
+    return {"mean": float(np.mean(values)), "p50": float(p50), "p95": float(p95)}
+
+
+def evaluate_document(
+    vector_store,
+    examples: List[EvalExample],
+    modes: Sequence[str] = tuple(MODES),
+    k_values: Sequence[int] = DEFAULT_K_VALUES,
+    multi_level_retriever=None,
+    raptor_tree=None,
+    end_to_end: bool = False
+) -> Dict[str, Dict]:
+    """
+    Score every mode on the examples of one document
+
+    Retrieval runs through rag_pipeline._retrieve_documents, the same code
+    answer_question uses. The query embedding is computed once per question
+    and shared across modes, so latency is retrieval only.
+
+    Args:
+        vector_store: FAISS store of the document
+        examples: Labelled questions for this document
+        modes: Subset of MODES
+        k_values: Cutoffs for recall and nDCG
+        multi_level_retriever: Needed for "multi_level"
+        raptor_tree: Needed for the RAPTOR modes
+        end_to_end: Also time answer_question (stubbed LLM, no QA cache)
+
+    Returns:
+        {mode: {"per_query": [...], "retrieval_ms": [...], "answer_ms": [...]}}
+        (modes whose retriever is missing are skipped, not scored as a fallback)
+    """
+    import rag_pipeline
+    from retrieval.query_context import build_query_context
+
+    missing = [
+        mode for mode in modes
+        if (MODES[mode]["use_multi_level"] and multi_level_retriever is None)
+        or (MODES[mode]["use_raptor"] and raptor_tree is None)
+    ]
+    if missing:
+        # _retrieve_documents would silently fall back to hybrid/FAISS under these labels
+        logger.warning(f"⚠️ Skipping {', '.join(missing)}: retriever not built for this index")
+        modes = [mode for mode in modes if mode not in missing]
+
+    mapper = ChunkMapper(vector_store, raptor_tree)
+    top_k = max(k_values)
+    results = {mode: {"per_query": [], "retrieval_ms": [], "answer_ms": []} for mode in modes}
+
+    for example in examples:
+        gold = mapper.resolve_gold(example)
+        if not gold:
+            logger.warning(f"⚠️ No gold chunks for question: {example.question[:60]}")
+            continue
+
+        query_context = build_query_context(
+            example.question,
+            vector_store.embedding_function,
+            normalized=rag_pipeline.enhance_query(example.question)
+        )
+
+        for mode in modes:
+            flags = MODES[mode]
+            start = time.perf_counter()
+            retrieved = rag_pipeline._retrieve_documents(
+                vector_store, query_context, top_k, flags["use_hybrid"],
+                multi_level_retriever, flags["use_multi_level"],
+                raptor_tree, flags["use_raptor"], flags["raptor_collapse_tree"]
+            )
+            results[mode]["retrieval_ms"].append((time.perf_counter() - start) * 1000)
+
+            is_raptor = flags["use_raptor"]
+            ranking = [mapper.ids_for(doc.page_content, raptor=is_raptor) for doc, _ in retrieved]
+            results[mode]["per_query"].append(score_ranking(ranking, gold, k_values))
+
+            if end_to_end:
+                start = time.perf_counter()
+                rag_pipeline.answer_question(
+                    vector_store, example.question, top_k=top_k, use_cache=False,
+                    multi_level_retriever=multi_level_retriever, raptor_tree=raptor_tree,
+                    **flags
+                )
+                results[mode]["answer_ms"].append((time.perf_counter() - start) * 1000)
+
+    return results
+
+
+def summarize_results(per_document: List[Dict[str, Dict]]) -> Dict[str, Dict]:
+    """Average metrics and summarize latency per mode over all documents."""
+    summary = {}
+    modes = {mode for results in per_document for mode in results}
+    for mode in sorted(modes, key=list(MODES).index):
+        per_query = [row for results in per_document for row in results.get(mode, {}).get("per_query", [])]
+        retrieval_ms = [v for results in per_document for v in results.get(mode, {}).get("retrieval_ms", [])]
+        answer_ms = [v for results in per_document for v in results.get(mode, {}).get("answer_ms", [])]
+        if not per_query:
+            continue
+        entry = {
+            "queries": len(per_query),
+            "metrics": {key: float(np.mean([row[key] for row in per_query])) for key in per_query[0]},
+            "retrieval_ms": _summarize_ms(retrieval_ms),
+        }
+        if answer_ms:
+            entry["answer_ms"] = _summarize_ms(answer_ms)
+        summary[mode] = entry
+    return summary
+
+
+def run_evaluation(
+    examples: List[EvalExample],
+    modes: Sequence[str] = tuple(MODES),
+    k_values: Sequence[int] = DEFAULT_K_VALUES,
+    rebuild: bool = False,
+    end_to_end: bool = False,
+    raptor_summarization: Optional[str] = None
+) -> Dict[str, Dict]:
+    """
+    Ingest each document once and evaluate all modes
+
+    Args:
+        examples: Labelled questions (any number of documents)
+        modes: Subset of MODES
+        k_values: Cutoffs for recall and nDCG
+        rebuild: Ignore cached <document>.pkl indexes
+        end_to_end: Also time answer_question
+        raptor_summarization: "abstractive" or "extractive" (default: RAPTOR_CONFIG)
+
+    Returns:
+        Per-mode summary from summarize_results
+    """
+    import rag_pipeline
+
+    need_multi_level = "multi_level" in modes
+    need_raptor = any(MODES[mode]["use_raptor"] for mode in modes)
+    index_options = {"raptor_summarization": raptor_summarization} if raptor_summarization else {}
+
+    by_document: Dict[str, List[EvalExample]] = {}
+    for example in examples:
+        by_document.setdefault(example.document, []).append(example)
+
+    per_document = []
+    for document, doc_examples in by_document.items():
+        logger.info(f"📂 Evaluating {len(doc_examples)} questions on {os.path.basename(document)}")
+        vector_store, mlr, raptor_tree = rag_pipeline.create_vectorstore_from_pdf(
+            document,
+            use_cache=not rebuild,
+            use_multi_level=need_multi_level,
+            use_raptor=need_raptor,
+            progressive=False,
+            **index_options
+        )
+        if vector_store is not None and not rebuild and (
+            (need_multi_level and mlr is None) or (need_raptor and raptor_tree is None)
+        ):
+            # Cached index built without these tiers (e.g. by /upload)
+            logger.info(f"🔧 Cached index of {os.path.basename(document)} lacks a needed retriever, rebuilding")
+            vector_store, mlr, raptor_tree = rag_pipeline.create_vectorstore_from_pdf(
+                document,
+                use_cache=False,
+                use_multi_level=need_multi_level,
+                use_raptor=need_raptor,
+                progressive=False,
+                **index_options
+            )
+        if vector_store is None:
+            logger.error(f"❌ Could not index {document}, skipping")
+            continue
+        per_document.append(evaluate_document(
+            vector_store, doc_examples, modes, k_values, mlr, raptor_tree, end_to_end
+        ))
+
+    return summarize_results(per_document)
+
+
+def synthetic_eval_set(pdf_path: str, paragraphs: List[str], n_questions: int, seed: int = 42, span_words: int = 8) -> List[EvalExample]:
+    """
+    Build an answer-span set for a synthetic PDF
+
+    Each question quotes a short word window from a random paragraph; every
+    chunk containing that window is relevant.
+    """
+    rng = random.Random(seed)
+    examples = []
+    for _ in range(n_questions):
+        words = rng.choice(paragraphs).split()
+        start = rng.randrange(max(1, len(words) - span_words))
+        answer = " ".join(words[start:start + span_words])
+        examples.append(EvalExample(
+            document=pdf_path,
+            question=f"What does the document say about {answer.rstrip('.')}?",
+            answer=answer
+        ))
+    return examples
+
+
+def print_summary(summary: Dict[str, Dict], k_values: Sequence[int]):
+    columns = [f"recall@{k}" for k in k_values] + ["mrr"] + [f"ndcg@{k}" for k in k_values]
+    header = f"{'mode':<18}" + "".join(f"{c:>10}" for c in columns) + f"{'ret p50':>10}{'ret p95':>10}"
+    print(header)
+    print("-" * len(header))
+    for mode, entry in summary.items():
+        row = f"{mode:<18}" + "".join(f"{entry['metrics'][c]:>10.3f}" for c in columns)
+        row += f"{entry['retrieval_ms']['p50']:>8.1f}ms{entry['retrieval_ms']['p95']:>8.1f}ms"
+        print(row)
+
+
+def main():
+    from benchmarks.common import install_stub_llm
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dataset", help="JSONL evaluation set")
+    source.add_argument("--synthetic", type=int, metavar="PARAGRAPHS", help="Generate a synthetic PDF of this size")
+    parser.add_argument("--questions", type=int, default=50, help="Questions for --synthetic")
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated subset of " + ",".join(MODES))
+    parser.add_argument("--k", default=",".join(map(str, DEFAULT_K_VALUES)), help="Comma-separated cutoffs")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore cached indexes")
+    parser.add_argument("--end-to-end", action="store_true", help="Also time answer_question with a stub LLM")
+    parser.add_argument("--raptor-summarization", choices=("abstractive", "extractive"),
+                        help="RAPTOR summaries for the raptor modes (use with --rebuild on cached indexes)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the summary as JSON")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {sorted(unknown)}")
+    k_values = sorted({int(k) for k in args.k.split(",") if k.strip()})
+
+    install_stub_llm(0.0)
+
+    if args.dataset:
+        summary = run_evaluation(
+            load_eval_set(args.dataset), modes, k_values, args.rebuild, args.end_to_end, args.raptor_summarization
+        )
+    else:
+        from benchmarks.synthetic_pdf import write_synthetic_pdf
+
+        # create_vectorstore_from_pdf pickles into the working directory
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory(prefix="rag-eval-") as workdir:
+            os.chdir(workdir)
+            try:
+                pdf_path = os.path.join(workdir, f"synthetic-{args.synthetic}.pdf")
+                paragraphs = write_synthetic_pdf(pdf_path, n_paragraphs=args.synthetic, seed=args.seed)
+                examples = synthetic_eval_set(pdf_path, paragraphs, args.questions, args.seed)
+                summary = run_evaluation(
+                    examples, modes, k_values, end_to_end=args.end_to_end, raptor_summarization=args.raptor_summarization
+                )
+            finally:
+                os.chdir(cwd)
+
+    print_summary(summary, k_values)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n📄 Summary written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# gunicorn.conf.py
+"""
+Gunicorn configuration
+- preload_app: the app, models and hot indexes load once in the master and
+  workers share those pages copy-on-write
+- Without preload, each worker loads its own models after boot
+- torch threads are split across workers after fork
+
+Usage:
+    gunicorn -c gunicorn.conf.py app_asgi:app
+    gunicorn -c gunicorn.conf.py -k sync app_flask:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '7860')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "uvicorn.workers.UvicornWorker")
+preload_app = os.getenv("PRELOAD_APP", "1") == "1"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 300))  # Uploads index the PDF in the request
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before workers fork
+    if server.cfg.preload_app:
+        from utils.preload import warm_up
+        warm_up(before_fork=True)
+
+
+def post_fork(server, worker):
+    from utils.preload import after_fork, worker_threads
+    after_fork(worker_threads(server.cfg.workers))
+
+
+def post_worker_init(worker):
+    # Without preload every worker loads its own copy
+    if not worker.cfg.preload_app:
+        from utils.preload import warm_up
+        warm_up(before_fork=False)
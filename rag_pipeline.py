@@ -19,36 +19,94 @@ if sys.platform == "win32":
             except Exception:
                 pass
 
-try:
-    import torch
-except Exception as e:
-    print(f"Early torch import failed in rag_pipeline: {e}")
+    # torch must load before transformers picks up conflicting DLLs; other
+    # platforms import it lazily with the model that needs it
+    try:
+        import torch
+    except Exception as e:
+        print(f"Early torch import failed in rag_pipeline: {e}")
 
+import asyncio
+import contextvars
+import functools
+import hashlib
 import pickle
+import queue
 import re
 import logging
-from typing import List, Tuple, Dict, Optional
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_community.vectorstores.faiss import FAISS
+import threading
+from collections import Counter
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator, List, Tuple, Dict, Optional
 from langchain_core.documents import Document
 from utils.pdf_loader import load_pdf
 from utils.chunking import chunk_text
 from utils.semantic_chunking import semantic_chunk_text, hybrid_chunk_text
-from utils.embedding import get_embedding_model
-from cache.redis_cache import get_cache
+from utils.embedding import get_embedding_model, with_micro_batching
+from utils.vector_storage import quantize_vector_store, search_by_vectors
+from config.index_config import VECTOR_STORAGE, RAPTOR_CONFIG, INDEX_STORAGE, PROGRESSIVE_INDEX_CONFIG
+from config.model_config import CONTEXT_CONFIG
+from config.server_config import SERVER_CONFIG, MICRO_BATCH_CONFIG, SINGLE_FLIGHT_CONFIG, BATCH_CONFIG, SHARDING_CONFIG
+from config.redis_config import SERIALIZATION_CONFIG
+from utils.tracing import span
+from utils.index_registry import get_index_registry
+from utils.index_tiers import (
+    get_tier_tracker, initial_tiers, tiers_of, unfinished_tiers, claim_upgrade, release_upgrade, renew_upgrade,
+    upgrade_in_progress, PENDING, BUILDING, READY, FAILED
+)
+from utils.single_flight import SingleFlight
 from retrieval.multi_level_retriever import create_multi_level_retriever
+from retrieval.query_context import QueryContext, build_query_context, build_query_contexts
+from retrieval.context_builder import build_context
+from retrieval.chunk_analysis import ChunkAnalysis, get_chunk_analysis, resolve_chunk_ids, tokenize
 from raptor.raptor_tree import create_raptor_tree
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize cache (will use MockCache if Redis not available)
-cache = get_cache(use_redis=True, ttl=86400)  # 24 hours TTL
-
-logger.info(f"✅ Cache initialized: {cache.__class__.__name__}")
-logger.info(f"📊 Cache stats: {cache.get_stats()}")
+# Cache is created on first use (served from memory while Redis is unavailable)
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_qa_cache():
+    """Shared answer cache, created on first use (24 hours TTL)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from cache.redis_cache import get_cache
+                _cache = get_cache(use_redis=True, ttl=86400)
+                logger.info(f"✅ Cache initialized: {_cache.__class__.__name__}")
+                logger.info(f"📊 Cache stats: {_cache.get_stats()}")
+    return _cache
+
+def _single_flight_redis():
+    """Redis client for cross-worker coalescing locks (None: in-process only)."""
+    if not SINGLE_FLIGHT_CONFIG["distributed"]:
+        return None
+    from cache.redis_cache import redis_client_of
+    return redis_client_of(get_qa_cache())
+
+# Identical in-flight questions / ingestions run once (keyed by cache key / index file)
+_answer_flight = SingleFlight(
+    "answer",
+    wait_timeout=SINGLE_FLIGHT_CONFIG["answer_timeout"],
+    redis_client_factory=_single_flight_redis,
+    poll_interval=SINGLE_FLIGHT_CONFIG["poll_interval"],
+    lock_ttl=SINGLE_FLIGHT_CONFIG["lock_ttl"]
+)
+_ingest_flight = SingleFlight(
+    "ingest",
+    wait_timeout=SINGLE_FLIGHT_CONFIG["ingest_timeout"],
+    redis_client_factory=_single_flight_redis,
+    poll_interval=SINGLE_FLIGHT_CONFIG["poll_interval"],
+    lock_ttl=SINGLE_FLIGHT_CONFIG["lock_ttl"]
+)
+
+def get_single_flight_stats() -> List[Dict]:
+    return [_answer_flight.get_stats(), _ingest_flight.get_stats()]
 
 # -------------------- Text QA Model (OpenRouter with fallback) --------------------
 # List of free models to try (covering different providers to avoid shared limits)
@@ -63,6 +121,8 @@ import time as _time
 
 def get_llm(model_name=None):
     """Create an LLM instance for the given model."""
+    from langchain_openai import ChatOpenAI
+
     return ChatOpenAI(
         openai_api_base="https://openrouter.ai/api/v1",
         openai_api_key=os.getenv("OPENROUTER_API_KEY"),
@@ -77,8 +137,13 @@ def get_llm(model_name=None):
         max_retries=0 # We handle retries manually
     )
 
-# Default LLM
-llm = get_llm()
+def __getattr__(name):
+    # Module-level `cache` and `llm` used to be built at import time
+    if name == "cache":
+        return get_qa_cache()
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # -------------------- Query Enhancement --------------------
 def enhance_query(query: str) -> str:
@@ -107,23 +172,47 @@ def enhance_query(query: str) -> str:
     return query
 
 # -------------------- Hybrid Search --------------------
-def hybrid_search(vector_store, query: str, top_k: int = 4) -> List[Tuple[Document, float]]:
+def hybrid_search(
+    vector_store,
+    query: str,
+    top_k: int = 4,
+    query_context: Optional[QueryContext] = None
+) -> List[Tuple[Document, float]]:
     """
     Hybrid search combining:
     1. Semantic search (vector similarity)
     2. Keyword matching (BM25-like)
     """
+    if query_context is None:
+        query_context = build_query_context(query, vector_store.embedding_function)
+
     # Semantic search with scores
-    semantic_results = vector_store.similarity_search_with_score(query, k=top_k * 2)
+    with span("retrieval.faiss"):
+        semantic_results = vector_store.similarity_search_with_score_by_vector(
+            query_context.embedding.tolist(), k=top_k * 2
+        )
+
+    return _boost_keyword_matches(vector_store, query_context, semantic_results, top_k)
 
+def _boost_keyword_matches(
+    vector_store,
+    query_context: QueryContext,
+    semantic_results: List[Tuple[Document, float]],
+    top_k: int
+) -> List[Tuple[Document, float]]:
+    """Keyword half of hybrid_search: boost semantic hits that contain query words."""
     # Keyword boosting: if query words appear in chunk, boost its score
-    query_words = set(query.lower().split())
+    query_words = set(query_context.tokens)
+    docs = [doc for doc, _ in semantic_results]
+    overlaps = _per_chunk_scores(
+        docs,
+        get_chunk_analysis(vector_store),
+        lambda analysis, ids: analysis.keyword_overlap(ids, query_words),
+        lambda doc: len(query_words.intersection(doc.page_content.lower().split()))
+    )
     boosted_results = []
 
-    for doc, score in semantic_results:
-        doc_words = set(doc.page_content.lower().split())
-        overlap = len(query_words.intersection(doc_words))
-
+    for (doc, score), overlap in zip(semantic_results, overlaps):
         # Boost score if keywords match (lower score = better in FAISS)
         keyword_boost = overlap * 0.05
         adjusted_score = score - keyword_boost
@@ -134,23 +223,76 @@ def hybrid_search(vector_store, query: str, top_k: int = 4) -> List[Tuple[Docume
     boosted_results.sort(key=lambda x: x[1])
     return boosted_results[:top_k]
 
+def _per_chunk_scores(
+    docs: List[Document],
+    analysis: Optional[ChunkAnalysis],
+    indexed,
+    fallback,
+    chunk_ids: Optional[np.ndarray] = None,
+    vector_store=None
+) -> np.ndarray:
+    """
+    Score documents from the ingestion-time analysis where possible
+
+    Args:
+        docs: Retrieved documents
+        analysis: Chunk analysis of the index (None = fallback for all)
+        indexed: (analysis, chunk_ids) → scores, vectorized over the chunks
+        fallback: doc → score, for documents that are not chunks (e.g. summaries)
+        chunk_ids: Precomputed chunk_id per document
+        vector_store: Resolves chunk ids of documents without metadata
+    """
+    scores = np.zeros(len(docs))
+    if analysis is None:
+        known = np.zeros(len(docs), dtype=bool)
+    else:
+        if chunk_ids is None:
+            chunk_ids = resolve_chunk_ids(docs, vector_store)
+        known = analysis.valid(chunk_ids)
+        if known.any():
+            scores[known] = indexed(analysis, chunk_ids[known])
+    for i in np.flatnonzero(~known):
+        scores[i] = fallback(docs[i])
+    return scores
+
 # -------------------- Context Reranking --------------------
-def rerank_contexts(query: str, docs_with_scores: List[Tuple[Document, float]]) -> List[Document]:
+def rerank_contexts(
+    query: str,
+    docs_with_scores: List[Tuple[Document, float]],
+    analysis: Optional[ChunkAnalysis] = None,
+    chunk_ids: Optional[np.ndarray] = None,
+    vector_store=None
+) -> List[Document]:
     """
     Rerank retrieved documents based on:
     - Similarity score
     - Query term frequency
     - Document position diversity
+
+    With the index's chunk analysis, term frequency counts whole tokens
+    from precomputed counts; without it, substrings of the text.
     """
     query_terms = query.lower().split()
-    reranked = []
+    docs = [doc for doc, _ in docs_with_scores]
 
-    for doc, score in docs_with_scores:
-        content_lower = doc.page_content.lower()
+    def token_tf(doc):
+        counts = Counter(tokenize(doc.page_content))
+        return sum(counts[term] for term in query_terms)
 
+    if analysis is None:
         # Calculate term frequency score
-        tf_score = sum(content_lower.count(term) for term in query_terms)
+        tf_scores = [sum(doc.page_content.lower().count(term) for term in query_terms) for doc in docs]
+    else:
+        tf_scores = _per_chunk_scores(
+            docs, analysis,
+            lambda analysis, ids: analysis.term_frequency(ids, query_terms),
+            token_tf,
+            chunk_ids=chunk_ids,
+            vector_store=vector_store
+        )
 
+    reranked = []
+    for (doc, score), tf_score in zip(docs_with_scores, tf_scores):
         # Combined score (lower is better for FAISS distance)
         combined_score = score - (tf_score * 0.02)
 
@@ -162,15 +304,22 @@ def rerank_contexts(query: str, docs_with_scores: List[Tuple[Document, float]])
     return [doc for doc, _ in reranked]
 
 # -------------------- Answer Verification --------------------
-def verify_answer(answer: str, context: str, query: str) -> Tuple[str, float]:
+def verify_answer(
+    answer: str,
+    context: str,
+    query: str,
+    grounding: Optional[Tuple[ChunkAnalysis, np.ndarray]] = None
+) -> Tuple[str, float]:
     """
     Verify answer quality and add confidence score:
     - Check if answer is grounded in context
     - Detect hallucinations
     - Calculate confidence
+
+    grounding: (chunk analysis, term ids of the context's chunks); when
+    given, the context is not re-tokenized
     """
     answer_lower = answer.lower()
-    context_lower = context.lower()
 
     # Check for common hallucination patterns
     hallucination_phrases = [
@@ -181,12 +330,17 @@ def verify_answer(answer: str, context: str, query: str) -> Tuple[str, float]:
     is_uncertain = any(phrase in answer_lower for phrase in hallucination_phrases)
 
     # Calculate confidence based on answer-context overlap
-    answer_words = set(answer_lower.split())
-    context_words = set(context_lower.split())
-    overlap = len(answer_words.intersection(context_words))
+    if grounding is not None:
+        analysis, context_terms = grounding
+        overlap, n_answer_words = analysis.grounding(answer, context_terms)
+    else:
+        answer_words = set(answer_lower.split())
+        context_words = set(context.lower().split())
+        overlap = len(answer_words.intersection(context_words))
+        n_answer_words = len(answer_words)
 
-    if len(answer_words) > 0:
-        confidence = min(overlap / len(answer_words), 1.0)
+    if n_answer_words > 0:
+        confidence = min(overlap / n_answer_words, 1.0)
     else:
         confidence = 0.0
 
@@ -218,6 +372,40 @@ def extract_key_facts(context: str) -> List[str]:
     return facts[:5]  # Top 5 facts
 
 # -------------------- Vector Store Creation --------------------
+def _attach_chunk_analysis(vector_store, analysis: Optional[ChunkAnalysis]):
+    """Make the ingestion-time chunk statistics available to the query-time scorers."""
+    if vector_store is not None and analysis is not None:
+        vector_store.chunk_analysis = analysis
+
+def _attach_micro_batching(vector_store, raptor_tree):
+    """Route query embeddings through the shared micro-batcher (not persisted)."""
+    if not MICRO_BATCH_CONFIG["enabled"]:
+        return
+    if vector_store is not None:
+        vector_store.embedding_function = with_micro_batching(vector_store.embedding_function)
+    if raptor_tree is not None:
+        raptor_tree.embedding_model = with_micro_batching(raptor_tree.embedding_model)
+
+def _embed_chunks(texts: List[str], embedding_model) -> np.ndarray:
+    """Embed chunk texts, reusing embeddings cached by earlier ingestions (bulk get/set)."""
+    if not SERIALIZATION_CONFIG["ingest_embeddings"]:
+        return np.asarray(embedding_model.embed_documents(texts), dtype=np.float32)
+
+    cache = get_qa_cache()
+    namespace = f"{getattr(embedding_model, 'model_name', '')}:{getattr(embedding_model, 'backend', '')}"
+    embeddings = cache.get_embeddings_many(texts, namespace)
+    missing = [i for i, vector in enumerate(embeddings) if vector is None]
+
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        fresh = np.asarray(embedding_model.embed_documents(missing_texts), dtype=np.float32)
+        cache.cache_embeddings_many(missing_texts, fresh, namespace)
+        for i, vector in zip(missing, fresh):
+            embeddings[i] = vector
+
+    logger.info(f"📦 Reused {len(texts) - len(missing)}/{len(texts)} cached chunk embeddings")
+    return np.vstack(embeddings)
+
 def create_vectorstore_from_pdf(
     pdf_path: str,
     chunk_size: int = 800,
@@ -225,7 +413,12 @@ def create_vectorstore_from_pdf(
     use_semantic_chunking: bool = False,
     use_multi_level: bool = False,
     use_raptor: bool = False,
-    raptor_max_levels: int = 3
+    raptor_max_levels: int = 3,
+    vector_storage: str = VECTOR_STORAGE["type"],
+    raptor_embedding_dtype: str = RAPTOR_CONFIG["embedding_dtype"],
+    raptor_summarization: str = RAPTOR_CONFIG["summarization"],
+    index_dir: str = INDEX_STORAGE["dir"],
+    progressive: bool = PROGRESSIVE_INDEX_CONFIG["enabled"]
 ):
     """
     Create vector store with all Phase features:
@@ -241,38 +434,189 @@ def create_vectorstore_from_pdf(
     Phase 3:
     - RAPTOR tree (hierarchical retrieval)
     - Multi-level summarization
+    
+    Storage:
+    - vector_storage: "flat", "sq8" or "pq" FAISS codes (see config/index_config.py)
+    - raptor_embedding_dtype: "float32" or "float16" RAPTOR node embeddings
+    - raptor_summarization: "abstractive" (FLAN-T5) or "extractive" RAPTOR summaries
+    - index_dir: Directory of the <pdf name>.pkl index ("" = current directory)
+    
+    Progressive indexing:
+    - progressive: return as soon as the FAISS tier is built and saved;
+      multi-level and RAPTOR are built in the background and swapped into
+      the index registry when ready (see get_index_status)
+    
+    Concurrent calls for the same PDF (in this or another worker) build it once.
+    """
+    vector_store_file = index_file_path(pdf_path, index_dir)
+
+    if use_cache:
+        loaded = get_index_registry().get(vector_store_file)
+        if loaded is not None:
+            return loaded
+        if os.path.exists(vector_store_file):
+            return _load_index_file(vector_store_file)
+
+    build = functools.partial(
+        _build_index, pdf_path, vector_store_file, chunk_size, use_semantic_chunking,
+        use_multi_level, use_raptor, raptor_max_levels, vector_storage, raptor_embedding_dtype,
+        raptor_summarization, progressive
+    )
+    if not SINGLE_FLIGHT_CONFIG["enabled"]:
+        return build()
+
+    # Concurrent uploads of the same PDF build its index once
+    started = _time.time()
+
+    def built_elsewhere():
+        # Index another worker wrote while we waited for its lock
+        try:
+            if os.path.getmtime(vector_store_file) >= started:
+                return _load_index_file(vector_store_file)
+        except OSError:
+            pass
+        return None
+
+    return _ingest_flight.do(os.path.abspath(vector_store_file), build, recheck=built_elsewhere)
+
+def _attach_index_file(vector_store, vector_store_file: str):
+    """Remember which index file a vector store came from (to find its upgraded tiers)."""
+    if vector_store is not None:
+        vector_store.index_file = os.path.abspath(vector_store_file)
+
+def _load_index_file(vector_store_file: str):
+    """Load a pickled index and register it (returns the 3-tuple)."""
+    with span("index.pickle_load"), open(vector_store_file, "rb") as f:
+        data = pickle.load(f)
+    if isinstance(data, dict):
+        vector_store = data.get("vector_store")
+        multi_level_retriever = data.get("multi_level_retriever")
+        raptor_tree = data.get("raptor_tree")
+    else:
+        # Compatibility for old format (direct FAISS object)
+        vector_store = data
+        multi_level_retriever = None
+        raptor_tree = None
+    logger.info("✅ Loaded cached vector store")
+    if isinstance(data, dict):
+        _attach_chunk_analysis(vector_store, data.get("chunk_analysis"))
+    _attach_micro_batching(vector_store, raptor_tree)
+    _attach_index_file(vector_store, vector_store_file)
+    tiers = data.get("tiers") if isinstance(data, dict) else None
+    get_tier_tracker().load(os.path.abspath(vector_store_file), tiers or tiers_of(multi_level_retriever, raptor_tree))
+    indexes = _register_indexes(vector_store_file, vector_store, multi_level_retriever, raptor_tree)
+    if tiers and unfinished_tiers(tiers):
+        _resume_upgrade(vector_store_file, data, vector_store)
+    return indexes
+
+def _register_indexes(vector_store_file: str, vector_store, multi_level_retriever, raptor_tree) -> tuple:
+    """
+    Register loaded indexes and return the tuple to serve
+
+    With SHARDING on, the multi-level tier is served by a ShardedRetriever
+    over the vector store's chunks. The pickle keeps the local retriever;
+    re-registering the same tier (e.g. when RAPTOR is published) reuses
+    the running shards.
+    """
+    registry = get_index_registry()
+    if SHARDING_CONFIG["enabled"] and vector_store is not None and multi_level_retriever is not None:
+        if registry.max_entries <= 0:
+            logger.warning("⚠️ Sharding needs the index registry (INDEX_REGISTRY_SIZE > 0); serving locally")
+        else:
+            multi_level_retriever = _sharded_tier(vector_store_file, vector_store, multi_level_retriever)
+    indexes = (vector_store, multi_level_retriever, raptor_tree)
+    registry.put(vector_store_file, indexes)
+    return indexes
+
+def _sharded_tier(vector_store_file: str, vector_store, multi_level_retriever):
+    """Shard retriever standing in for a multi-level retriever (the local one if shards fail to start)."""
+    from retrieval.sharding import create_sharded_retriever
+
+    live = get_index_registry().peek(vector_store_file)
+    if live is not None and getattr(live[1], "local_retriever", None) is multi_level_retriever:
+        return live[1]
+    try:
+        with span("index.shard_start"):
+            sharded = create_sharded_retriever(vector_store, use_reranker=multi_level_retriever.use_reranker)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not start shards for {os.path.basename(vector_store_file)}, serving locally: {e}")
+        return multi_level_retriever
+    sharded.local_retriever = multi_level_retriever
+    return sharded
+
+def _resume_upgrade(vector_store_file: str, data: dict, vector_store):
     """
+    Finish the background tiers of a progressive index whose upgrade died
+    with its process (deploy, OOM, worker recycle)
+
+    Skipped while an upgrade holds the index's lease, here or in another
+    process; of several processes loading an orphaned index, one resumes it.
+    """
+    key = os.path.abspath(vector_store_file)
+    tracker = get_tier_tracker()
+    status = tracker.get_status(key)
+    if status is not None and status["upgrading"]:
+        return
+    lease = claim_upgrade(vector_store_file, PROGRESSIVE_INDEX_CONFIG["lease_stale_after"])
+    if lease is None:
+        return
+
+    tiers = dict(data["tiers"])
+    unfinished = unfinished_tiers(tiers)
+    for tier in unfinished:
+        tiers[tier] = PENDING
+    # The pickle has no chunk list; the docstore holds every chunk by id
+    documents = sorted(vector_store.docstore._dict.values(), key=lambda doc: doc.metadata.get("chunk_id", 0))
+    settings = {**_default_build_settings(), **data.get("build_settings", {})}
+    logger.info(f"♻️ Resuming unfinished {', '.join(unfinished)} tier(s) of {os.path.basename(vector_store_file)}")
+    generation = tracker.start(key, tiers)
+    _get_upgrade_executor().submit(
+        _upgrade_index, vector_store_file, generation, os.path.getmtime(vector_store_file),
+        vector_store, [doc.page_content for doc in documents], data.get("chunk_analysis"), get_embedding_model(),
+        "multi_level" in unfinished, "raptor" in unfinished, settings["raptor_max_levels"],
+        settings["raptor_embedding_dtype"], settings["raptor_summarization"], lease,
+        multi_level_retriever=data.get("multi_level_retriever")
+    )
+
+def _default_build_settings() -> dict:
+    """Background tier settings for pickles saved before they were recorded."""
+    return {
+        "raptor_max_levels": 3,
+        "raptor_embedding_dtype": RAPTOR_CONFIG["embedding_dtype"],
+        "raptor_summarization": RAPTOR_CONFIG["summarization"],
+    }
+
+def _build_index(
+    pdf_path: str,
+    vector_store_file: str,
+    chunk_size: int,
+    use_semantic_chunking: bool,
+    use_multi_level: bool,
+    use_raptor: bool,
+    raptor_max_levels: int,
+    vector_storage: str,
+    raptor_embedding_dtype: str,
+    raptor_summarization: str = RAPTOR_CONFIG["summarization"],
+    progressive: bool = False
+):
+    """Ingest a PDF: chunk, embed, build retrievers and pickle them to vector_store_file."""
     pdf_name = os.path.basename(pdf_path)
-    vector_store_file = f"{pdf_name}.pkl"
-
-    if use_cache and os.path.exists(vector_store_file):
-        with open(vector_store_file, "rb") as f:
-            data = pickle.load(f)
-            if isinstance(data, dict):
-                vector_store = data.get("vector_store")
-                multi_level_retriever = data.get("multi_level_retriever")
-                raptor_tree = data.get("raptor_tree")
-            else:
-                # Compatibility for old format (direct FAISS object)
-                vector_store = data
-                multi_level_retriever = None
-                raptor_tree = None
-            logger.info("✅ Loaded cached vector store")
-            return vector_store, multi_level_retriever, raptor_tree
     logger.info(f"📂 Loading PDF: {pdf_name}")
-    text = load_pdf(pdf_path)
+    with span("ingest.pdf_load"):
+        text = load_pdf(pdf_path)
     
     if not text or len(text.strip()) < 10:
         logger.error(f"❌ Failed to extract text from {pdf_name}. PDF might be empty or a scan.")
         return None, None, None
 
     # Phase 2A: Semantic chunking
-    if use_semantic_chunking:
-        logger.info("🔧 Using semantic chunking...")
-        chunks = hybrid_chunk_text(text, use_semantic=True)
-    else:
-        logger.info("🔧 Using recursive chunking...")
-        chunks = chunk_text(text, chunk_size=chunk_size, chunk_overlap=200)
+    with span("ingest.chunking"):
+        if use_semantic_chunking:
+            logger.info("🔧 Using semantic chunking...")
+            chunks = hybrid_chunk_text(text, use_semantic=True)
+        else:
+            logger.info("🔧 Using recursive chunking...")
+            chunks = chunk_text(text, chunk_size=chunk_size, chunk_overlap=200)
     
     if not chunks:
         logger.error(f"❌ No chunks created for {pdf_name}.")
@@ -280,6 +624,11 @@ def create_vectorstore_from_pdf(
 
     logger.info(f"📦 Created {len(chunks)} chunks")
 
+    # Token ids, term counts and sentence offsets per chunk, for query-time scoring
+    with span("ingest.chunk_analysis"):
+        chunk_analysis = ChunkAnalysis(chunks)
+    logger.info(f"📊 Chunk analysis: {chunk_analysis.get_stats()}")
+
     # Add metadata to chunks
     documents = []
     for i, chunk in enumerate(chunks):
@@ -295,58 +644,595 @@ def create_vectorstore_from_pdf(
 
     # Create vector store with BGE-Large embeddings
     try:
+        from langchain_community.vectorstores.faiss import FAISS
+
         logger.info("🔧 Creating embeddings with BGE-Large...")
         embedding_model = get_embedding_model()
-        vector_store = FAISS.from_documents(documents, embedding_model)
+        with span("ingest.embed_faiss"):
+            texts = [doc.page_content for doc in documents]
+            embeddings = _embed_chunks(texts, embedding_model)
+            vector_store = FAISS.from_embeddings(
+                list(zip(texts, embeddings)),
+                embedding_model,
+                metadatas=[doc.metadata for doc in documents]
+            )
     except Exception as e:
         logger.error(f"❌ FAISS creation failed: {e}")
         return None, None, None
     
+    if vector_storage != "flat":
+        try:
+            logger.info(f"🔧 Compressing chunk vectors ({vector_storage})...")
+            with span("ingest.quantize"):
+                quantize_vector_store(vector_store, storage=vector_storage)
+        except Exception as e:
+            logger.warning(f"⚠️ Vector compression failed, keeping flat index: {e}")
+    
+    tiers = initial_tiers(use_multi_level, use_raptor)
+    index_key = os.path.abspath(vector_store_file)
+
+    if progressive and (use_multi_level or use_raptor):
+        # Serve the FAISS tier now; multi-level and RAPTOR follow in the background.
+        # The lease marks the upgrade as running, so other processes loading the
+        # pickle don't resume it (they do if this process dies first)
+        lease = claim_upgrade(vector_store_file, PROGRESSIVE_INDEX_CONFIG["lease_stale_after"], force=True)
+        if _save_index_file(vector_store_file, {
+            "vector_store": vector_store,
+            "multi_level_retriever": None,
+            "raptor_tree": None,
+            "chunk_analysis": chunk_analysis,
+            "tiers": tiers,
+            "build_settings": {
+                "raptor_max_levels": raptor_max_levels,
+                "raptor_embedding_dtype": raptor_embedding_dtype,
+                "raptor_summarization": raptor_summarization,
+            }
+        }):
+            generation = get_tier_tracker().start(index_key, tiers)
+            _attach_chunk_analysis(vector_store, chunk_analysis)
+            _attach_micro_batching(vector_store, None)
+            _attach_index_file(vector_store, vector_store_file)
+            get_index_registry().put(vector_store_file, (vector_store, None, None))
+            _get_upgrade_executor().submit(
+                _upgrade_index, vector_store_file, generation, os.path.getmtime(vector_store_file),
+                vector_store, chunks, chunk_analysis, embedding_model,
+                use_multi_level, use_raptor, raptor_max_levels, raptor_embedding_dtype, raptor_summarization, lease
+            )
+            logger.info(f"✅ FAISS tier live for {pdf_name}; building the remaining tiers in the background")
+            return vector_store, None, None
+        release_upgrade(vector_store_file, lease)
+        logger.warning("⚠️ Could not save the FAISS tier, building all tiers before serving")
+
     # Phase 2B: Multi-level retriever
     multi_level_retriever = None
     if use_multi_level:
-        logger.info("🔧 Building multi-level retriever...")
         try:
-            multi_level_retriever = create_multi_level_retriever(
-                documents=[doc.page_content for doc in documents],
-                vector_store=vector_store,
-                use_reranker=True
-            )
+            multi_level_retriever = _build_multi_level(chunks, vector_store)
+            tiers["multi_level"] = READY
         except Exception as e:
             logger.warning(f"⚠️ Multi-level retriever building failed: {e}")
+            tiers["multi_level"] = FAILED
     
     # Phase 3: RAPTOR tree
     raptor_tree = None
     if use_raptor:
-        logger.info("🔧 Building RAPTOR tree...")
         try:
-            raptor_tree = create_raptor_tree(
-                texts=chunks,
-                embedding_model=embedding_model,
-                max_levels=raptor_max_levels
+            raptor_tree = _build_raptor(
+                chunks, embedding_model, raptor_max_levels, raptor_embedding_dtype, raptor_summarization
             )
-            
-            # Log tree stats
-            stats = raptor_tree.get_tree_stats()
-            logger.info(f"📊 RAPTOR tree stats: {stats}")
+            tiers["raptor"] = READY
         except Exception as e:
             logger.warning(f"⚠️ RAPTOR tree building failed: {e}")
+            tiers["raptor"] = FAILED
+
+    saved = _save_index_file(vector_store_file, {
+        "vector_store": vector_store,
+        "multi_level_retriever": multi_level_retriever,
+        "raptor_tree": raptor_tree,
+        "chunk_analysis": chunk_analysis,
+        "tiers": tiers
+    })
+    if saved and raptor_tree is not None:
+        # The pickle now holds the tree; its build checkpoints are no longer needed
+        raptor_tree.clear_checkpoint()
+
+    get_tier_tracker().start(index_key, tiers)
+    _attach_chunk_analysis(vector_store, chunk_analysis)
+    _attach_micro_batching(vector_store, raptor_tree)
+    _attach_index_file(vector_store, vector_store_file)
+    if saved:
+        return _register_indexes(vector_store_file, vector_store, multi_level_retriever, raptor_tree)
 
-    # Cache
+    return vector_store, multi_level_retriever, raptor_tree
+
+def _build_multi_level(chunks: List[str], vector_store):
+    """Phase 2B: BM25 + FAISS + reranker retriever over the chunks."""
+    logger.info("🔧 Building multi-level retriever...")
+    with span("ingest.multi_level"):
+        return create_multi_level_retriever(
+            documents=chunks,
+            vector_store=vector_store,
+            use_reranker=True
+        )
+
+def _build_raptor(
+    chunks: List[str],
+    embedding_model,
+    raptor_max_levels: int,
+    raptor_embedding_dtype: str,
+    raptor_summarization: str = RAPTOR_CONFIG["summarization"]
+):
+    """Phase 3: RAPTOR tree over the chunks."""
+    logger.info("🔧 Building RAPTOR tree...")
+    with span("ingest.raptor"):
+        raptor_tree = create_raptor_tree(
+            texts=chunks,
+            embedding_model=embedding_model,
+            max_levels=raptor_max_levels,
+            embedding_dtype=raptor_embedding_dtype,
+            summarization=raptor_summarization
+        )
+    
+    # Log tree stats
+    stats = raptor_tree.get_tree_stats()
+    logger.info(f"📊 RAPTOR tree stats: {stats}")
+    return raptor_tree
+
+def _save_index_file(vector_store_file: str, payload: dict) -> bool:
+    """Pickle an index payload; True if written."""
+    # Written to a temp file and renamed, so other workers never read a partial pickle
+    tmp_file = f"{vector_store_file}.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
-        with open(vector_store_file, "wb") as f:
-            pickle.dump({
-                "vector_store": vector_store,
-                "multi_level_retriever": multi_level_retriever,
-                "raptor_tree": raptor_tree
-            }, f)
-        logger.info("✅ Vector store created and cached with RAPTOR tree")
+        os.makedirs(os.path.dirname(vector_store_file) or ".", exist_ok=True)
+        with span("index.pickle_save"), open(tmp_file, "wb") as f:
+            pickle.dump(payload, f)
+        os.replace(tmp_file, vector_store_file)
+        logger.info(f"✅ Vector store cached ({', '.join(t for t, state in payload['tiers'].items() if state == READY)})")
+        return True
     except Exception as e:
         logger.error(f"❌ Failed to cache vector store: {e}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return False
+
+# -------------------- Progressive Indexing --------------------
+_upgrade_executor = None
+# Serializes publishing an upgraded tier with evict_index (a re-upload must not be overwritten)
+_publish_lock = threading.Lock()
+
+def _get_upgrade_executor() -> ThreadPoolExecutor:
+    """Background pool that builds the multi-level and RAPTOR tiers."""
+    global _upgrade_executor
+    if _upgrade_executor is None:
+        _upgrade_executor = ThreadPoolExecutor(
+            max_workers=PROGRESSIVE_INDEX_CONFIG["workers"],
+            thread_name_prefix="index-upgrade"
+        )
+    return _upgrade_executor
+
+def reset_upgrade_executor():
+    """Forget the upgrade pool (its threads do not survive a fork)."""
+    global _upgrade_executor
+    _upgrade_executor = None
+
+def _upgrade_index(
+    vector_store_file: str,
+    generation: int,
+    saved_mtime: float,
+    vector_store,
+    chunks: List[str],
+    chunk_analysis: ChunkAnalysis,
+    embedding_model,
+    use_multi_level: bool,
+    use_raptor: bool,
+    raptor_max_levels: int,
+    raptor_embedding_dtype: str,
+    raptor_summarization: str,
+    lease: str,
+    multi_level_retriever=None
+):
+    """
+    Build the slower tiers of an index already serving FAISS, one at a time
 
-    return vector_store, multi_level_retriever, raptor_tree
+    After each tier: re-save the pickle (so other workers reload it) and
+    swap the upgraded tuple into the registry. Stops publishing if the PDF
+    was re-indexed meanwhile, here (generation) or by another worker (the
+    pickle changed since our last save). The upgrade lease is released at
+    the end, whatever happened.
+    """
+    key = os.path.abspath(vector_store_file)
+    tracker = get_tier_tracker()
+    # A resumed upgrade keeps the tiers that were already finished
+    indexes = {"multi_level": multi_level_retriever, "raptor": None}
+    build_settings = {
+        "raptor_max_levels": raptor_max_levels,
+        "raptor_embedding_dtype": raptor_embedding_dtype,
+        "raptor_summarization": raptor_summarization,
+    }
+    builders = (
+        ("multi_level", use_multi_level, lambda: _build_multi_level(chunks, vector_store)),
+        ("raptor", use_raptor, lambda: _build_raptor(
+            chunks, embedding_model, raptor_max_levels, raptor_embedding_dtype, raptor_summarization
+        )),
+    )
+    try:
+        for tier, enabled, build in builders:
+            if not enabled:
+                continue
+            if not tracker.set(key, generation, tier, BUILDING):
+                return
+            error = None
+            try:
+                indexes[tier] = build()
+            except Exception as e:
+                logger.warning(f"⚠️ Background {tier} build failed for {os.path.basename(vector_store_file)}: {e}")
+                error = f"{type(e).__name__}: {e}"
+
+            with _publish_lock:
+                if not tracker.is_current(key, generation):
+                    logger.info(f"🗑️ {os.path.basename(vector_store_file)} was re-indexed, dropping its {tier} tier")
+                    return
+                try:
+                    changed = os.path.getmtime(vector_store_file) != saved_mtime
+                except OSError:
+                    changed = True
+                if changed:
+                    logger.info(f"🗑️ {os.path.basename(vector_store_file)} changed on disk, dropping its {tier} tier")
+                    tracker.forget(key)
+                    return
+                tiers = tracker.tiers(key)
+                tiers[tier] = FAILED if error else READY
+                # Failures are saved too, so a later load does not resume the tier again.
+                # If saving fails this process still serves the tier; other workers keep the old pickle
+                if _save_index_file(vector_store_file, {
+                    "vector_store": vector_store,
+                    "multi_level_retriever": indexes["multi_level"],
+                    "raptor_tree": indexes["raptor"],
+                    "chunk_analysis": chunk_analysis,
+                    "tiers": tiers,
+                    "build_settings": build_settings
+                }):
+                    saved_mtime = os.path.getmtime(vector_store_file)
+                    if tier == "raptor" and not error:
+                        indexes["raptor"].clear_checkpoint()
+                renew_upgrade(vector_store_file, lease)
+                if error:
+                    tracker.set(key, generation, tier, FAILED, error=error)
+                    continue
+                if tier == "raptor":
+                    _attach_micro_batching(None, indexes["raptor"])
+                _register_indexes(vector_store_file, vector_store, indexes["multi_level"], indexes["raptor"])
+                tracker.set(key, generation, tier, READY)
+            logger.info(f"✅ {tier} tier live for {os.path.basename(vector_store_file)}")
+    finally:
+        tracker.finish(key, generation)
+        release_upgrade(vector_store_file, lease)
+
+def _live_indexes(vector_store, multi_level_retriever, raptor_tree):
+    """
+    Best retrievers currently available for a vector store
+
+    Callers holding the tuple returned while tiers were still building get
+    the tiers that have gone live since (same index build only).
+    """
+    if multi_level_retriever is not None and raptor_tree is not None:
+        return multi_level_retriever, raptor_tree
+    index_file = getattr(vector_store, "index_file", None)
+    if index_file is None:
+        return multi_level_retriever, raptor_tree
+    live = get_index_registry().peek(index_file)
+    if live is None or live[0] is not vector_store:
+        return multi_level_retriever, raptor_tree
+    return multi_level_retriever or live[1], raptor_tree or live[2]
+
+def get_index_status(pdf_path: str, index_dir: str = INDEX_STORAGE["dir"]) -> dict:
+    """
+    Which retrieval tiers of a PDF's index are live
+
+    Returns:
+        {"pdf", "tiers": {"faiss", "multi_level", "raptor"}, "errors",
+        "upgrading", "updated_at"}; tiers is {} for an unknown index
+    """
+    index_file = index_file_path(pdf_path, index_dir)
+    status = get_tier_tracker().get_status(os.path.abspath(index_file))
+    if status is None:
+        status = {"tiers": {}, "errors": {}, "upgrading": False, "updated_at": None}
+    elif not status["upgrading"] and unfinished_tiers(status["tiers"]):
+        # Upgraded by another worker
+        status["upgrading"] = upgrade_in_progress(index_file, PROGRESSIVE_INDEX_CONFIG["lease_stale_after"])
+    return {"pdf": os.path.basename(pdf_path), **status}
+
+def index_file_path(pdf_path: str, index_dir: str = INDEX_STORAGE["dir"]) -> str:
+    """Pickle file holding a PDF's index."""
+    return os.path.join(index_dir, f"{os.path.basename(pdf_path)}.pkl")
+
+def evict_index(pdf_path: str, index_dir: str = INDEX_STORAGE["dir"]):
+    """Forget the in-memory index of a PDF (call before re-indexing it)."""
+    index_file = index_file_path(pdf_path, index_dir)
+    with _publish_lock:
+        # Also stops a background upgrade of the old index from publishing
+        get_tier_tracker().forget(os.path.abspath(index_file))
+        get_index_registry().evict(index_file)
 
 # -------------------- Advanced Answer Generation --------------------
+@functools.lru_cache(maxsize=1)
+def get_prompt_template():
+    """Answer prompt (built on first use; langchain_core.prompts is slow to import)."""
+    from langchain_core.prompts import ChatPromptTemplate
+
+    return ChatPromptTemplate.from_messages([
+        ("user", "System: You are a precise and helpful assistant. Use the provided context and key facts to answer the question. Only use the provided information.\n\nContext:\n{context}\n\nKey Facts:\n{facts}\n\nQuestion: {query}")
+    ])
+
+def _get_cached_answer(query: str):
+    """Step 0: Return the cached answer for a query, or None."""
+    with span("ask.cache_lookup"):
+        cached_result = get_qa_cache().get_answer(query)
+    if cached_result:
+        logger.info(f"🎯 Cache HIT for query: {query[:50]}...")
+        return cached_result.get("answer", "") or None
+    logger.info(f"❌ Cache MISS for query: {query[:50]}...")
+    return None
+
+def _retrieve_documents(
+    vector_store,
+    query_context: QueryContext,
+    top_k: int,
+    use_hybrid: bool,
+    multi_level_retriever,
+    use_multi_level: bool,
+    raptor_tree,
+    use_raptor: bool,
+    raptor_collapse_tree: bool
+) -> List[Tuple[Document, float]]:
+    """
+    Step 2: Retrieval strategy selection (RAPTOR > Multi-level > Hybrid > Semantic)
+
+    Every retriever searches with the query context's embedding, so a
+    request pays for one query embedding whichever strategy runs.
+    """
+    if use_raptor and raptor_tree:
+        logger.info("🌳 Using RAPTOR tree retrieval...")
+        tree_results = raptor_tree.retrieve_by_vector(
+            query_context.embedding,
+            top_k=top_k,
+            collapse_tree=raptor_collapse_tree
+        )
+        return _raptor_documents(tree_results)
+
+    if use_multi_level and multi_level_retriever:
+        logger.info("🔍 Using multi-level retrieval...")
+        ml_results = multi_level_retriever.retrieve_multi_level(
+            query_context.normalized,
+            top_k=top_k,
+            bm25_weight=0.3,
+            semantic_weight=0.7,
+            query_context=query_context
+        )
+        return _text_documents(ml_results)
+
+    if use_hybrid:
+        logger.info("🔍 Using hybrid search...")
+        return hybrid_search(vector_store, query_context.normalized, top_k=top_k, query_context=query_context)
+
+    logger.info("🔍 Using semantic search...")
+    with span("retrieval.faiss"):
+        return vector_store.similarity_search_with_score_by_vector(query_context.embedding.tolist(), k=top_k)
+
+def _raptor_documents(tree_results) -> List[Tuple[Document, float]]:
+    """RAPTOR (text, similarity, level) results as (doc, distance-like score)."""
+    return [(Document(page_content=text, metadata={"level": level}), 1.0 - score) for text, score, level in tree_results]
+
+def _text_documents(results) -> List[Tuple[Document, float]]:
+    """Multi-level (text, score) results as (doc, score)."""
+    return [(Document(page_content=doc), score) for doc, score in results]
+
+def _retrieve_documents_batch(
+    vector_store,
+    query_contexts: List[QueryContext],
+    top_k: int,
+    use_hybrid: bool,
+    multi_level_retriever,
+    use_multi_level: bool,
+    raptor_tree,
+    use_raptor: bool,
+    raptor_collapse_tree: bool
+) -> List[List[Tuple[Document, float]]]:
+    """
+    _retrieve_documents for a batch of queries (same strategy order and results)
+
+    Each strategy scores the whole batch at once: one FAISS search over
+    the embedding matrix, one BM25 pass and one cross-encoder call.
+    """
+    embeddings = np.stack([context.embedding for context in query_contexts])
+
+    if use_raptor and raptor_tree:
+        logger.info(f"🌳 Using RAPTOR tree retrieval for {len(query_contexts)} queries...")
+        batch = raptor_tree.retrieve_by_vectors(embeddings, top_k=top_k, collapse_tree=raptor_collapse_tree)
+        return [_raptor_documents(tree_results) for tree_results in batch]
+
+    if use_multi_level and multi_level_retriever:
+        logger.info(f"🔍 Using multi-level retrieval for {len(query_contexts)} queries...")
+        batch = multi_level_retriever.retrieve_multi_level_batch(
+            query_contexts, top_k=top_k, bm25_weight=0.3, semantic_weight=0.7
+        )
+        return [_text_documents(ml_results) for ml_results in batch]
+
+    logger.info(f"🔍 Using {'hybrid' if use_hybrid else 'semantic'} search for {len(query_contexts)} queries...")
+    with span("retrieval.faiss"):
+        batch = search_by_vectors(vector_store, embeddings, k=top_k * 2 if use_hybrid else top_k)
+    if use_hybrid:
+        return [
+            _boost_keyword_matches(vector_store, context, results, top_k)
+            for context, results in zip(query_contexts, batch)
+        ]
+    return batch
+
+def _prepare_context(
+    vector_store,
+    query: str,
+    top_k: int,
+    similarity_threshold: float,
+    use_hybrid: bool,
+    multi_level_retriever,
+    use_multi_level: bool,
+    raptor_tree,
+    use_raptor: bool,
+    raptor_collapse_tree: bool
+) -> Tuple[str, List[str], str, Optional[tuple]]:
+    """
+    Steps 1-7: CPU-bound part of answering (retrieval, reranking, context)
+
+    Returns:
+        (context, source_info, facts_str, grounding) tuple; grounding is
+        passed to verify_answer (None when the context isn't all chunks)
+    """
+    # Tiers that finished building in the background since the caller loaded the index
+    multi_level_retriever, raptor_tree = _live_indexes(vector_store, multi_level_retriever, raptor_tree)
+
+    # Step 1: Enhance query and embed it once for all retrievers
+    enhanced_query = enhance_query(query)
+    with span("ask.query_embedding"):
+        query_context = build_query_context(query, vector_store.embedding_function, normalized=enhanced_query)
+
+    # Step 2: Retrieval Strategy Selection
+    with span("ask.retrieval"):
+        results = _retrieve_documents(
+            vector_store, query_context, top_k, use_hybrid,
+            multi_level_retriever, use_multi_level,
+            raptor_tree, use_raptor, raptor_collapse_tree
+        )
+
+    return _build_prompt_context(vector_store, enhanced_query, results, similarity_threshold)
+
+def _build_prompt_context(
+    vector_store,
+    enhanced_query: str,
+    results: List[Tuple[Document, float]],
+    similarity_threshold: float
+):
+    """Steps 3-7: Threshold, rerank and assemble the prompt context of retrieved documents."""
+    # Step 3: Filter by similarity threshold
+    relevant_docs = [(doc, score) for doc, score in results if score < similarity_threshold]
+
+    if not relevant_docs:
+        # If no docs meet threshold, use top results anyway
+        relevant_docs = results[:min(2, len(results))]  # Use at least top 2 results
+
+    # Step 4: Rerank contexts (precomputed term counts when the index has them)
+    analysis = get_chunk_analysis(vector_store)
+    with span("ask.rerank_contexts"):
+        reranked_docs = rerank_contexts(enhanced_query, relevant_docs, analysis=analysis, vector_store=vector_store)
+
+    # Steps 5-7: Merge neighbouring chunks, drop near-duplicates, pack into the token budget
+    if CONTEXT_CONFIG["packing"]:
+        with span("ask.context_build"):
+            packed = build_context(
+                reranked_docs, extract_facts=extract_key_facts, vector_store=vector_store, analysis=analysis
+            )
+        grounding = None
+        chunk_ids = np.asarray([i for passage in packed.passages for i in passage.chunk_ids], dtype=np.int64)
+        if analysis is not None and packed.passages and all(p.chunk_ids for p in packed.passages) \
+                and analysis.valid(chunk_ids).all():
+            grounding = (analysis, analysis.vocabulary(chunk_ids))
+        return packed.context, packed.source_info, packed.facts_str, grounding
+
+    # Step 5: Build structured context
+    context_parts = []
+    source_info = []
+
+    for i, doc in enumerate(reranked_docs, 1):
+        context_parts.append(f"[Passage {i}]: {doc.page_content}")
+        if hasattr(doc, 'metadata'):
+            source_info.append(f"Passage {i}: Chunk {doc.metadata.get('chunk_id', 'N/A')}")
+
+    context = "\n\n".join(context_parts)
+
+    # Step 6: Context is already built in Step 5. No manual T5-style truncation needed.
+
+    # Step 7: Extract key facts for reasoning
+    key_facts = extract_key_facts(context)
+    facts_str = "\n".join([f"- {fact}" for fact in key_facts])
+
+    return context, source_info, facts_str, None
+
+def _prepare_contexts_batch(
+    vector_store,
+    queries: List[str],
+    top_k: int,
+    similarity_threshold: float,
+    use_hybrid: bool,
+    multi_level_retriever,
+    use_multi_level: bool,
+    raptor_tree,
+    use_raptor: bool,
+    raptor_collapse_tree: bool
+) -> List[Tuple[str, List[str], str, Optional[tuple]]]:
+    """
+    _prepare_context for a batch of questions
+
+    Query embedding and retrieval run once for the batch; thresholding,
+    reranking and context packing are per question.
+
+    Returns:
+        (context, source_info, facts_str, grounding) per question
+    """
+    multi_level_retriever, raptor_tree = _live_indexes(vector_store, multi_level_retriever, raptor_tree)
+    enhanced_queries = [enhance_query(query) for query in queries]
+    with span("ask.query_embedding"):
+        query_contexts = build_query_contexts(queries, vector_store.embedding_function, normalized=enhanced_queries)
+
+    with span("ask.retrieval"):
+        batch = _retrieve_documents_batch(
+            vector_store, query_contexts, top_k, use_hybrid,
+            multi_level_retriever, use_multi_level,
+            raptor_tree, use_raptor, raptor_collapse_tree
+        )
+
+    return [
+        _build_prompt_context(vector_store, enhanced_query, results, similarity_threshold)
+        for enhanced_query, results in zip(enhanced_queries, batch)
+    ]
+
+def _finalize_answer(
+    answer: Optional[str],
+    query: str,
+    context: str,
+    source_info: List[str],
+    use_cache: bool,
+    return_sources: bool,
+    return_context: bool,
+    grounding: Optional[Tuple[ChunkAnalysis, np.ndarray]] = None
+):
+    """Steps 10-13: Fallback, verification, caching and response format."""
+    if not answer:
+        logger.error("❌ All LLM models failed. Using context fallback.")
+        if context:
+            answer = f"Based on the document: {context[:500]}"
+        else:
+            answer = "I couldn't generate an answer. Please try again later."
+
+    # Step 11: Verify answer quality (Optional, as Llama 3 is much better)
+    with span("ask.verify"):
+        answer, confidence = verify_answer(answer, context, query, grounding=grounding)
+
+    # Step 12: Format final response
+    final_answer = answer if answer and len(answer) > 5 else "I couldn't generate a proper answer from the available context."
+
+    # Step 13: Cache the result
+    if use_cache and final_answer:
+        with span("ask.cache_write"):
+            get_qa_cache().cache_answer(query, final_answer, metadata={
+                "sources": source_info if return_sources else [],
+                "confidence": confidence
+            })
+        logger.info(f"💾 Cached answer for query: {query[:50]}...")
+
+    if return_context:
+        return {"answer": final_answer, "context": context, "sources": source_info}
+
+    return final_answer
+
 def answer_question(
     vector_store, 
     query: str, 
@@ -382,133 +1268,423 @@ def answer_question(
     - Tree traversal
     """
 
+    generate = functools.partial(
+        _generate_answer,
+        vector_store, query, top_k, similarity_threshold, use_hybrid,
+        return_sources, return_context, use_cache,
+        multi_level_retriever, use_multi_level,
+        raptor_tree, use_raptor, raptor_collapse_tree
+    )
+
     # Step 0: Check cache first (Phase 1)
-    if use_cache:
-        cached_result = cache.get_answer(query)
-        if cached_result:
-            logger.info(f"🎯 Cache HIT for query: {query[:50]}...")
-            answer = cached_result.get("answer", "")
-            if answer:
-                if return_context:
-                    return {"answer": answer, "context": "", "sources": []}
-                return answer
-        else:
-            logger.info(f"❌ Cache MISS for query: {query[:50]}...")
+    if not use_cache:
+        return generate()
+
+    answer = _get_cached_answer(query)
+    if answer:
+        return _cached_response(answer, return_context)
+    if not SINGLE_FLIGHT_CONFIG["enabled"]:
+        return generate()
+
+    # Concurrent misses for the same question share one generation
+    return _answer_flight.do(
+        _answer_flight_key(
+            vector_store, query, return_sources, return_context,
+            top_k, similarity_threshold, use_hybrid, use_multi_level, use_raptor, raptor_collapse_tree
+        ),
+        generate,
+        recheck=functools.partial(_answer_from_cache, query, return_context)
+    )
 
-    # Step 1: Enhance query
-    enhanced_query = enhance_query(query)
+def _cached_response(answer: str, return_context: bool):
+    if return_context:
+        return {"answer": answer, "context": "", "sources": []}
+    return answer
 
-    # Step 2: Retrieval Strategy Selection
-    # Priority: RAPTOR > Multi-level > Hybrid > Semantic
+def _answer_from_cache(query: str, return_context: bool):
+    """Cached response for a query, or None (used after waiting on another worker)."""
+    answer = _get_cached_answer(query)
+    return _cached_response(answer, return_context) if answer else None
+
+def _answer_flight_key(vector_store, query: str, return_sources: bool, return_context: bool, *retrieval_options) -> str:
+    """
+    Single-flight key for one answer
+
+    - The QA cache key for the query
+    - The index answered from (its pickle, or the object for an unsaved store,
+      which then only coalesces within this process)
+    - The retrieval options and response-shape flags, so callers that asked
+      for a different answer never share one
+    """
+    index = getattr(vector_store, "index_file", None) or f"obj{id(vector_store)}"
+    options = ":".join(str(option) for option in retrieval_options)
+    index_digest = hashlib.blake2b(f"{index}|{options}".encode("utf-8"), digest_size=8).hexdigest()
+    return f"{get_qa_cache().answer_key(query)}:{index_digest}:{int(return_sources)}{int(return_context)}"
+
+def _generate_answer(
+    vector_store,
+    query: str,
+    top_k: int,
+    similarity_threshold: float,
+    use_hybrid: bool,
+    return_sources: bool,
+    return_context: bool,
+    use_cache: bool,
+    multi_level_retriever,
+    use_multi_level: bool,
+    raptor_tree,
+    use_raptor: bool,
+    raptor_collapse_tree: bool
+):
+    """Steps 1-13 of answer_question (everything after the cache lookup)."""
+    # Steps 1-7: Retrieval, reranking and context
+    context, source_info, facts_str, grounding = _prepare_context(
+        vector_store, query, top_k, similarity_threshold, use_hybrid,
+        multi_level_retriever, use_multi_level,
+        raptor_tree, use_raptor, raptor_collapse_tree
+    )
+
+    # Step 9: Generate answer using OpenRouter (with model fallback)
+    answer = _invoke_llm(context, facts_str, query)
+
+    return _finalize_answer(
+        answer, query, context, source_info, use_cache, return_sources, return_context, grounding
+    )
+
+def _invoke_llm(context: str, facts_str: str, query: str) -> Optional[str]:
+    """Step 9: Answer from the first model that responds (None if all fail)."""
+    answer = None
     
-    if use_raptor and raptor_tree:
-        logger.info("🌳 Using RAPTOR tree retrieval...")
-        tree_results = raptor_tree.retrieve_from_tree(
-            enhanced_query,
-            top_k=top_k,
-            collapse_tree=raptor_collapse_tree
-        )
-        # Convert to (doc, score) format
-        results = [(Document(page_content=text, metadata={"level": level}), 1.0 - score) for text, score, level in tree_results]
-        
-    elif use_multi_level and multi_level_retriever:
-        logger.info("🔍 Using multi-level retrieval...")
-        ml_results = multi_level_retriever.retrieve_multi_level(
-            enhanced_query,
-            top_k=top_k,
-            bm25_weight=0.3,
-            semantic_weight=0.7
-        )
-        # Convert to (doc, score) format
-        results = [(Document(page_content=doc), score) for doc, score in ml_results]
-        
-    elif use_hybrid:
-        logger.info("🔍 Using hybrid search...")
-        results = hybrid_search(vector_store, enhanced_query, top_k=top_k)
-        
-    else:
-        logger.info("🔍 Using semantic search...")
-        results = vector_store.similarity_search_with_score(enhanced_query, k=top_k)
+    for model_name in FREE_MODELS:
+        try:
+            logger.info(f"🤖 Requesting answer from {model_name}...")
+            # Create a fresh LLM instance to ensure fresh configuration/timeout
+            api_llm = get_llm(model_name)
+            chain = get_prompt_template() | api_llm
+            with span("ask.llm_call"):
+                response = chain.invoke({
+                    "context": context,
+                    "facts": facts_str,
+                    "query": query
+                })
+            answer = response.content.strip()
+            logger.info(f"✅ Success with {model_name}!")
+            break
+        except Exception as e:
+            logger.warning(f"⚠️ {model_name} rate-limited or error: {type(e).__name__}")
+            with span("ask.llm_backoff"):
+                _time.sleep(7)  # Seven seconds to reset limits
+            continue
 
-    # Step 3: Filter by similarity threshold
-    relevant_docs = [(doc, score) for doc, score in results if score < similarity_threshold]
+    return answer
 
-    if not relevant_docs:
-        # If no docs meet threshold, use top results anyway
-        relevant_docs = results[:min(2, len(results))]  # Use at least top 2 results
+# -------------------- Async Answer Generation --------------------
+_cpu_executor = None
 
-    # Step 4: Rerank contexts
-    reranked_docs = rerank_contexts(enhanced_query, relevant_docs)
+def _get_cpu_executor() -> ThreadPoolExecutor:
+    """Bounded pool for CPU-bound work (retrieval, reranking, ingestion)."""
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = ThreadPoolExecutor(
+            max_workers=SERVER_CONFIG["cpu_workers"],
+            thread_name_prefix="rag-cpu"
+        )
+    return _cpu_executor
 
-    # Step 5: Build structured context
-    context_parts = []
-    source_info = []
+def reset_cpu_executor():
+    """Forget the CPU pool (its threads do not survive a fork)."""
+    global _cpu_executor
+    _cpu_executor = None
 
-    for i, doc in enumerate(reranked_docs, 1):
-        context_parts.append(f"[Passage {i}]: {doc.page_content}")
-        if hasattr(doc, 'metadata'):
-            source_info.append(f"Passage {i}: Chunk {doc.metadata.get('chunk_id', 'N/A')}")
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking function on the bounded CPU pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    # Carry context variables (e.g. the request trace) into the worker thread
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_get_cpu_executor(), functools.partial(ctx.run, fn, *args, **kwargs))
 
-    context = "\n\n".join(context_parts)
+async def answer_question_async(
+    vector_store, 
+    query: str, 
+    top_k: int = 5,
+    similarity_threshold: float = 1.5,
+    use_hybrid: bool = True,
+    return_sources: bool = False,
+    return_context: bool = False,
+    use_cache: bool = True,
+    multi_level_retriever = None,
+    use_multi_level: bool = True,
+    raptor_tree = None,
+    use_raptor: bool = True,
+    raptor_collapse_tree: bool = True
+):
+    """
+    Awaitable counterpart of answer_question (same arguments and result)
 
-    # Step 6: Context is already built in Step 5. No manual T5-style truncation needed.
+    - Cache I/O runs in a worker thread
+    - Retrieval and reranking run on the bounded CPU pool
+    - The LLM call and fallback back-off are non-blocking
+    """
 
-    # Step 7: Extract key facts for reasoning
-    key_facts = extract_key_facts(context)
+    generate = functools.partial(
+        _generate_answer_async,
+        vector_store, query, top_k, similarity_threshold, use_hybrid,
+        return_sources, return_context, use_cache,
+        multi_level_retriever, use_multi_level,
+        raptor_tree, use_raptor, raptor_collapse_tree
+    )
 
-    # Step 8: Enhanced prompt (User-only role for maximum compatibility)
-    prompt_template = ChatPromptTemplate.from_messages([
-        ("user", "System: You are a precise and helpful assistant. Use the provided context and key facts to answer the question. Only use the provided information.\n\nContext:\n{context}\n\nKey Facts:\n{facts}\n\nQuestion: {query}")
-    ])
+    # Step 0: Check cache first (Phase 1)
+    if not use_cache:
+        return await generate()
+
+    answer = await asyncio.to_thread(_get_cached_answer, query)
+    if answer:
+        return _cached_response(answer, return_context)
+    if not SINGLE_FLIGHT_CONFIG["enabled"]:
+        return await generate()
+
+    # Concurrent misses for the same question share one generation
+    key = await asyncio.to_thread(
+        _answer_flight_key,
+        vector_store, query, return_sources, return_context,
+        top_k, similarity_threshold, use_hybrid, use_multi_level, use_raptor, raptor_collapse_tree
+    )
+    return await _answer_flight.do_async(
+        key,
+        generate,
+        recheck=functools.partial(_answer_from_cache, query, return_context)
+    )
+
+async def _generate_answer_async(
+    vector_store,
+    query: str,
+    top_k: int,
+    similarity_threshold: float,
+    use_hybrid: bool,
+    return_sources: bool,
+    return_context: bool,
+    use_cache: bool,
+    multi_level_retriever,
+    use_multi_level: bool,
+    raptor_tree,
+    use_raptor: bool,
+    raptor_collapse_tree: bool
+):
+    """Awaitable steps 1-13 (everything after the cache lookup)."""
+    # Steps 1-7: Retrieval, reranking and context
+    context, source_info, facts_str, grounding = await run_blocking(
+        _prepare_context,
+        vector_store, query, top_k, similarity_threshold, use_hybrid,
+        multi_level_retriever, use_multi_level,
+        raptor_tree, use_raptor, raptor_collapse_tree
+    )
 
     # Step 9: Generate answer using OpenRouter (with model fallback)
-    facts_str = "\n".join([f"- {fact}" for fact in key_facts])
+    answer = await _invoke_llm_async(context, facts_str, query)
+
+    return await asyncio.to_thread(
+        _finalize_answer, answer, query, context, source_info, use_cache, return_sources, return_context, grounding
+    )
+
+async def _invoke_llm_async(context: str, facts_str: str, query: str) -> Optional[str]:
+    """Awaitable step 9 (non-blocking call and back-off)."""
     answer = None
-    
+
     for model_name in FREE_MODELS:
         try:
             logger.info(f"🤖 Requesting answer from {model_name}...")
-            # Create a fresh LLM instance to ensure fresh configuration/timeout
             api_llm = get_llm(model_name)
-            chain = prompt_template | api_llm
-            response = chain.invoke({
-                "context": context,
-                "facts": facts_str,
-                "query": query
-            })
+            chain = get_prompt_template() | api_llm
+            with span("ask.llm_call"):
+                response = await chain.ainvoke({
+                    "context": context,
+                    "facts": facts_str,
+                    "query": query
+                })
             answer = response.content.strip()
             logger.info(f"✅ Success with {model_name}!")
             break
         except Exception as e:
             logger.warning(f"⚠️ {model_name} rate-limited or error: {type(e).__name__}")
-            _time.sleep(7)  # Seven seconds to reset limits
+            with span("ask.llm_backoff"):
+                await asyncio.sleep(7)  # Seven seconds to reset limits
             continue
-    
-    if not answer:
-        logger.error("❌ All LLM models failed. Using context fallback.")
-        if context:
-            answer = f"Based on the document: {context[:500]}"
-        else:
-            answer = "I couldn't generate an answer. Please try again later."
 
-    # Step 11: Verify answer quality (Optional, as Llama 3 is much better)
-    answer, confidence = verify_answer(answer, context, query)
+    return answer
 
-    # Step 12: Format final response
-    final_answer = answer if answer and len(answer) > 5 else "I couldn't generate a proper answer from the available context."
+# -------------------- Batch Question Answering --------------------
+async def answer_questions_batch_async(
+    vector_store,
+    questions: List[str],
+    top_k: int = 5,
+    similarity_threshold: float = 1.5,
+    use_hybrid: bool = True,
+    return_sources: bool = False,
+    return_context: bool = False,
+    use_cache: bool = True,
+    multi_level_retriever = None,
+    use_multi_level: bool = True,
+    raptor_tree = None,
+    use_raptor: bool = True,
+    raptor_collapse_tree: bool = True,
+    llm_concurrency: int = BATCH_CONFIG["llm_concurrency"],
+    retrieval_chunk: int = BATCH_CONFIG["retrieval_chunk"]
+) -> AsyncIterator[Dict]:
+    """
+    Answer many questions against one index, yielding results as they finish
+
+    - Cached answers are fetched with one bulk lookup and yielded first
+    - Repeated questions are answered once
+    - Uncached questions are embedded and retrieved retrieval_chunk at a
+      time (one embedding call, one FAISS/BM25 pass and one reranker
+      call per chunk) on the CPU pool
+    - At most llm_concurrency LLM requests are in flight; the next chunk
+      is retrieved while earlier questions wait on the LLM
+
+    Args:
+        vector_store: Index to answer from
+        questions: Questions, in request order
+        llm_concurrency: Max concurrent LLM requests
+        retrieval_chunk: Questions per batched retrieval pass
+        (other arguments as in answer_question)
+
+    Yields:
+        {"index", "question", "answer", "cached"} per question (plus
+        "sources"/"context" when requested), or {"index", "question",
+        "error"} if that question failed; in completion order
+    """
+    positions: Dict[str, List[int]] = {}
+    for index, question in enumerate(questions):
+        positions.setdefault(question, []).append(index)
+    pending = list(positions)
+
+    def results_for(question: str, result: Dict) -> List[Dict]:
+        return [{"index": index, "question": question, **result} for index in positions[question]]
+
+    # Step 0: One bulk cache lookup for the whole batch
+    if use_cache and pending:
+        with span("ask.cache_lookup"):
+            cached = await asyncio.to_thread(get_qa_cache().get_answers_many, pending)
+        misses = []
+        for question, hit in zip(pending, cached):
+            answer = hit.get("answer") if hit else None
+            if not answer:
+                misses.append(question)
+                continue
+            result = {"answer": answer, "cached": True}
+            if return_sources:
+                result["sources"] = []
+            if return_context:
+                result["context"] = ""
+            for item in results_for(question, result):
+                yield item
+        logger.info(f"🎯 Batch cache: {len(pending) - len(misses)} hits, {len(misses)} misses")
+        pending = misses
+
+    if not pending:
+        return
+
+    finished: asyncio.Queue = asyncio.Queue()
+    llm_slots = asyncio.Semaphore(max(1, llm_concurrency))
+    tasks = set()
+
+    async def answer_one(question: str, prepared: tuple):
+        context, source_info, facts_str, grounding = prepared
+        try:
+            async with llm_slots:
+                answer = await _invoke_llm_async(context, facts_str, question)
+            response = await asyncio.to_thread(
+                _finalize_answer, answer, question, context, source_info, use_cache, return_sources, True, grounding
+            )
+            result = {"answer": response["answer"], "cached": False}
+            if return_sources:
+                result["sources"] = response["sources"]
+            if return_context:
+                result["context"] = response["context"]
+        except Exception as e:
+            logger.error(f"❌ Batch question failed: {question[:50]}... ({type(e).__name__}: {e})")
+            result = {"error": str(e)}
+        await finished.put(results_for(question, result))
+
+    async def produce():
+        # Retrieval chunks run one after another on the CPU pool while
+        # earlier chunks' questions are waiting on the LLM
+        for start in range(0, len(pending), max(1, retrieval_chunk)):
+            chunk = pending[start:start + max(1, retrieval_chunk)]
+            try:
+                prepared = await run_blocking(
+                    _prepare_contexts_batch,
+                    vector_store, chunk, top_k, similarity_threshold, use_hybrid,
+                    multi_level_retriever, use_multi_level,
+                    raptor_tree, use_raptor, raptor_collapse_tree
+                )
+            except Exception as e:
+                logger.error(f"❌ Batch retrieval failed for {len(chunk)} questions: {type(e).__name__}: {e}")
+                for question in chunk:
+                    await finished.put(results_for(question, {"error": f"Retrieval failed: {e}"}))
+                continue
+            for question, item in zip(chunk, prepared):
+                task = asyncio.create_task(answer_one(question, item))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+    logger.info(f"📦 Answering {len(pending)} questions (LLM concurrency {llm_concurrency})")
+    producer = asyncio.create_task(produce())
+    try:
+        for _ in range(len(pending)):
+            for item in await finished.get():
+                yield item
+    finally:
+        # The consumer may stop early (e.g. a client disconnect): drop the rest
+        producer.cancel()
+        for task in list(tasks):
+            task.cancel()
+
+def answer_questions_batch(vector_store, questions: List[str], **kwargs) -> Iterator[Dict]:
+    """
+    Blocking iterator over answer_questions_batch_async (for WSGI and scripts)
 
-    # Step 13: Cache the result
-    if use_cache and final_answer:
-        cache.cache_answer(query, final_answer, metadata={
-            "sources": source_info if return_sources else [],
-            "confidence": confidence
-        })
-        logger.info(f"💾 Cached answer for query: {query[:50]}...")
+    The batch runs on its own event loop in a background thread; results
+    are handed over as they finish. Closing the iterator stops the batch.
 
-    if return_context:
-        return {"answer": final_answer, "context": context, "sources": source_info}
+    Args:
+        vector_store: Index to answer from
+        questions: Questions, in request order
+        **kwargs: answer_questions_batch_async options
 
-    return final_answer
+    Yields:
+        Result dicts in completion order
+    """
+    results = queue.Queue()
+    stop = threading.Event()
+
+    async def pump():
+        batch = answer_questions_batch_async(vector_store, questions, **kwargs)
+        try:
+            async for item in batch:
+                if stop.is_set():
+                    break
+                results.put(("item", item))
+        except Exception as e:
+            results.put(("error", e))
+        finally:
+            await batch.aclose()
+            results.put(("done", None))
+
+    ctx = contextvars.copy_context()
+    worker = threading.Thread(target=ctx.run, args=(asyncio.run, pump()), name="rag-batch", daemon=True)
+    worker.start()
+    try:
+        while True:
+            kind, value = results.get()
+            if kind == "done":
+                break
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        stop.set()
 
 # -------------------- Optional: PDF to Images --------------------
 def pdf_to_images(pdf_path: str):
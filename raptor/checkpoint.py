@@ -0,0 +1,162 @@
+# raptor/checkpoint.py
+"""
+Checkpoints for resumable RAPTOR tree builds
+- A build is identified by a hash of its input chunks and tree settings,
+  so re-running the same build finds its own checkpoints (and nothing else)
+- One file per completed level: texts, embeddings, children, cluster ids
+- Summaries are cached by the exact member texts of their cluster, so a
+  cluster that comes out the same after a restart (or in a re-indexed,
+  slightly edited PDF) is not summarized again; the cache is pruned to a
+  size budget, least recently used first
+- All writes go to a temp file and are renamed, so a crash never leaves a
+  partial checkpoint
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import threading
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(parts: Iterable[str]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        data = part.encode("utf-8")
+        # Length prefix: ["ab", "c"] and ["a", "bc"] hash differently
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+def build_key(texts: List[str], settings: dict) -> str:
+    """Content address of a tree build (input chunks + settings that change the tree)."""
+    return _digest([repr(sorted(settings.items()))] + list(texts))
+
+
+def _write_atomic(path: str, data: bytes):
+    # Per thread: ingest and the background upgrade executor can write the same key
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class TreeCheckpoint:
+    """
+    Completed levels of one tree build
+
+    Level payload: {"texts", "embeddings", "children", "cluster_ids"}
+    (children are tree node indices, as in RAPTORNode).
+    """
+
+    def __init__(self, root: str, key: str):
+        """
+        Args:
+            root: Checkpoint directory (shared by all builds)
+            key: build_key of this build
+        """
+        self.path = os.path.join(root, "builds", key)
+
+    def _level_file(self, level: int) -> str:
+        return os.path.join(self.path, f"level_{level}.pkl")
+
+    def load_levels(self) -> List[dict]:
+        """Consecutive completed levels from 0 (stops at the first missing or unreadable one)."""
+        levels = []
+        while True:
+            try:
+                with open(self._level_file(len(levels)), "rb") as f:
+                    levels.append(pickle.load(f))
+            except FileNotFoundError:
+                break
+            except Exception as e:
+                logger.warning(f"⚠️ Ignoring unreadable RAPTOR checkpoint level {len(levels)}: {e}")
+                break
+        return levels
+
+    def save_level(self, level: int, payload: dict):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            _write_atomic(self._level_file(level), pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+            logger.info(f"💾 RAPTOR checkpoint: level {level} ({len(payload['texts'])} nodes)")
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write RAPTOR checkpoint level {level}: {e}")
+
+    def clear(self):
+        """Drop this build's levels (the tree is safely persisted elsewhere)."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class SummaryCache:
+    """
+    Cluster summaries keyed by summarizer settings and member texts
+    """
+
+    def __init__(self, root: str, max_bytes: int = 64 * 1024 ** 2):
+        """
+        Args:
+            root: Checkpoint directory (shared by all builds)
+            max_bytes: Size budget enforced by prune()
+        """
+        self.path = os.path.join(root, "summaries")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, namespace: str, texts: List[str]) -> str:
+        return _digest([namespace] + list(texts))
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f"{key}.txt")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._file(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                summary = f.read()
+            # mtime is the last use, so prune() keeps summaries that are still being reused
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return summary
+
+    def put(self, key: str, summary: str):
+        path = self._file(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_atomic(path, summary.encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"⚠️ Could not cache RAPTOR summary: {e}")
+
+    def prune(self):
+        """Delete least recently used summaries until the cache fits max_bytes."""
+        entries = []
+        for directory, _, files in os.walk(self.path):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        logger.info(f"🗑️ Pruned {removed} cached RAPTOR summaries ({total / 1024 ** 2:.1f}MB kept)")
@@ -9,9 +9,6 @@ Clustering for RAPTOR tree building
 import logging
 import numpy as np
 from typing import List, Tuple, Dict
-from sklearn.mixture import GaussianMixture
-from sklearn.cluster import KMeans
-import umap
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +62,8 @@ class RAPTORClusterer:
             logger.warning(f"Too few samples ({len(embeddings)}), using mean pooling")
             return embeddings
         
+        import umap  # heavy (numba); only loaded when a tree is built
+        
         try:
             reducer = umap.UMAP(
                 n_components=min(self.reduction_dimension, len(embeddings) - 1),
@@ -106,6 +105,9 @@ class RAPTORClusterer:
         # Determine optimal number of clusters
         n_clusters = self._determine_n_clusters(n_samples)
         
+        from sklearn.mixture import GaussianMixture
+        from sklearn.cluster import KMeans
+        
         try:
             # Use GMM for soft clustering
             gmm = GaussianMixture(
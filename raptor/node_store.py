@@ -0,0 +1,203 @@
+# raptor/node_store.py
+"""
+Columnar (struct-of-arrays) storage for RAPTOR tree nodes
+- One contiguous embedding matrix instead of an array per node
+- int32 level / cluster id columns and a bool summary column
+- Children as CSR: child_offsets[i]:child_offsets[i + 1] slices child_indices
+- Texts as one UTF-8 buffer sliced by text_offsets
+- Pickles as a handful of buffers, so saving and loading a large tree is
+  a few memcpy's instead of one object per node
+- NodeView keeps the RAPTORNode attribute API (node.text, node.children, ...)
+"""
+
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+
+
+class NodeView:
+    """
+    Read-only view of one node (same attributes as RAPTORNode)
+    """
+
+    __slots__ = ("_store", "index")
+
+    def __init__(self, store: "NodeStore", index: int):
+        self._store = store
+        self.index = index
+
+    @property
+    def text(self) -> str:
+        return self._store.text(self.index)
+
+    @property
+    def embedding(self) -> np.ndarray:
+        return self._store.embeddings[self.index]
+
+    @property
+    def level(self) -> int:
+        return int(self._store.levels[self.index])
+
+    @property
+    def children(self) -> List[int]:
+        return self._store.children(self.index)
+
+    @property
+    def cluster_id(self) -> int:
+        return int(self._store.cluster_ids[self.index])
+
+    @property
+    def is_summary(self) -> bool:
+        return bool(self._store.is_summary[self.index])
+
+    def __repr__(self):
+        return f"NodeView(index={self.index}, level={self.level}, children={len(self.children)}, text={self.text[:40]!r})"
+
+
+class NodeStore:
+    """
+    Append-by-level columnar node table
+
+    Nodes are only added a whole level at a time (how RAPTOR builds), so
+    each column is concatenated once per level.
+    """
+
+    def __init__(self, embedding_dtype=np.float32, dim: int = 0):
+        """
+        Args:
+            embedding_dtype: Storage dtype of the embedding matrix
+            dim: Embedding dimension (taken from the first level if 0)
+        """
+        self.embeddings = np.zeros((0, dim), dtype=embedding_dtype)
+        self.levels = np.zeros(0, dtype=np.int32)
+        self.cluster_ids = np.zeros(0, dtype=np.int32)
+        self.is_summary = np.zeros(0, dtype=bool)
+        self.child_offsets = np.zeros(1, dtype=np.int64)
+        self.child_indices = np.zeros(0, dtype=np.int32)
+        self.text_offsets = np.zeros(1, dtype=np.int64)
+        self.text_buffer = b""
+        self._norms: Optional[np.ndarray] = None
+
+    # -------------------- Building --------------------
+
+    def append_level(
+        self,
+        texts: Sequence[str],
+        embeddings: np.ndarray,
+        level: int,
+        children: Optional[Sequence[Sequence[int]]] = None,
+        cluster_ids: Optional[Sequence[int]] = None
+    ) -> range:
+        """
+        Add one level of nodes
+
+        Args:
+            texts: Node texts
+            embeddings: (n, dim) node embeddings
+            level: Tree level (0 = leaves, which are not summaries)
+            children: Child node indices per node (default none)
+            cluster_ids: Cluster id per node (default 0)
+
+        Returns:
+            Indices of the new nodes
+        """
+        n = len(texts)
+        start = len(self)
+        embeddings = np.asarray(embeddings, dtype=self.embeddings.dtype).reshape(n, -1)
+        if len(self.embeddings) == 0:
+            self.embeddings = embeddings.copy()
+        else:
+            self.embeddings = np.concatenate([self.embeddings, embeddings])
+
+        self.levels = np.concatenate([self.levels, np.full(n, level, dtype=np.int32)])
+        ids = np.zeros(n, dtype=np.int32) if cluster_ids is None else np.asarray(cluster_ids, dtype=np.int32)
+        self.cluster_ids = np.concatenate([self.cluster_ids, ids])
+        self.is_summary = np.concatenate([self.is_summary, np.full(n, level > 0)])
+
+        children = children if children is not None else [()] * n
+        counts = np.fromiter((len(c) for c in children), dtype=np.int64, count=n)
+        flat = np.fromiter((i for c in children for i in c), dtype=np.int32, count=int(counts.sum()))
+        self.child_offsets = np.concatenate([self.child_offsets, self.child_offsets[-1] + np.cumsum(counts)])
+        self.child_indices = np.concatenate([self.child_indices, flat])
+
+        encoded = [text.encode("utf-8") for text in texts]
+        lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=n)
+        self.text_offsets = np.concatenate([self.text_offsets, self.text_offsets[-1] + np.cumsum(lengths)])
+        self.text_buffer = self.text_buffer + b"".join(encoded)
+
+        self._norms = None
+        return range(start, start + n)
+
+    @classmethod
+    def from_nodes(cls, nodes: Sequence, embedding_dtype=None) -> "NodeStore":
+        """Convert a list of RAPTORNode (trees pickled before the columnar store)."""
+        if embedding_dtype is None:
+            embedding_dtype = np.asarray(nodes[0].embedding).dtype if nodes else np.float32
+        store = cls(embedding_dtype)
+        # Old trees list nodes level by level, but append in runs to be safe
+        start = 0
+        while start < len(nodes):
+            end = start
+            while end < len(nodes) and nodes[end].level == nodes[start].level:
+                end += 1
+            run = nodes[start:end]
+            store.append_level(
+                [node.text for node in run],
+                np.stack([np.asarray(node.embedding) for node in run]),
+                run[0].level,
+                [node.children or [] for node in run],
+                [node.cluster_id for node in run]
+            )
+            store.is_summary[start:end] = [node.is_summary for node in run]
+            start = end
+        return store
+
+    # -------------------- Access --------------------
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def __getitem__(self, index: int) -> NodeView:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"node index {index} out of range")
+        return NodeView(self, index)
+
+    def __iter__(self) -> Iterator[NodeView]:
+        return (NodeView(self, i) for i in range(len(self)))
+
+    def text(self, index: int) -> str:
+        return self.text_buffer[self.text_offsets[index]:self.text_offsets[index + 1]].decode("utf-8")
+
+    def texts(self, indices: Sequence[int]) -> List[str]:
+        return [self.text(i) for i in indices]
+
+    def children(self, index: int) -> List[int]:
+        return self.child_indices[self.child_offsets[index]:self.child_offsets[index + 1]].tolist()
+
+    def matrix(self, indices: Sequence[int]) -> np.ndarray:
+        """Embeddings of some nodes (a view, without copying, for a contiguous range)."""
+        if isinstance(indices, range) and indices.step == 1:
+            return self.embeddings[indices.start:indices.stop]
+        return self.embeddings[np.asarray(indices, dtype=np.int64)]
+
+    def norms(self, indices: Sequence[int]) -> np.ndarray:
+        """float32 L2 norms of some node embeddings (computed once per store)."""
+        if self._norms is None:
+            self._norms = np.linalg.norm(self.embeddings.astype(np.float32, copy=False), axis=1)
+        if isinstance(indices, range) and indices.step == 1:
+            return self._norms[indices.start:indices.stop]
+        return self._norms[np.asarray(indices, dtype=np.int64)]
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.embeddings, self.levels, self.cluster_ids, self.is_summary,
+                  self.child_offsets, self.child_indices, self.text_offsets)
+        return int(sum(a.nbytes for a in arrays) + len(self.text_buffer))
+
+    def __getstate__(self):
+        # Norms are cheap to recompute and would double the embedding footprint on disk
+        state = self.__dict__.copy()
+        state["_norms"] = None
+        return state
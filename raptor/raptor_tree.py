@@ -3,15 +3,22 @@
 RAPTOR Tree Implementation
 - Hierarchical document structure
 - Multi-level retrieval
-- Abstractive summarization at each level
+- Abstractive (FLAN-T5) or extractive summarization at each level
+- Checkpointed after every level; an interrupted build resumes
+- Nodes stored column-wise (raptor/node_store.py); tree.nodes[i] still
+  reads like a RAPTORNode
 """
 
 import logging
 import numpy as np
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
+from raptor.checkpoint import SummaryCache, TreeCheckpoint, build_key
 from raptor.clustering import RAPTORClusterer
-from raptor.summarizer import RAPTORSummarizer
+from raptor.node_store import NodeStore
+from raptor.summarizer import create_summarizer
+from config.index_config import RAPTOR_CONFIG
+from utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +26,8 @@ logger = logging.getLogger(__name__)
 @dataclass
 class RAPTORNode:
     """
-    Node in RAPTOR tree
+    Node in RAPTOR tree (how trees were stored before NodeStore; kept to
+    load those pickles)
     
     Attributes:
         text: Node content (original chunk or summary)
@@ -62,7 +70,9 @@ class RAPTORTree:
         embedding_model,
         max_levels: int = 3,
         reduction_dimension: int = 10,
-        min_cluster_size: int = 3
+        min_cluster_size: int = 3,
+        embedding_dtype: str = RAPTOR_CONFIG["embedding_dtype"],
+        summarization: str = RAPTOR_CONFIG["summarization"]
     ):
         """
         Initialize RAPTOR tree
@@ -72,52 +82,65 @@ class RAPTORTree:
             max_levels: Maximum tree depth
             reduction_dimension: UMAP dimensions for clustering
             min_cluster_size: Minimum chunks per cluster
+            embedding_dtype: Storage dtype for node embeddings ("float32" or "float16")
+            summarization: "abstractive" (FLAN-T5) or "extractive" (central sentences, no generator)
         """
         self.embedding_model = embedding_model
         self.max_levels = max_levels
+        self.embedding_dtype = np.dtype(embedding_dtype)
         
         # Initialize components
         self.clusterer = RAPTORClusterer(
             reduction_dimension=reduction_dimension,
             min_cluster_size=min_cluster_size
         )
-        self.summarizer = RAPTORSummarizer()
+        self.summarization = summarization
+        self.summarizer = create_summarizer(mode=summarization, embedding_model=embedding_model)
         
         # Tree structure
-        self.nodes: List[RAPTORNode] = []
-        self.levels: Dict[int, List[int]] = {}  # level → node indices
+        self.nodes = NodeStore(self.embedding_dtype)
+        self.levels: Dict[int, range] = {}  # level → node indices (contiguous)
+        self._checkpoint: Optional[TreeCheckpoint] = None
         
-        logger.info(f"✅ RAPTOR Tree initialized (max_levels={max_levels})")
+        logger.info(f"✅ RAPTOR Tree initialized (max_levels={max_levels}, {summarization} summaries)")
     
-    def build_tree(self, texts: List[str]) -> None:
+    def build_tree(self, texts: List[str], checkpoint_dir: str = RAPTOR_CONFIG["checkpoint_dir"]) -> None:
         """
         Build RAPTOR tree from documents
         
         Args:
             texts: List of document chunks
+            checkpoint_dir: Where completed levels and summaries are saved ("" = no checkpoints);
+                a build of the same chunks and settings resumes after its last saved level
         """
         logger.info(f"🔧 Building RAPTOR tree from {len(texts)} documents...")
+        self.nodes = NodeStore(self.embedding_dtype)
+        self.levels = {}
         
-        # Level 0: Original chunks (leaf nodes)
-        logger.info("Level 0: Creating leaf nodes...")
-        embeddings = self._embed_texts(texts)
+        summary_cache = None
+        saved_levels = []
+        if checkpoint_dir:
+            self._checkpoint = TreeCheckpoint(checkpoint_dir, build_key(texts, self._build_settings()))
+            summary_cache = SummaryCache(checkpoint_dir, int(RAPTOR_CONFIG["summary_cache_mb"] * 1024 ** 2))
+            # Levels don't depend on max_levels, only where the build stops, so a build
+            # resumed with fewer levels reuses the ones it needs
+            saved_levels = self._checkpoint.load_levels()[:self.max_levels]
         
-        for i, (text, embedding) in enumerate(zip(texts, embeddings)):
-            node = RAPTORNode(
-                text=text,
-                embedding=embedding,
-                level=0,
-                is_summary=False
-            )
-            self.nodes.append(node)
-        
-        self.levels[0] = list(range(len(texts)))
-        logger.info(f"  → {len(texts)} leaf nodes created")
+        if saved_levels:
+            self._restore_levels(saved_levels)
+            logger.info(f"♻️ Resumed RAPTOR build after level {len(saved_levels) - 1} ({len(self.nodes)} nodes)")
+        else:
+            # Level 0: Original chunks (leaf nodes)
+            logger.info("Level 0: Creating leaf nodes...")
+            embeddings = self._embed_texts(texts)
+            self.levels[0] = self.nodes.append_level(texts, embeddings, level=0)
+            self._save_level(0)
+            logger.info(f"  → {len(texts)} leaf nodes created")
         
         # Build higher levels
-        current_level = 0
-        current_texts = texts
-        current_embeddings = embeddings
+        current_level = max(self.levels)
+        current_texts = self.nodes.texts(self.levels[current_level])
+        current_embeddings = self.nodes.matrix(self.levels[current_level])
         
         while current_level < self.max_levels - 1:
             if len(current_texts) < self.clusterer.min_cluster_size:
@@ -126,10 +149,11 @@ class RAPTORTree:
             
             # Cluster current level
             logger.info(f"Level {current_level + 1}: Clustering...")
-            clusters = self.clusterer.cluster_embeddings(
-                current_embeddings,
-                current_texts
-            )
+            with span("raptor.cluster"):
+                clusters = self.clusterer.cluster_embeddings(
+                    current_embeddings.astype(np.float32),
+                    current_texts
+                )
             
             if len(clusters) <= 1:
                 logger.info(f"Stopping at level {current_level}: only one cluster")
@@ -137,49 +161,112 @@ class RAPTORTree:
             
             # Summarize each cluster
             logger.info(f"Level {current_level + 1}: Summarizing {len(clusters)} clusters...")
-            summaries = []
-            summary_nodes = []
+            with span("raptor.summarize"):
+                summaries = self._summarize_level(clusters, current_texts, current_embeddings, summary_cache)
             
-            for cluster_id, indices in clusters.items():
-                # Get texts from current level
-                cluster_texts = [current_texts[i] for i in indices]
-                
-                # Summarize
-                summary = self.summarizer.summarize_cluster(cluster_texts, cluster_id)
-                summaries.append(summary)
-                
-                # Create summary node
-                summary_embedding = self._embed_texts([summary])[0]
-                
-                # Get actual node indices from current level
-                if current_level == 0:
-                    child_indices = indices
-                else:
-                    child_indices = [self.levels[current_level][i] for i in indices]
-                
-                node = RAPTORNode(
-                    text=summary,
-                    embedding=summary_embedding,
-                    level=current_level + 1,
-                    children=child_indices,
-                    cluster_id=cluster_id,
-                    is_summary=True
-                )
-                
-                node_idx = len(self.nodes)
-                self.nodes.append(node)
-                summary_nodes.append(node_idx)
+            # Embed the level's summaries in one batch
+            with span("raptor.embed"):
+                summary_embeddings = self._embed_texts(summaries)
+            
+            # Cluster members are positions in the current level → tree node indices
+            level_nodes = self.levels[current_level]
+            self.levels[current_level + 1] = self.nodes.append_level(
+                summaries,
+                summary_embeddings,
+                level=current_level + 1,
+                children=[[level_nodes[i] for i in indices] for indices in clusters.values()],
+                cluster_ids=list(clusters.keys())
+            )
             
             # Update for next level
-            self.levels[current_level + 1] = summary_nodes
+            self._save_level(current_level + 1)
             current_texts = summaries
-            current_embeddings = np.array([self.nodes[i].embedding for i in summary_nodes])
+            current_embeddings = self.nodes.matrix(self.levels[current_level + 1])
             current_level += 1
             
             logger.info(f"  → {len(summaries)} summary nodes created")
         
+        if summary_cache is not None:
+            if summary_cache.hits:
+                logger.info(f"♻️ Reused {summary_cache.hits} cached cluster summaries")
+            summary_cache.prune()
         logger.info(f"✅ RAPTOR tree built with {len(self.levels)} levels, {len(self.nodes)} total nodes")
     
+    def _build_settings(self) -> Dict:
+        """Settings that change the tree for the same chunks (part of the checkpoint key)."""
+        return {
+            "embedding_model": getattr(self.embedding_model, "model_name", type(self.embedding_model).__name__),
+            "embedding_dtype": str(self.embedding_dtype),
+            "reduction_dimension": self.clusterer.reduction_dimension,
+            "min_cluster_size": self.clusterer.min_cluster_size,
+            "summaries": self._summary_namespace(),
+        }
+    
+    def _summary_namespace(self) -> str:
+        """Summarizer settings a cached summary must match."""
+        if self.summarization == "extractive":
+            return f"extractive:{self.summarizer.max_summary_chars}:{self.summarizer.redundancy_threshold}"
+        return f"abstractive:{self.summarizer.model_name}:{self.summarizer.max_input_length}:{self.summarizer.max_summary_length}"
+    
+    def _summarize_level(
+        self,
+        clusters: Dict[int, List[int]],
+        texts: List[str],
+        embeddings: np.ndarray,
+        summary_cache: Optional[SummaryCache]
+    ) -> List[str]:
+        """Summaries of a level's clusters, summarizing only clusters not in the cache."""
+        if summary_cache is None:
+            return self.summarizer.summarize_level(clusters, texts, embeddings)
+        
+        namespace = self._summary_namespace()
+        keys = [summary_cache.key(namespace, [texts[i] for i in indices]) for indices in clusters.values()]
+        cached = [summary_cache.get(key) for key in keys]
+        missing = {
+            cluster_id: indices
+            for (cluster_id, indices), summary in zip(clusters.items(), cached)
+            if summary is None
+        }
+        fresh = iter(self.summarizer.summarize_level(missing, texts, embeddings) if missing else [])
+        
+        summaries = []
+        for key, summary in zip(keys, cached):
+            if summary is None:
+                summary = next(fresh)
+                # Fallback summaries (generator not loaded) would stick; only cache real ones
+                if self.summarizer.ready:
+                    summary_cache.put(key, summary)
+            summaries.append(summary)
+        return summaries
+    
+    def _save_level(self, level: int):
+        if self._checkpoint is None:
+            return
+        node_indices = self.levels[level]
+        self._checkpoint.save_level(level, {
+            "texts": self.nodes.texts(node_indices),
+            "embeddings": self.nodes.matrix(node_indices),
+            "children": [self.nodes.children(i) for i in node_indices],
+            "cluster_ids": self.nodes.cluster_ids[node_indices.start:node_indices.stop].tolist(),
+        })
+    
+    def _restore_levels(self, saved_levels: List[dict]):
+        """Rebuild nodes and levels from checkpointed levels (in order)."""
+        for level, payload in enumerate(saved_levels):
+            self.levels[level] = self.nodes.append_level(
+                payload["texts"],
+                payload["embeddings"],
+                level=level,
+                children=payload["children"],
+                cluster_ids=payload["cluster_ids"]
+            )
+    
+    def clear_checkpoint(self):
+        """Delete this build's level checkpoints once the tree is persisted (summaries are kept, within their budget)."""
+        if self._checkpoint is not None:
+            self._checkpoint.clear()
+            self._checkpoint = None
+    
     def _embed_texts(self, texts: List[str]) -> np.ndarray:
         """
         Embed texts using embedding model
@@ -188,10 +275,10 @@ class RAPTORTree:
             texts: List of texts
             
         Returns:
-            Array of embeddings
+            Array of embeddings in the tree's storage dtype
         """
         embeddings = self.embedding_model.embed_documents(texts)
-        return np.array(embeddings)
+        return np.asarray(embeddings, dtype=self.embedding_dtype)
     
     def retrieve_from_tree(
         self,
@@ -213,31 +300,151 @@ class RAPTORTree:
             List of (text, score, level) tuples
         """
         # Embed query
-        query_embedding = self._embed_texts([query])[0]
+        query_embedding = self.embedding_model.embed_query(query)
         
-        # Determine which levels to search
+        return self.retrieve_by_vector(query_embedding, top_k, search_level, collapse_tree)
+    
+    def retrieve_by_vector(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        search_level: Optional[int] = None,
+        collapse_tree: bool = True
+    ) -> List[Tuple[str, float, int]]:
+        """
+        Retrieve from RAPTOR tree for a precomputed query embedding
+        
+        Args:
+            query_embedding: Query vector from the tree's embedding model
+            top_k: Number of results
+            search_level: Specific level to search (None = all levels)
+            collapse_tree: Search all levels and combine
+            
+        Returns:
+            List of (text, score, level) tuples
+        """
+        with span("retrieval.raptor_scoring"):
+            scored = self.search_by_vector(query_embedding, top_k, search_level, collapse_tree)
+        
+        return [
+            (self.nodes.text(node_idx), score, int(self.nodes.levels[node_idx]))
+            for node_idx, score in scored
+        ]
+    
+    def _levels_to_search(self, search_level: Optional[int], collapse_tree: bool) -> List[int]:
         if search_level is not None:
-            levels_to_search = [search_level] if search_level in self.levels else []
-        elif collapse_tree:
-            levels_to_search = list(self.levels.keys())
-        else:
-            levels_to_search = [0]  # Only leaf level
+            return [search_level] if search_level in self.levels else []
+        if collapse_tree:
+            return list(self.levels.keys())
+        return [0]  # Only leaf level
+    
+    def retrieve_by_vectors(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 5,
+        search_level: Optional[int] = None,
+        collapse_tree: bool = True
+    ) -> List[List[Tuple[str, float, int]]]:
+        """
+        retrieve_by_vector for a batch of query embeddings
+        
+        Args:
+            query_embeddings: (num_queries, dim) query vectors
+            top_k: Number of results per query
+            search_level: Specific level to search (None = all levels)
+            collapse_tree: Search all levels and combine
+            
+        Returns:
+            List of (text, score, level) tuples per query
+        """
+        with span("retrieval.raptor_scoring"):
+            scored = self.search_by_vectors(query_embeddings, top_k, search_level, collapse_tree)
+        
+        return [
+            [(self.nodes.text(node_idx), score, int(self.nodes.levels[node_idx])) for node_idx, score in results]
+            for results in scored
+        ]
+    
+    def search_by_vectors(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 5,
+        search_level: Optional[int] = None,
+        collapse_tree: bool = True
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        search_by_vector for a batch of query embeddings
+        
+        Each level is a contiguous slice of the node matrix, scored against
+        all queries with one matrix product.
+        
+        Args:
+            query_embeddings: (num_queries, dim) query vectors
+            top_k: Number of results per query
+            search_level: Specific level to search (None = all levels)
+            collapse_tree: Search all levels and combine
+            
+        Returns:
+            List of (node index, cosine similarity) tuples per query, best first
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        query_norms = np.linalg.norm(queries, axis=1)
+        all_results = [[] for _ in range(len(queries))]
+        
+        for level in self._levels_to_search(search_level, collapse_tree):
+            node_indices = self.levels[level]
+            matrix = self.nodes.matrix(node_indices).astype(np.float32, copy=False)
+            
+            # (num_queries, num_nodes) cosine similarities
+            similarities = queries @ matrix.T / np.outer(query_norms, self.nodes.norms(node_indices))
+            
+            for results, row in zip(all_results, similarities.tolist()):
+                results.extend(zip(node_indices, row))
+        
+        for results in all_results:
+            results.sort(key=lambda x: x[1], reverse=True)
+        
+        return [results[:top_k] for results in all_results]
+    
+    def search_by_vector(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        search_level: Optional[int] = None,
+        collapse_tree: bool = True
+    ) -> List[Tuple[int, float]]:
+        """
+        Score tree nodes against a query embedding
+        
+        Args:
+            query_embedding: Query vector from the tree's embedding model
+            top_k: Number of results
+            search_level: Specific level to search (None = all levels)
+            collapse_tree: Search all levels and combine
+            
+        Returns:
+            List of (node index, cosine similarity) tuples, best first
+        """
+        # Scored in float32 whatever the storage dtype
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query_embedding)
+        
+        # Determine which levels to search
+        levels_to_search = self._levels_to_search(search_level, collapse_tree)
         
         # Search each level
         all_results = []
         
         for level in levels_to_search:
             node_indices = self.levels[level]
+            matrix = self.nodes.matrix(node_indices).astype(np.float32, copy=False)
             
-            for node_idx in node_indices:
-                node = self.nodes[node_idx]
-                
-                # Calculate similarity (cosine)
-                similarity = np.dot(query_embedding, node.embedding) / (
-                    np.linalg.norm(query_embedding) * np.linalg.norm(node.embedding)
-                )
-                
-                all_results.append((node.text, float(similarity), node.level))
+            # Calculate similarity (cosine)
+            similarities = matrix @ query_embedding / (
+                self.nodes.norms(node_indices) * query_norm
+            )
+            
+            all_results.extend(zip(node_indices, similarities.tolist()))
         
         # Sort by similarity (descending)
         all_results.sort(key=lambda x: x[1], reverse=True)
@@ -259,16 +466,43 @@ class RAPTORTree:
                 level: len(indices) for level, indices in self.levels.items()
             },
             "leaf_nodes": len(self.levels.get(0, [])),
-            "summary_nodes": sum(1 for node in self.nodes if node.is_summary)
+            "summary_nodes": int(self.nodes.is_summary.sum()),
+            "summarization": self.summarization,
+            "embedding_dtype": str(self.embedding_dtype),
+            "embedding_bytes": int(self.nodes.embeddings.nbytes),
+            "node_store_bytes": self.nodes.nbytes
         }
         
         return stats
+    
+    def __getstate__(self):
+        # Checkpoints belong to the build, not the saved tree
+        state = self.__dict__.copy()
+        state["_checkpoint"] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Trees pickled before embedding_dtype existed stored float64 arrays
+        self.__dict__.setdefault("embedding_dtype", np.dtype(np.float64))
+        self.__dict__.setdefault("summarization", "abstractive")
+        self.__dict__.setdefault("_checkpoint", None)
+        # Trees pickled before NodeStore kept a list of RAPTORNode
+        if isinstance(self.nodes, list):
+            self.nodes = NodeStore.from_nodes(self.nodes, self.embedding_dtype)
+            self.levels = {
+                # Levels were always appended as one contiguous run
+                level: range(indices[0], indices[-1] + 1) for level, indices in self.levels.items() if indices
+            }
 
 
 def create_raptor_tree(
     texts: List[str],
     embedding_model,
-    max_levels: int = 3
+    max_levels: int = 3,
+    embedding_dtype: str = RAPTOR_CONFIG["embedding_dtype"],
+    summarization: str = RAPTOR_CONFIG["summarization"],
+    checkpoint_dir: str = RAPTOR_CONFIG["checkpoint_dir"]
 ) -> RAPTORTree:
     """
     Factory function to create and build RAPTOR tree
@@ -277,15 +511,20 @@ def create_raptor_tree(
         texts: Document chunks
         embedding_model: Embedding model
         max_levels: Maximum tree depth
+        embedding_dtype: Storage dtype for node embeddings
+        summarization: "abstractive" or "extractive" cluster summaries
+        checkpoint_dir: Per-level checkpoints for resuming an interrupted build ("" = off)
         
     Returns:
         Built RAPTORTree instance
     """
     tree = RAPTORTree(
         embedding_model=embedding_model,
-        max_levels=max_levels
+        max_levels=max_levels,
+        embedding_dtype=embedding_dtype,
+        summarization=summarization
     )
     
-    tree.build_tree(texts)
+    tree.build_tree(texts, checkpoint_dir=checkpoint_dir)
     
     return tree
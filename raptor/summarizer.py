@@ -3,12 +3,17 @@
 Summarization for RAPTOR tree building
 - Summarizes clusters of chunks
 - Creates higher-level abstractions
-- Uses FLAN-T5 for summarization
+- Abstractive: FLAN-T5 per cluster
+- Extractive: most central sentences per cluster, no generative model
 """
 
 import logging
-from typing import List
-from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
+from typing import Dict, List, Optional
+import numpy as np
+from config.index_config import RAPTOR_CONFIG
+from config.model_config import INFERENCE_BACKEND
+from retrieval.chunk_analysis import sentence_spans
+from utils.inference_backend import load_seq2seq
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +33,8 @@ class RAPTORSummarizer:
         self,
         model_name: str = "google/flan-t5-base",
         max_input_length: int = 1024,
-        max_summary_length: int = 256
+        max_summary_length: int = 256,
+        backend: str = INFERENCE_BACKEND["summarizer"]
     ):
         """
         Initialize summarizer
@@ -37,15 +43,21 @@ class RAPTORSummarizer:
             model_name: HuggingFace model for summarization
             max_input_length: Max tokens for input
             max_summary_length: Max tokens for summary
+            backend: Inference backend ("torch", "int8" or "onnx")
         """
         self.model_name = model_name
         self.max_input_length = max_input_length
         self.max_summary_length = max_summary_length
+        self.backend = backend
         
+        self._load()
+    
+    def _load(self):
         try:
-            logger.info(f"🔧 Loading summarizer: {model_name}")
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+            from transformers import pipeline
+            
+            logger.info(f"🔧 Loading summarizer: {self.model_name} ({self.backend})")
+            self.model, self.tokenizer = load_seq2seq(self.model_name, self.backend)
             
             self.summarizer = pipeline(
                 "text2text-generation",
@@ -58,7 +70,29 @@ class RAPTORSummarizer:
             
         except Exception as e:
             logger.error(f"❌ Failed to load summarizer: {e}")
+            self.model = None
+            self.tokenizer = None
             self.summarizer = None
+        
+        self._loaded = True
+    
+    @property
+    def ready(self) -> bool:
+        """Whether summaries come from the generator (not the concatenation fallback)."""
+        if not self._loaded:
+            self._load()
+        return self.summarizer is not None
+    
+    def __getstate__(self):
+        # A built tree never needs the generator; reload lazily if it does
+        state = self.__dict__.copy()
+        state.update(model=None, tokenizer=None, summarizer=None, _loaded=False)
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault("backend", "torch")
+        self.__dict__.setdefault("_loaded", self.summarizer is not None)
     
     def summarize_cluster(
         self,
@@ -75,6 +109,9 @@ class RAPTORSummarizer:
         Returns:
             Summary text
         """
+        if not self._loaded:
+            self._load()
+        
         if not self.summarizer or not texts:
             return " ".join(texts[:3])  # Fallback: concatenate first 3
         
@@ -144,18 +181,192 @@ Summary:"""
         logger.info(f"✅ Summarized {len(clusters)} clusters")
         
         return summaries
+    
+    def summarize_level(
+        self,
+        clusters: Dict[int, List[int]],
+        texts: List[str],
+        embeddings: np.ndarray
+    ) -> List[str]:
+        """
+        Summarize every cluster of a tree level (one summary per cluster, in order)
+        
+        Args:
+            clusters: Dict mapping cluster_id → list of indices into texts
+            texts: Texts of the level
+            embeddings: Their embeddings (unused; the generator reads text)
+        """
+        return self.summarize_multiple_clusters(clusters, texts)
+
+
+class ExtractiveSummarizer:
+    """
+    Extractive summarizer for RAPTOR tree construction
+    
+    How it works:
+    1. Splits the cluster's texts into sentences
+    2. Embeds all sentences of a level in one batch (sentences seen at a
+       lower level are reused, so upper levels embed almost nothing)
+    3. Scores each sentence by cosine similarity to its cluster centroid,
+       the mean of the member embeddings the tree already has
+    4. Keeps the most central, non-redundant sentences within a character
+       budget, in their original order
+    """
+    
+    def __init__(
+        self,
+        embedding_model,
+        max_summary_chars: int = RAPTOR_CONFIG["extractive_max_chars"],
+        redundancy_threshold: float = 0.95
+    ):
+        """
+        Args:
+            embedding_model: Embedding model of the tree
+            max_summary_chars: Length budget per summary
+            redundancy_threshold: Skip sentences this similar to one already picked
+        """
+        self.embedding_model = embedding_model
+        self.max_summary_chars = max_summary_chars
+        self.redundancy_threshold = redundancy_threshold
+        self._sentence_embeddings: Dict[str, np.ndarray] = {}
+    
+    ready = True  # No model to fail loading
+    
+    def __getstate__(self):
+        # The sentence cache only helps while building
+        state = self.__dict__.copy()
+        state["_sentence_embeddings"] = {}
+        return state
+    
+    @staticmethod
+    def _sentences(text: str) -> List[str]:
+        """Sentences of a text (the whole text if it has no full sentence)."""
+        sentences = [text[start:end] for start, end in sentence_spans(text)]
+        return sentences or ([text.strip()] if text.strip() else [])
+    
+    def _embed_sentences(self, sentences: List[str]) -> np.ndarray:
+        """Unit-normalized embeddings, embedding only sentences not seen before."""
+        missing = list(dict.fromkeys(s for s in sentences if s not in self._sentence_embeddings))
+        if missing:
+            vectors = np.asarray(self.embedding_model.embed_documents(missing), dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            self._sentence_embeddings.update(zip(missing, vectors))
+        if not sentences:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([self._sentence_embeddings[s] for s in sentences])
+    
+    def summarize_level(
+        self,
+        clusters: Dict[int, List[int]],
+        texts: List[str],
+        embeddings: np.ndarray
+    ) -> List[str]:
+        """
+        Summarize every cluster of a tree level (one summary per cluster, in order)
+        
+        Args:
+            clusters: Dict mapping cluster_id → list of indices into texts
+            texts: Texts of the level
+            embeddings: Their embeddings, used for the cluster centroids
+            
+        Returns:
+            List of summaries
+        """
+        # Sentences of every cluster, in document order, with their owner cluster
+        per_cluster = [
+            [sentence for i in indices for sentence in self._sentences(texts[i])]
+            for indices in clusters.values()
+        ]
+        sentences = [sentence for cluster_sentences in per_cluster for sentence in cluster_sentences]
+        if not sentences:
+            return ["" for _ in clusters]
+        sentence_matrix = self._embed_sentences(sentences)
+        owners = np.repeat(np.arange(len(per_cluster)), [len(c) for c in per_cluster])
+        
+        # Cluster centroids from the member embeddings the tree already computed
+        members = np.asarray(embeddings, dtype=np.float32)
+        members = members / np.maximum(np.linalg.norm(members, axis=1, keepdims=True), 1e-12)
+        centroids = np.stack([members[indices].mean(axis=0) for indices in clusters.values()])
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        
+        # Centrality of every sentence of the level in one pass
+        scores = np.einsum("ij,ij->i", sentence_matrix, centroids[owners])
+        
+        summaries = []
+        start = 0
+        for cluster_sentences in per_cluster:
+            end = start + len(cluster_sentences)
+            summaries.append(self._select(cluster_sentences, sentence_matrix[start:end], scores[start:end]))
+            start = end
+        
+        logger.info(f"✅ Extracted summaries for {len(clusters)} clusters ({len(sentences)} sentences)")
+        return summaries
+    
+    def _select(self, sentences: List[str], vectors: np.ndarray, scores: np.ndarray) -> str:
+        """Most central sentences within the budget, in original order."""
+        if not sentences:
+            return ""
+        chosen: List[int] = []
+        length = 0
+        for i in np.argsort(-scores, kind="stable"):
+            cost = len(sentences[i]) + (2 if chosen else 1)  # ". " separator or the final "."
+            if chosen and length + cost > self.max_summary_chars:
+                continue
+            if chosen and float((vectors[chosen] @ vectors[i]).max()) >= self.redundancy_threshold:
+                continue
+            chosen.append(int(i))
+            length += cost
+            if length >= self.max_summary_chars:
+                break
+        summary = ". ".join(sentences[i] for i in sorted(chosen)) + "."
+        if len(summary) > self.max_summary_chars:
+            # A single central sentence longer than the budget
+            summary = summary[:self.max_summary_chars].rsplit(" ", 1)[0]
+        return summary
+    
+    def summarize_cluster(
+        self,
+        texts: List[str],
+        cluster_id: int = 0
+    ) -> str:
+        """
+        Summarize a cluster of texts
+        
+        Args:
+            texts: List of text chunks to summarize
+            cluster_id: Cluster identifier
+            
+        Returns:
+            Summary text
+        """
+        if not texts:
+            return ""
+        embeddings = np.asarray(self.embedding_model.embed_documents(texts), dtype=np.float32)
+        return self.summarize_level({cluster_id: list(range(len(texts)))}, texts, embeddings)[0]
 
 
 def create_summarizer(
-    model_name: str = "google/flan-t5-base"
-) -> RAPTORSummarizer:
+    model_name: str = "google/flan-t5-base",
+    backend: str = INFERENCE_BACKEND["summarizer"],
+    mode: str = "abstractive",
+    embedding_model: Optional[object] = None
+):
     """
     Factory function to create summarizer
     
     Args:
-        model_name: HuggingFace model name
+        model_name: HuggingFace model name (abstractive)
+        backend: Inference backend (abstractive)
+        mode: "abstractive" (FLAN-T5) or "extractive" (central sentences)
+        embedding_model: Embedding model (required for extractive)
         
     Returns:
-        RAPTORSummarizer instance
+        RAPTORSummarizer or ExtractiveSummarizer instance
     """
-    return RAPTORSummarizer(model_name)
+    if mode == "extractive":
+        if embedding_model is None:
+            raise ValueError("Extractive summarization needs the tree's embedding model")
+        return ExtractiveSummarizer(embedding_model)
+    if mode != "abstractive":
+        raise ValueError(f"Unknown RAPTOR summarization mode: {mode}")
+    return RAPTORSummarizer(model_name, backend=backend)
@@ -4,11 +4,12 @@ BM25 Keyword-based Retrieval
 - Best for exact term matching
 - Complements semantic search
 - Fast and efficient
+- Batch scoring computes each distinct query term's column once per batch
 """
 
 import logging
-from typing import List, Tuple
-from rank_bm25 import BM25Okapi
+import math
+from typing import Dict, Iterable, List, Tuple
 import numpy as np
 
 logger = logging.getLogger(__name__)
@@ -38,6 +39,7 @@ class BM25Retriever:
         self.tokenized_docs = [doc.lower().split() for doc in documents]
         
         # Build BM25 index
+        from rank_bm25 import BM25Okapi
         self.bm25 = BM25Okapi(self.tokenized_docs)
         
         logger.info(f"✅ BM25 index built with {len(documents)} documents")
@@ -54,25 +56,93 @@ class BM25Retriever:
             List of (document, score) tuples
         """
         # Tokenize query
-        tokenized_query = query.lower().split()
+        return self.retrieve_tokens(query.lower().split(), top_k=top_k)
+    
+    def retrieve_tokens(self, tokenized_query: List[str], top_k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Retrieve top-k documents for an already tokenized query
         
+        Args:
+            tokenized_query: Lowercased query tokens
+            top_k: Number of results to return
+            
+        Returns:
+            List of (document, score) tuples
+        """
         # Get BM25 scores
         scores = self.bm25.get_scores(tokenized_query)
         
-        # Get top-k indices
-        top_indices = np.argsort(scores)[-top_k:][::-1]
-        
-        # Return documents with scores
-        results = [
-            (self.documents[i], float(scores[i]))
-            for i in top_indices
-            if scores[i] > 0  # Only return documents with non-zero scores
-        ]
+        # Top-k documents with non-zero scores
+        results = self._top_k(scores, top_k)
         
         logger.debug(f"BM25 retrieved {len(results)} documents")
         
         return results
     
+    def _top_k(self, scores: np.ndarray, top_k: int) -> List[Tuple[str, float]]:
+        """Top-k (document, score) pairs, skipping documents with a zero score."""
+        top_indices = np.argsort(scores)[-top_k:][::-1]
+        return [(self.documents[i], float(scores[i])) for i in top_indices if scores[i] > 0]
+    
+    def get_scores_batch(self, tokenized_queries: List[List[str]]) -> np.ndarray:
+        """
+        BM25 scores of several tokenized queries (same values as BM25Okapi.get_scores)
+        
+        rank_bm25 rebuilds a term's frequency column over every document
+        for each query that contains it; here each distinct term of the
+        batch is scored once and its column is added to every query using it.
+        
+        Args:
+            tokenized_queries: Lowercased tokens per query
+            
+        Returns:
+            (num_queries, num_documents) score matrix
+        """
+        bm25 = self.bm25
+        scores = np.zeros((len(tokenized_queries), bm25.corpus_size))
+        doc_len = np.array(bm25.doc_len)
+        length_norm = bm25.k1 * (1 - bm25.b + bm25.b * doc_len / bm25.avgdl)
+        columns: Dict[str, np.ndarray] = {}
+        
+        for row, tokens in enumerate(tokenized_queries):
+            for term in tokens:
+                column = columns.get(term)
+                if column is None:
+                    q_freq = np.array([(doc.get(term) or 0) for doc in bm25.doc_freqs])
+                    column = (bm25.idf.get(term) or 0) * (q_freq * (bm25.k1 + 1) / (q_freq + length_norm))
+                    columns[term] = column
+                scores[row] += column
+        
+        return scores
+    
+    def retrieve_tokens_batch(
+        self,
+        tokenized_queries: List[List[str]],
+        top_k: int = 10
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Retrieve top-k documents for several tokenized queries
+        
+        Args:
+            tokenized_queries: Lowercased tokens per query
+            top_k: Number of results per query
+            
+        Returns:
+            List of (document, score) tuples per query
+        """
+        scores = self.get_scores_batch(tokenized_queries)
+        return [self._top_k(row, top_k) for row in scores]
+    
+    def use_corpus_stats(self, idf: Dict[str, float], avgdl: float):
+        """
+        Score with IDF and average length of a larger corpus (see bm25_corpus_stats)
+        
+        A shard holding part of the chunks then scores exactly like one
+        index over all of them, so scores from different shards compare.
+        """
+        self.bm25.idf = idf
+        self.bm25.avgdl = avgdl
+    
     def get_scores(self, query: str) -> np.ndarray:
         """
         Get BM25 scores for all documents
@@ -87,6 +157,45 @@ class BM25Retriever:
         return self.bm25.get_scores(tokenized_query)
 
 
+def bm25_corpus_stats(
+    tokenized_docs: Iterable[List[str]],
+    epsilon: float = 0.25
+) -> Tuple[Dict[str, float], float]:
+    """
+    IDF table and average document length of a corpus, as BM25Okapi computes them
+    
+    Only document frequencies are kept (no per-document term counts), so
+    a coordinator can compute the stats of a corpus it then partitions.
+    
+    Args:
+        tokenized_docs: Lowercased tokens per document, in corpus order
+        epsilon: BM25Okapi floor for negative IDFs (fraction of the mean IDF)
+        
+    Returns:
+        (idf, avgdl) tuple
+    """
+    doc_freq: Dict[str, int] = {}
+    num_docs = total_len = 0
+    for tokens in tokenized_docs:
+        num_docs += 1
+        total_len += len(tokens)
+        for word in dict.fromkeys(tokens):
+            doc_freq[word] = doc_freq.get(word, 0) + 1
+    
+    # Same formula and summation order as rank_bm25.BM25Okapi._calc_idf
+    idf, idf_sum, negative = {}, 0, []
+    for word, freq in doc_freq.items():
+        idf[word] = math.log(num_docs - freq + 0.5) - math.log(freq + 0.5)
+        idf_sum += idf[word]
+        if idf[word] < 0:
+            negative.append(word)
+    eps = epsilon * idf_sum / len(idf) if idf else 0.0
+    for word in negative:
+        idf[word] = eps
+    
+    return idf, total_len / num_docs if num_docs else 0.0
+
+
 def create_bm25_index(documents: List[str]) -> BM25Retriever:
     """
     Factory function to create BM25 retriever
@@ -0,0 +1,218 @@
+# retrieval/chunk_analysis.py
+"""
+Per-chunk text statistics computed once at ingestion
+- Token id arrays (lowercased whitespace tokens, as the scorers used)
+- Term-frequency maps as sorted (term id, count) arrays
+- Sentence offsets for key fact extraction
+- Stored in CSR layout (one flat array + offsets), pickled with the index
+
+Query-time scorers (keyword overlap, term frequency, answer grounding)
+become array lookups over the retrieved chunk ids instead of
+re-tokenizing retrieved text on every request.
+"""
+
+import logging
+import re
+import threading
+import weakref
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_RE = re.compile(r"[^.!?]+")
+MIN_FACT_CHARS = 20  # Sentences this short are not key facts
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens the scorers compare: lowercased, split on whitespace."""
+    return text.lower().split()
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) of stripped sentences longer than MIN_FACT_CHARS."""
+    spans = []
+    for match in _SENTENCE_RE.finditer(text):
+        piece = match.group()
+        stripped = piece.strip()
+        if len(stripped) > MIN_FACT_CHARS:
+            start = match.start() + (len(piece) - len(piece.lstrip()))
+            spans.append((start, start + len(stripped)))
+    return spans
+
+
+def _csr(rows: List[np.ndarray], dtype) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(row) for row in rows])
+    flat = np.concatenate(rows).astype(dtype) if rows else np.zeros(0, dtype=dtype)
+    return flat, offsets
+
+
+class ChunkAnalysis:
+    """
+    Token and sentence statistics of an index's chunks (by chunk_id)
+
+    How it works:
+    1. Every token gets an id in a shared vocabulary
+    2. Per chunk: token ids in order, sorted unique ids with their counts,
+       and sentence character spans
+    3. Scorers gather the rows of the requested chunks with one fancy
+       index and reduce per chunk with np.bincount
+    """
+
+    def __init__(self, texts: Sequence[str]):
+        """
+        Args:
+            texts: Chunk texts; position i is chunk_id i
+        """
+        self.vocab: Dict[str, int] = {}
+        token_rows, term_rows, count_rows, span_rows = [], [], [], []
+
+        for text in texts:
+            ids = np.fromiter(
+                (self.vocab.setdefault(token, len(self.vocab)) for token in tokenize(text)),
+                dtype=np.int32
+            )
+            terms, counts = np.unique(ids, return_counts=True)
+            token_rows.append(ids)
+            term_rows.append(terms)
+            count_rows.append(counts)
+            span_rows.append(np.asarray(sentence_spans(text), dtype=np.int32).reshape(-1, 2))
+
+        self.num_chunks = len(texts)
+        self.token_ids, self.token_offsets = _csr(token_rows, np.int32)
+        self.term_ids, self.term_offsets = _csr(term_rows, np.int32)
+        self.term_counts, _ = _csr(count_rows, np.int32)
+        spans, self.span_offsets = _csr([row.ravel() for row in span_rows], np.int32)
+        self.spans = spans.reshape(-1, 2)
+        self.span_offsets //= 2
+
+    # -------------------- Lookups --------------------
+
+    def tokens(self, chunk_id: int) -> np.ndarray:
+        """Token ids of a chunk in order."""
+        return self.token_ids[self.token_offsets[chunk_id]:self.token_offsets[chunk_id + 1]]
+
+    def valid(self, chunk_ids: np.ndarray) -> np.ndarray:
+        """Mask of ids that refer to chunks of this index."""
+        return (chunk_ids >= 0) & (chunk_ids < self.num_chunks)
+
+    def _gather(self, chunk_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Flat positions of the chunks' term rows, and the row each belongs to."""
+        starts = self.term_offsets[chunk_ids]
+        lengths = self.term_offsets[chunk_ids + 1] - starts
+        row = np.repeat(np.arange(len(chunk_ids)), lengths)
+        shift = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return np.arange(lengths.sum()) + shift, row
+
+    def _query_weights(self, tokens: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted known term ids of a query and how often each occurs in it."""
+        counts = Counter(self.vocab[t] for t in tokens if t in self.vocab)
+        if not counts:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64)
+        ids = np.fromiter(sorted(counts), dtype=np.int32)
+        return ids, np.fromiter((counts[i] for i in ids), dtype=np.int64)
+
+    def _score(self, chunk_ids: np.ndarray, query_ids: np.ndarray, weights: np.ndarray, use_counts: bool) -> np.ndarray:
+        if len(chunk_ids) == 0 or len(query_ids) == 0:
+            return np.zeros(len(chunk_ids))
+        positions, row = self._gather(chunk_ids)
+        terms = self.term_ids[positions]
+        slot = np.minimum(np.searchsorted(query_ids, terms), len(query_ids) - 1)
+        contribution = np.where(query_ids[slot] == terms, weights[slot], 0)
+        if use_counts:
+            contribution = contribution * self.term_counts[positions]
+        return np.bincount(row, weights=contribution, minlength=len(chunk_ids))
+
+    # -------------------- Scorers --------------------
+
+    def keyword_overlap(self, chunk_ids: np.ndarray, query_tokens: Sequence[str]) -> np.ndarray:
+        """Distinct query tokens present in each chunk."""
+        query_ids, _ = self._query_weights(set(query_tokens))
+        return self._score(chunk_ids, query_ids, np.ones(len(query_ids)), use_counts=False)
+
+    def term_frequency(self, chunk_ids: np.ndarray, query_tokens: Sequence[str]) -> np.ndarray:
+        """Occurrences of the query tokens in each chunk (query repeats count again)."""
+        query_ids, weights = self._query_weights(query_tokens)
+        return self._score(chunk_ids, query_ids, weights, use_counts=True)
+
+    def vocabulary(self, chunk_ids: np.ndarray) -> np.ndarray:
+        """Sorted distinct term ids of a set of chunks."""
+        if len(chunk_ids) == 0:
+            return np.zeros(0, dtype=np.int32)
+        positions, _ = self._gather(np.asarray(chunk_ids))
+        return np.unique(self.term_ids[positions])
+
+    def grounding(self, text: str, vocabulary: np.ndarray) -> Tuple[int, int]:
+        """(distinct tokens of text found in vocabulary, distinct tokens of text)."""
+        words = set(tokenize(text))
+        known = np.fromiter((self.vocab[w] for w in words if w in self.vocab), dtype=np.int32)
+        if len(known) == 0 or len(vocabulary) == 0:
+            return 0, len(words)
+        # vocabulary is sorted: binary search instead of np.isin's sort
+        slot = np.minimum(np.searchsorted(vocabulary, known), len(vocabulary) - 1)
+        return int((vocabulary[slot] == known).sum()), len(words)
+
+    def sentences(self, chunk_id: int, text: str) -> List[str]:
+        """Key fact candidates of a chunk, sliced from its text."""
+        spans = self.spans[self.span_offsets[chunk_id]:self.span_offsets[chunk_id + 1]]
+        # A truncated passage keeps a prefix of the chunk, so drop spans past its end
+        return [text[start:end] for start, end in spans if end <= len(text)]
+
+    def get_stats(self) -> dict:
+        arrays = (self.token_ids, self.token_offsets, self.term_ids, self.term_offsets,
+                  self.term_counts, self.spans, self.span_offsets)
+        return {
+            "chunks": self.num_chunks,
+            "vocabulary": len(self.vocab),
+            "tokens": int(len(self.token_ids)),
+            "sentences": int(len(self.spans)),
+            "array_bytes": int(sum(a.nbytes for a in arrays))
+        }
+
+
+# -------------------- Chunk id resolution --------------------
+
+# Docstore text → metadata, for retrievers that return bare text (multi-level, RAPTOR leaves)
+_metadata_by_text: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_metadata_lock = threading.Lock()
+
+
+def chunk_metadata_lookup(vector_store) -> Dict[str, dict]:
+    """Text → chunk metadata of a vector store's docstore (built once per docstore)."""
+    docstore = getattr(vector_store, "docstore", None)
+    if docstore is None:
+        return {}
+    with _metadata_lock:
+        lookup = _metadata_by_text.get(docstore)
+        if lookup is None:
+            lookup = {doc.page_content: doc.metadata for doc in getattr(docstore, "_dict", {}).values()}
+            _metadata_by_text[docstore] = lookup
+    return lookup
+
+
+def chunk_metadata(doc, vector_store=None, lookup: Optional[Dict[str, dict]] = None) -> dict:
+    """A document's metadata, looked up by text when it has no chunk_id."""
+    metadata = getattr(doc, "metadata", None) or {}
+    if "chunk_id" not in metadata and (lookup is not None or vector_store is not None):
+        if lookup is None:
+            lookup = chunk_metadata_lookup(vector_store)
+        metadata = lookup.get(doc.page_content, metadata)
+    return metadata
+
+
+def resolve_chunk_ids(docs, vector_store=None) -> np.ndarray:
+    """chunk_id per document (-1 when unknown, e.g. RAPTOR summaries)."""
+    lookup = chunk_metadata_lookup(vector_store) if vector_store is not None else None
+    ids = []
+    for doc in docs:
+        chunk_id = chunk_metadata(doc, lookup=lookup).get("chunk_id")
+        ids.append(chunk_id if isinstance(chunk_id, int) else -1)
+    return np.asarray(ids, dtype=np.int64)
+
+
+def get_chunk_analysis(vector_store) -> Optional[ChunkAnalysis]:
+    """Analysis attached to a loaded vector store (None for indexes built before it existed)."""
+    return getattr(vector_store, "chunk_analysis", None)
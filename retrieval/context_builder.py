@@ -0,0 +1,320 @@
+# retrieval/context_builder.py
+"""
+Token-budgeted prompt context
+- Merges retrieved chunks that are neighbours (chunk_id i, i+1) and drops
+  the text they share through the splitter's overlap
+- Drops passages whose word shingles are mostly contained in a better one
+- Packs passages in rerank order until the token budget is used
+- Reports prompt tokens before (every passage + key facts) and after
+"""
+
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from langchain_core.documents import Document
+from config.model_config import CONTEXT_CONFIG
+from retrieval.chunk_analysis import ChunkAnalysis, chunk_metadata, chunk_metadata_lookup
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+
+# -------------------- Token counting --------------------
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """tiktoken encoding, or False when unavailable (falls back to an estimate)."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(CONTEXT_CONFIG["tokenizer"])
+                except Exception as e:
+                    logger.info(f"tiktoken unavailable ({type(e).__name__}), estimating tokens as chars / 4")
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens of a text (exact with tiktoken, else ~4 characters per token)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+# -------------------- Passages --------------------
+
+@dataclass
+class Passage:
+    """
+    One block of the prompt context
+
+    Attributes:
+        text: Passage text
+        rank: Best rerank position among its chunks (0 = most relevant)
+        chunk_ids: Source chunk ids in reading order (empty for summaries)
+        source: Source document name
+    """
+    text: str
+    rank: int
+    chunk_ids: List[int] = field(default_factory=list)
+    source: Optional[str] = None
+
+    def label(self) -> str:
+        if not self.chunk_ids:
+            return "Chunk N/A"
+        if len(self.chunk_ids) == 1:
+            return f"Chunk {self.chunk_ids[0]}"
+        return f"Chunks {self.chunk_ids[0]}-{self.chunk_ids[-1]}"
+
+
+@dataclass
+class PackedContext:
+    """
+    Result of build_context
+
+    Attributes:
+        context: Prompt context ("[Passage i]: ..." blocks)
+        source_info: "Passage i: Chunk n" line per passage
+        facts_str: Key facts ("- fact" lines), empty unless enabled
+        passages: Passages in the context
+        tokens_before: Tokens of every reranked passage plus key facts
+        tokens_after: Tokens of context plus facts_str
+        merged: Chunks folded into a neighbour
+        duplicates: Passages dropped as near-duplicates
+        over_budget: Passages left out for the token budget
+    """
+    context: str
+    source_info: List[str]
+    facts_str: str
+    passages: List[Passage]
+    tokens_before: int
+    tokens_after: int
+    merged: int = 0
+    duplicates: int = 0
+    over_budget: int = 0
+
+    def get_stats(self) -> dict:
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "passages": len(self.passages),
+            "merged": self.merged,
+            "duplicates": self.duplicates,
+            "over_budget": self.over_budget
+        }
+
+
+def _to_passages(docs: Sequence[Document], vector_store=None) -> List[Passage]:
+    lookup = chunk_metadata_lookup(vector_store) if vector_store is not None else None
+    passages = []
+    for rank, doc in enumerate(docs):
+        metadata = chunk_metadata(doc, lookup=lookup)
+        chunk_id = metadata.get("chunk_id")
+        passages.append(Passage(
+            text=doc.page_content,
+            rank=rank,
+            chunk_ids=[chunk_id] if isinstance(chunk_id, int) else [],
+            source=metadata.get("source")
+        ))
+    return passages
+
+
+def _join_overlapping(left: str, right: str, probe: int = 24) -> str:
+    """Concatenate neighbouring chunks, keeping their shared overlap once."""
+    head = right[:probe]
+    if head:
+        start = left.find(head)
+        while start != -1:
+            tail = left[start:]
+            if right.startswith(tail):
+                return left + right[len(tail):]
+            start = left.find(head, start + 1)
+    # No shared text: the splitter cut at a paragraph break
+    return f"{left}\n{right}"
+
+
+def merge_adjacent(passages: List[Passage]) -> List[Passage]:
+    """Fold runs of consecutive chunk ids from the same source into one passage."""
+    by_source: Dict[Optional[str], List[Passage]] = {}
+    merged = []
+    for passage in passages:
+        if passage.chunk_ids:
+            by_source.setdefault(passage.source, []).append(passage)
+        else:
+            merged.append(passage)
+
+    for group in by_source.values():
+        group.sort(key=lambda p: p.chunk_ids[0])
+        current = None
+        for passage in group:
+            if current is not None and passage.chunk_ids[0] == current.chunk_ids[-1] + 1:
+                current.text = _join_overlapping(current.text, passage.text)
+                current.chunk_ids.extend(passage.chunk_ids)
+                current.rank = min(current.rank, passage.rank)
+            elif current is not None and passage.chunk_ids[0] == current.chunk_ids[-1]:
+                continue  # Same chunk retrieved twice
+            else:
+                current = Passage(passage.text, passage.rank, list(passage.chunk_ids), passage.source)
+                merged.append(current)
+
+    merged.sort(key=lambda p: p.rank)
+    return merged
+
+
+def _shingles(text: str, n: int = 3) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < n:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def drop_near_duplicates(passages: List[Passage], threshold: float) -> List[Passage]:
+    """Keep passages (best first) unless threshold of their shingles appear in a kept one."""
+    kept, kept_shingles = [], []
+    for passage in passages:
+        shingles = _shingles(passage.text)
+        if shingles and any(len(shingles & other) >= threshold * len(shingles) for other in kept_shingles):
+            continue
+        kept.append(passage)
+        kept_shingles.append(shingles)
+    return kept
+
+
+def _truncate_to_budget(text: str, budget: int) -> str:
+    """Cut text (at a word boundary) to about budget tokens."""
+    while text and count_tokens(text) > budget:
+        cut = max(1, int(len(text) * budget / max(count_tokens(text), 1) * 0.95))
+        text = text[:cut].rsplit(" ", 1)[0] if " " in text[:cut] else text[:cut]
+    return text
+
+
+def _format(index: int, text: str) -> str:
+    return f"[Passage {index}]: {text}"
+
+
+def _format_facts(facts: List[str]) -> str:
+    return "\n".join([f"- {fact}" for fact in facts])
+
+
+def _key_facts(
+    passages: List[Passage],
+    extract_facts: Callable[[str], List[str]],
+    analysis: ChunkAnalysis,
+    limit: int = 5
+) -> List[str]:
+    """First key facts across passages; single-chunk passages use precomputed sentence spans."""
+    facts = []
+    for passage in passages:
+        if len(passage.chunk_ids) == 1 and 0 <= passage.chunk_ids[0] < analysis.num_chunks:
+            facts.extend(analysis.sentences(passage.chunk_ids[0], passage.text))
+        else:
+            facts.extend(extract_facts(passage.text))
+        if len(facts) >= limit:
+            break
+    return facts[:limit]
+
+
+# -------------------- Builder --------------------
+
+def build_context(
+    docs: Sequence[Document],
+    extract_facts: Optional[Callable[[str], List[str]]] = None,
+    vector_store=None,
+    token_budget: int = CONTEXT_CONFIG["token_budget"],
+    merge: bool = CONTEXT_CONFIG["merge_adjacent"],
+    dedup_threshold: float = CONTEXT_CONFIG["dedup_threshold"],
+    key_facts: bool = CONTEXT_CONFIG["key_facts"],
+    analysis: Optional[ChunkAnalysis] = None
+) -> PackedContext:
+    """
+    Build the prompt context from reranked documents (best first)
+
+    Args:
+        docs: Reranked documents
+        extract_facts: Key fact extractor (also used to count the old prompt)
+        vector_store: Looks up chunk ids of documents that lack them
+        token_budget: Max tokens of context plus key facts
+        merge: Merge neighbouring chunks
+        dedup_threshold: Shingle containment that marks a near-duplicate (>1 disables)
+        key_facts: Append key facts (they repeat sentences already in the context)
+        analysis: Index's chunk analysis; key facts come from its sentence spans
+
+    Returns:
+        PackedContext
+    """
+    passages = _to_passages(docs, vector_store)
+
+    # What the prompt used to contain: every passage, plus five key facts
+    full_context = "\n\n".join(_format(i, doc.page_content) for i, doc in enumerate(docs, 1))
+    if extract_facts is None:
+        full_facts = ""
+    elif analysis is not None:
+        full_facts = _format_facts(_key_facts(passages, extract_facts, analysis))
+    else:
+        full_facts = _format_facts(extract_facts(full_context))
+    tokens_before = count_tokens(full_context) + count_tokens(full_facts)
+
+    total = len(passages)
+    if merge:
+        passages = merge_adjacent(passages)
+    merged = total - len(passages)
+    candidates = drop_near_duplicates(passages, dedup_threshold) if dedup_threshold <= 1 else passages
+    duplicates = len(passages) - len(candidates)
+
+    # Greedy by rank: take each passage that still fits
+    packed, blocks, used = [], [], 0
+    separator = count_tokens("\n\n")
+    for passage in candidates:
+        block = _format(len(packed) + 1, passage.text)
+        cost = count_tokens(block) + (separator if blocks else 0)
+        if used + cost > token_budget:
+            if packed:
+                continue
+            # Never send an empty context: cut the best passage down to the budget
+            passage = Passage(
+                _truncate_to_budget(passage.text, max(token_budget - count_tokens(_format(1, "")), 1)),
+                passage.rank, passage.chunk_ids, passage.source
+            )
+            block = _format(1, passage.text)
+            cost = count_tokens(block)
+        packed.append(passage)
+        blocks.append(block)
+        used += cost
+
+    context = "\n\n".join(blocks)
+    facts_str = ""
+    if key_facts and extract_facts and context:
+        facts = _key_facts(packed, extract_facts, analysis) if analysis is not None else extract_facts(context)
+        # Facts are optional: keep only those that fit what's left of the budget
+        while facts and used + count_tokens(_format_facts(facts)) > token_budget:
+            facts.pop()
+        facts_str = _format_facts(facts)
+
+    result = PackedContext(
+        context=context,
+        source_info=[f"Passage {i}: {p.label()}" for i, p in enumerate(packed, 1)],
+        facts_str=facts_str,
+        passages=packed,
+        tokens_before=tokens_before,
+        tokens_after=count_tokens(context) + count_tokens(facts_str),
+        merged=merged,
+        duplicates=duplicates,
+        over_budget=len(candidates) - len(packed)
+    )
+    logger.info(
+        f"✂️ Prompt context {result.tokens_before} → {result.tokens_after} tokens "
+        f"({merged} merged, {duplicates} duplicates, {result.over_budget} over budget)"
+    )
+    return result
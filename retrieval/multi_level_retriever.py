@@ -5,6 +5,7 @@ Multi-Level Retrieval System
 - Level 2: FAISS (semantic search)
 - Level 3: Cross-encoder reranking
 - Ensemble scoring for best results
+- Batch mode: one BM25 pass, one FAISS search and one reranker pass per batch
 """
 
 import logging
@@ -12,6 +13,9 @@ from typing import List, Tuple, Dict, Optional
 import numpy as np
 from retrieval.bm25_retriever import BM25Retriever
 from retrieval.reranker import CrossEncoderReranker
+from retrieval.query_context import QueryContext, build_query_context
+from utils.tracing import span
+from utils.vector_storage import search_by_vectors
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +71,25 @@ class MultiLevelRetriever:
         results = self.vector_store.similarity_search_with_score(query, k=top_k)
         return [(doc.page_content, float(score)) for doc, score in results]
     
+    def retrieve_semantic_by_vector(self, embedding: np.ndarray, top_k: int = 20) -> List[Tuple[str, float]]:
+        """Level 2: Semantic search with FAISS for a precomputed query embedding"""
+        results = self.vector_store.similarity_search_with_score_by_vector(
+            np.asarray(embedding, dtype=np.float32).tolist(), k=top_k
+        )
+        return [(doc.page_content, float(score)) for doc, score in results]
+    
+    def retrieve_semantic_by_vectors(self, embeddings: np.ndarray, top_k: int = 20) -> List[List[Tuple[str, float]]]:
+        """Level 2 for a batch of query embeddings (one FAISS search call)"""
+        return [
+            [(doc.page_content, score) for doc, score in results]
+            for results in search_by_vectors(self.vector_store, embeddings, k=top_k)
+        ]
+    
+    def _query_context(self, query: str, query_context: Optional[QueryContext]) -> QueryContext:
+        if query_context is not None:
+            return query_context
+        return build_query_context(query, self.vector_store.embedding_function)
+    
     def ensemble_scores(
         self,
         bm25_results: List[Tuple[str, float]],
@@ -126,7 +149,8 @@ class MultiLevelRetriever:
         top_k: int = 5,
         bm25_weight: float = 0.3,
         semantic_weight: float = 0.7,
-        intermediate_k: int = 20
+        intermediate_k: int = 20,
+        query_context: Optional[QueryContext] = None
     ) -> List[Tuple[str, float]]:
         """
         Multi-level retrieval with all strategies
@@ -137,20 +161,24 @@ class MultiLevelRetriever:
             bm25_weight: Weight for BM25 (keyword)
             semantic_weight: Weight for semantic
             intermediate_k: Number of candidates from each method
+            query_context: Precomputed tokens/embedding (built here if omitted)
             
         Returns:
             Top-k documents with scores
         """
         logger.info(f"🔍 Multi-level retrieval for: {query[:50]}...")
+        query_context = self._query_context(query, query_context)
         
         # Level 1: BM25 (keyword)
         logger.debug("Level 1: BM25 search...")
-        bm25_results = self.retrieve_bm25(query, top_k=intermediate_k)
+        with span("retrieval.bm25"):
+            bm25_results = self.bm25.retrieve_tokens(query_context.tokens, top_k=intermediate_k)
         logger.debug(f"  → {len(bm25_results)} BM25 results")
         
         # Level 2: Semantic (FAISS)
         logger.debug("Level 2: Semantic search...")
-        semantic_results = self.retrieve_semantic(query, top_k=intermediate_k)
+        with span("retrieval.faiss"):
+            semantic_results = self.retrieve_semantic_by_vector(query_context.embedding, top_k=intermediate_k)
         logger.debug(f"  → {len(semantic_results)} semantic results")
         
         # Ensemble scoring
@@ -168,12 +196,13 @@ class MultiLevelRetriever:
         # Level 3: Reranking (optional)
         if self.use_reranker and self.reranker:
             logger.debug("Level 3: Reranking...")
-            final_results = self.reranker.rerank_with_scores(
-                query,
-                top_candidates,
-                top_k=top_k,
-                combine_scores=True
-            )
+            with span("retrieval.cross_encoder"):
+                final_results = self.reranker.rerank_with_scores(
+                    query,
+                    top_candidates,
+                    top_k=top_k,
+                    combine_scores=True
+                )
             logger.debug(f"  → {len(final_results)} reranked results")
         else:
             final_results = top_candidates[:top_k]
@@ -182,15 +211,89 @@ class MultiLevelRetriever:
         
         return final_results
     
-    def get_retrieval_stats(self, query: str) -> Dict:
+    def retrieve_multi_level_batch(
+        self,
+        query_contexts: List[QueryContext],
+        top_k: int = 5,
+        bm25_weight: float = 0.3,
+        semantic_weight: float = 0.7,
+        intermediate_k: int = 20
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        retrieve_multi_level for a batch of queries
+        
+        Same results per query; each level runs once for the whole batch.
+        
+        Args:
+            query_contexts: Precomputed tokens/embedding per query
+            top_k: Final number of results per query
+            bm25_weight: Weight for BM25 (keyword)
+            semantic_weight: Weight for semantic
+            intermediate_k: Number of candidates from each method
+            
+        Returns:
+            Top-k documents with scores, per query
+        """
+        if not query_contexts:
+            return []
+        logger.info(f"🔍 Multi-level retrieval for a batch of {len(query_contexts)} queries...")
+        
+        with span("retrieval.bm25"):
+            bm25_batch = self.bm25.retrieve_tokens_batch(
+                [context.tokens for context in query_contexts], top_k=intermediate_k
+            )
+        with span("retrieval.faiss"):
+            semantic_batch = self.retrieve_semantic_by_vectors(
+                np.stack([context.embedding for context in query_contexts]), top_k=intermediate_k
+            )
+        
+        return self._ensemble_and_rerank_batch(
+            query_contexts, bm25_batch, semantic_batch, top_k, bm25_weight, semantic_weight
+        )
+    
+    def _ensemble_and_rerank_batch(
+        self,
+        query_contexts: List[QueryContext],
+        bm25_batch: List[List[Tuple[str, float]]],
+        semantic_batch: List[List[Tuple[str, float]]],
+        top_k: int,
+        bm25_weight: float,
+        semantic_weight: float
+    ) -> List[List[Tuple[str, float]]]:
+        """Ensemble each query's BM25 and semantic candidates, then rerank all queries in one pass."""
+        candidate_lists = [
+            self.ensemble_scores(
+                bm25_results, semantic_results,
+                bm25_weight=bm25_weight, semantic_weight=semantic_weight
+            )[:top_k * 2]
+            for bm25_results, semantic_results in zip(bm25_batch, semantic_batch)
+        ]
+        
+        if self.use_reranker and self.reranker:
+            with span("retrieval.cross_encoder"):
+                return self.reranker.rerank_with_scores_batch(
+                    [context.normalized for context in query_contexts],
+                    candidate_lists,
+                    top_k=top_k,
+                    combine_scores=True
+                )
+        return [candidates[:top_k] for candidates in candidate_lists]
+    
+    def get_retrieval_stats(self, query: str, query_context: Optional[QueryContext] = None) -> Dict:
         """
         Get statistics for each retrieval method
         
+        Args:
+            query: Search query
+            query_context: Precomputed tokens/embedding (the embedding LRU
+                makes a repeat of a just-retrieved query free)
+        
         Returns:
             Dict with stats for each level
         """
-        bm25_results = self.retrieve_bm25(query, top_k=10)
-        semantic_results = self.retrieve_semantic(query, top_k=10)
+        query_context = self._query_context(query, query_context)
+        bm25_results = self.bm25.retrieve_tokens(query_context.tokens, top_k=10)
+        semantic_results = self.retrieve_semantic_by_vector(query_context.embedding, top_k=10)
         
         return {
             "bm25": {
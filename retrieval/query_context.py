@@ -0,0 +1,199 @@
+# retrieval/query_context.py
+"""
+Per-request query context
+- Normalized query, its tokens and its embedding, computed once
+- Shared by every retriever through their by-vector APIs
+- LRU of recent query embeddings in front of the embedding model
+- Batch variant embeds every uncached query of a batch in one call
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+from config.model_config import EMBEDDING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryContext:
+    """
+    Everything retrievers need to know about one query
+
+    Attributes:
+        query: Original user question
+        normalized: Enhanced/normalized query used for retrieval
+        tokens: Lowercased whitespace tokens of the normalized query
+        embedding: float32 query embedding
+    """
+    query: str
+    normalized: str
+    tokens: List[str]
+    embedding: np.ndarray
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU of query embeddings keyed by (model:backend, text)
+    """
+
+    def __init__(self, max_size: int = EMBEDDING_CONFIG["query_cache_size"]):
+        """
+        Args:
+            max_size: Maximum number of cached embeddings
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _model_key(embedding_model) -> str:
+        # Same namespace as ingested chunk embeddings: int8/ONNX vectors differ from fp32 ones
+        model_name = getattr(embedding_model, "model_name", None)
+        if not model_name:
+            return f"{type(embedding_model).__name__}@{id(embedding_model)}"
+        return f"{model_name}:{getattr(embedding_model, 'backend', '')}"
+
+    def embed(self, embedding_model, text: str) -> np.ndarray:
+        """
+        Embed a query, reusing a cached vector when possible
+
+        Args:
+            embedding_model: LangChain-compatible embedding model
+            text: Query text
+
+        Returns:
+            Read-only float32 embedding
+        """
+        key = (self._model_key(embedding_model), text)
+
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+            self.misses += 1
+
+        embedding = np.asarray(embedding_model.embed_query(text), dtype=np.float32)
+        embedding.flags.writeable = False
+
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return embedding
+
+    def embed_many(self, embedding_model, texts: List[str]) -> List[np.ndarray]:
+        """
+        Embed a batch of queries with one model call for the cache misses
+
+        Queries are embedded with embed_documents, which the pipeline's
+        engines implement with the same encoder call as embed_query.
+
+        Args:
+            embedding_model: LangChain-compatible embedding model
+            texts: Query texts (duplicates are embedded once)
+
+        Returns:
+            Read-only float32 embeddings in input order
+        """
+        model_key = self._model_key(embedding_model)
+        found = {}
+
+        with self._lock:
+            for text in texts:
+                key = (model_key, text)
+                embedding = self._entries.get(key)
+                if embedding is not None:
+                    self._entries.move_to_end(key)
+                    found[text] = embedding
+            misses = list(dict.fromkeys(text for text in texts if text not in found))
+            self.hits += len(texts) - sum(1 for text in texts if text in misses)
+            self.misses += len(misses)
+
+        if misses:
+            vectors = np.asarray(embedding_model.embed_documents(misses), dtype=np.float32)
+            with self._lock:
+                for text, vector in zip(misses, vectors):
+                    embedding = vector.copy()
+                    embedding.flags.writeable = False
+                    found[text] = embedding
+                    self._entries[(model_key, text)] = embedding
+                    self._entries.move_to_end((model_key, text))
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        return [found[text] for text in texts]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_query_cache = QueryEmbeddingCache()
+
+
+def build_query_context(
+    query: str,
+    embedding_model,
+    normalized: Optional[str] = None
+) -> QueryContext:
+    """
+    Create the context for one request (one embedding forward pass at most)
+
+    Args:
+        query: Original user question
+        embedding_model: Model that embedded the index
+        normalized: Normalized query (defaults to the stripped query)
+
+    Returns:
+        QueryContext instance
+    """
+    normalized = normalized if normalized is not None else query.strip()
+
+    return QueryContext(
+        query=query,
+        normalized=normalized,
+        tokens=normalized.lower().split(),
+        embedding=_query_cache.embed(embedding_model, normalized)
+    )
+
+
+def build_query_contexts(
+    queries: List[str],
+    embedding_model,
+    normalized: Optional[List[str]] = None
+) -> List[QueryContext]:
+    """
+    Create the contexts of a batch of requests (one embedding call for all misses)
+
+    Args:
+        queries: Original user questions
+        embedding_model: Model that embedded the index
+        normalized: Normalized queries (default: the stripped queries)
+
+    Returns:
+        QueryContext per query, in order
+    """
+    if normalized is None:
+        normalized = [query.strip() for query in queries]
+    embeddings = _query_cache.embed_many(embedding_model, normalized)
+
+    return [
+        QueryContext(query=query, normalized=text, tokens=text.lower().split(), embedding=embedding)
+        for query, text, embedding in zip(queries, normalized, embeddings)
+    ]
+
+
+def get_query_cache_stats() -> dict:
+    """Hit/miss counters of the shared query embedding LRU."""
+    return _query_cache.get_stats()
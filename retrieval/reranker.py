@@ -8,7 +8,9 @@ Cross-Encoder Reranking
 
 import logging
 from typing import List, Tuple
-from sentence_transformers import CrossEncoder
+from config.model_config import INFERENCE_BACKEND
+from config.server_config import MICRO_BATCH_CONFIG
+from utils.inference_backend import load_cross_encoder
 
 logger = logging.getLogger(__name__)
 
@@ -24,20 +26,89 @@ class CrossEncoderReranker:
     - Use as final reranking step
     """
     
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        backend: str = INFERENCE_BACKEND["reranker"]
+    ):
         """
         Initialize cross-encoder
         
         Args:
             model_name: HuggingFace model name
+            backend: Inference backend ("torch", "int8" or "onnx")
         """
+        self.model_name = model_name
+        self.backend = backend
+        self.model = self._load_model()
+    
+    def _load_model(self):
         try:
-            self.model = CrossEncoder(model_name)
-            self.model_name = model_name
-            logger.info(f"✅ Reranker loaded: {model_name}")
+            model = load_cross_encoder(self.model_name, self.backend)
+            logger.info(f"✅ Reranker loaded: {self.model_name} ({self.backend})")
+            return model
         except Exception as e:
             logger.error(f"❌ Failed to load reranker: {e}")
-            self.model = None
+            return None
+    
+    def __getstate__(self):
+        # Weights (or an ONNX session) are reloaded by name on unpickle
+        state = self.__dict__.copy()
+        state["model"] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault("backend", "torch")
+        if self.model is None:
+            self.model = self._load_model()
+    
+    def _predict(self, pairs: List[List[str]]):
+        """
+        Score query-document pairs
+        
+        With micro-batching enabled, pairs from concurrent requests are
+        scored together in one forward pass.
+        """
+        if not MICRO_BATCH_CONFIG["enabled"]:
+            return self.model.predict(pairs)
+        
+        from utils.micro_batcher import get_micro_batcher
+        batcher = get_micro_batcher(
+            f"rerank:{self.model_name}:{self.backend}",
+            self._predict_batch,
+            size_fn=len
+        )
+        return batcher(pairs)
+    
+    def _predict_batch(self, pair_lists: List[List[List[str]]]) -> list:
+        """Score several requests' pairs at once and split the scores back."""
+        flat = [pair for pairs in pair_lists for pair in pairs]
+        scores = self.model.predict(flat)
+        
+        results, start = [], 0
+        for pairs in pair_lists:
+            results.append(scores[start:start + len(pairs)])
+            start += len(pairs)
+        return results
+    
+    @staticmethod
+    def _combine(original_scores: List[float], reranker_scores) -> List[float]:
+        """Min-max normalize both score lists, then weight 70% reranker, 30% original."""
+        orig_min, orig_max = min(original_scores), max(original_scores)
+        rerank_min, rerank_max = min(reranker_scores), max(reranker_scores)
+        
+        if orig_max > orig_min:
+            norm_orig = [(s - orig_min) / (orig_max - orig_min) for s in original_scores]
+        else:
+            norm_orig = [0.5] * len(original_scores)
+        
+        if rerank_max > rerank_min:
+            norm_rerank = [(s - rerank_min) / (rerank_max - rerank_min) for s in reranker_scores]
+        else:
+            norm_rerank = [0.5] * len(reranker_scores)
+        
+        return [0.7 * r + 0.3 * o for r, o in zip(norm_rerank, norm_orig)]
     
     def rerank(
         self,
@@ -64,7 +135,7 @@ class CrossEncoderReranker:
             pairs = [[query, doc] for doc in documents]
             
             # Get scores
-            scores = self.model.predict(pairs)
+            scores = self._predict(pairs)
             
             # Combine documents with scores
             doc_scores = list(zip(documents, scores))
@@ -111,31 +182,10 @@ class CrossEncoderReranker:
             
             # Get reranker scores
             pairs = [[query, doc] for doc in documents]
-            reranker_scores = self.model.predict(pairs)
+            reranker_scores = self._predict(pairs)
             
             # Combine scores
-            if combine_scores:
-                # Normalize scores to 0-1 range
-                orig_min, orig_max = min(original_scores), max(original_scores)
-                rerank_min, rerank_max = min(reranker_scores), max(reranker_scores)
-                
-                if orig_max > orig_min:
-                    norm_orig = [(s - orig_min) / (orig_max - orig_min) for s in original_scores]
-                else:
-                    norm_orig = [0.5] * len(original_scores)
-                
-                if rerank_max > rerank_min:
-                    norm_rerank = [(s - rerank_min) / (rerank_max - rerank_min) for s in reranker_scores]
-                else:
-                    norm_rerank = [0.5] * len(reranker_scores)
-                
-                # Weighted combination (70% reranker, 30% original)
-                combined_scores = [
-                    0.7 * r + 0.3 * o
-                    for r, o in zip(norm_rerank, norm_orig)
-                ]
-            else:
-                combined_scores = reranker_scores
+            combined_scores = self._combine(original_scores, reranker_scores) if combine_scores else reranker_scores
             
             # Combine with documents
             results = list(zip(documents, combined_scores))
@@ -148,16 +198,72 @@ class CrossEncoderReranker:
         except Exception as e:
             logger.error(f"Reranking with scores failed: {e}")
             return doc_score_pairs[:top_k]
+    
+    def rerank_with_scores_batch(
+        self,
+        queries: List[str],
+        candidate_lists: List[List[Tuple[str, float]]],
+        top_k: int = 5,
+        combine_scores: bool = True
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        rerank_with_scores for several queries with one cross-encoder pass
+        
+        The (query, document) pairs of every query are flattened into a
+        single predict call and the scores are split back per query.
+        
+        Args:
+            queries: Search queries
+            candidate_lists: (document, original_score) tuples per query
+            top_k: Number of results per query
+            combine_scores: Combine original and reranker scores
+            
+        Returns:
+            List of (document, combined_score) tuples per query
+        """
+        if not self.model:
+            return [candidates[:top_k] for candidates in candidate_lists]
+        
+        try:
+            pairs = [[query, doc] for query, candidates in zip(queries, candidate_lists) for doc, _ in candidates]
+            scores = self._predict(pairs) if pairs else []
+            
+            batch_results, start = [], 0
+            for candidates in candidate_lists:
+                reranker_scores = scores[start:start + len(candidates)]
+                start += len(candidates)
+                if not candidates:
+                    batch_results.append([])
+                    continue
+                
+                documents = [doc for doc, _ in candidates]
+                original_scores = [score for _, score in candidates]
+                combined_scores = self._combine(original_scores, reranker_scores) if combine_scores else reranker_scores
+                
+                results = list(zip(documents, combined_scores))
+                results.sort(key=lambda x: x[1], reverse=True)
+                batch_results.append(results[:top_k])
+            
+            logger.debug(f"Reranked {len(pairs)} pairs for {len(queries)} queries in one pass")
+            return batch_results
+            
+        except Exception as e:
+            logger.error(f"Batch reranking failed: {e}")
+            return [candidates[:top_k] for candidates in candidate_lists]
 
 
-def create_reranker(model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2") -> CrossEncoderReranker:
+def create_reranker(
+    model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+    backend: str = INFERENCE_BACKEND["reranker"]
+) -> CrossEncoderReranker:
     """
     Factory function to create reranker
     
     Args:
         model_name: HuggingFace cross-encoder model
+        backend: Inference backend
         
     Returns:
         CrossEncoderReranker instance
     """
-    return CrossEncoderReranker(model_name)
+    return CrossEncoderReranker(model_name, backend)
@@ -0,0 +1,471 @@
+# retrieval/sharding.py
+"""
+Sharded retrieval tier
+- Chunks are partitioned round-robin across N shard processes
+- Each shard serves BM25 + exact vector search over its chunks on a local
+  socket (multiprocessing.connection, authenticated)
+- Shards score BM25 with the IDF and average length of the whole corpus,
+  so their scores compare; vector distances already do
+- A coordinator fans each query (or batch) out to every shard, merges the
+  per-shard top-k lists into the global top-k and only then ensembles and
+  reranks, exactly like MultiLevelRetriever over one index
+- Shards that miss the deadline are left out of that query's merge
+- With SHARDING=1 the index loader serves each loaded index's multi-level
+  tier this way (see rag_pipeline); evicted tiers are retired after a grace
+  period so in-flight queries finish
+"""
+
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.server_config import SHARDING_CONFIG
+from retrieval.bm25_retriever import BM25Retriever, bm25_corpus_stats
+from retrieval.multi_level_retriever import MultiLevelRetriever
+from retrieval.query_context import QueryContext, build_query_context
+from retrieval.reranker import CrossEncoderReranker
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+def partition(num_items: int, num_shards: int) -> List[np.ndarray]:
+    """Item positions per shard (round-robin, so neighbouring chunks spread out)."""
+    return [np.arange(shard, num_items, num_shards) for shard in range(num_shards)]
+
+
+# -------------------- Shard process --------------------
+
+class _ShardIndex:
+    """BM25 and flat FAISS index over one shard's chunks."""
+
+    def __init__(self, texts: List[str], embeddings: np.ndarray, idf: Dict[str, float], avgdl: float, metric: str):
+        import faiss
+
+        self.texts = texts
+        self.bm25 = BM25Retriever(texts)
+        self.bm25.use_corpus_stats(idf, avgdl)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self.index = faiss.IndexFlatIP(embeddings.shape[1]) if metric == "ip" else faiss.IndexFlatL2(embeddings.shape[1])
+        self.index.add(embeddings)
+
+    def search(self, tokens: List[List[str]], embeddings: np.ndarray, k: int) -> list:
+        """(bm25 [(text, score)], semantic [(text, distance)]) per query."""
+        bm25_batch = self.bm25.retrieve_tokens_batch(tokens, top_k=k)
+        distances, indices = self.index.search(np.ascontiguousarray(embeddings, dtype=np.float32), min(k, self.index.ntotal))
+        semantic_batch = [
+            [(self.texts[i], float(d)) for d, i in zip(row_d, row_i) if i != -1]
+            for row_d, row_i in zip(distances, indices)
+        ]
+        return list(zip(bm25_batch, semantic_batch))
+
+
+def _serve_connection(conn, shard: _ShardIndex):
+    with conn:
+        while True:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                return
+            op = request[0]
+            if op == "search":
+                _, tokens, embeddings, k = request
+                try:
+                    reply = ("ok", shard.search(tokens, embeddings, k))
+                except Exception as e:
+                    reply = ("error", f"{type(e).__name__}: {e}")
+            elif op == "ping":
+                reply = ("ok", {"pid": os.getpid(), "chunks": len(shard.texts)})
+            else:
+                reply = ("error", f"Unknown operation {op!r}")
+            try:
+                conn.send(reply)
+            except OSError:
+                return  # The coordinator gave up on this request and closed the connection
+
+
+def _shard_main(setup_conn, data: dict, authkey: bytes, host: str, threads: int):
+    """Shard process: build the shard index, then serve coordinator connections."""
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        import faiss
+        faiss.omp_set_num_threads(threads)
+    except Exception:
+        pass
+
+    shard = _ShardIndex(data["texts"], data["embeddings"], data["idf"], data["avgdl"], data["metric"])
+    listener = Listener((host, 0), authkey=authkey)
+    setup_conn.send(listener.address)
+    setup_conn.close()
+
+    # One thread per coordinator connection; searches only read the indexes
+    while True:
+        try:
+            conn = listener.accept()
+        except (OSError, EOFError):
+            continue
+        threading.Thread(target=_serve_connection, args=(conn, shard), daemon=True).start()
+
+
+# -------------------- Coordinator --------------------
+
+class ShardClient:
+    """
+    Connections to one shard process
+
+    Each in-flight request uses its own connection (taken from a pool), so
+    concurrent queries do not serialize on one socket. A connection whose
+    reply missed the deadline is closed, since the late reply would
+    otherwise be read as the answer to the next request.
+    """
+
+    def __init__(self, shard_id: int, address, authkey: bytes, process=None):
+        self.shard_id = shard_id
+        self.address = address
+        self.authkey = authkey
+        self.process = process
+        self._started_by = os.getpid()
+        self._owner = self._started_by
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self.requests = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def _connection(self):
+        if os.getpid() != self._owner:
+            # Forked worker: pooled sockets belong to the parent, open our own
+            self._owner = os.getpid()
+            self._idle = queue.LifoQueue()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return Client(self.address, authkey=self.authkey)
+
+    def request(self, message: tuple, deadline: float):
+        """Reply payload, or None if the shard failed or missed the deadline."""
+        self.requests += 1
+        conn = None
+        try:
+            conn = self._connection()
+            conn.send(message)
+            if not conn.poll(max(0.0, deadline - time.monotonic())):
+                self.timeouts += 1
+                conn.close()
+                return None
+            status, payload = conn.recv()
+        except (OSError, EOFError) as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Shard {self.shard_id} unreachable: {type(e).__name__}: {e}")
+            if conn is not None:
+                conn.close()
+            return None
+        self._idle.put(conn)
+        if status != "ok":
+            self.errors += 1
+            logger.warning(f"⚠️ Shard {self.shard_id} failed: {payload}")
+            return None
+        return payload
+
+    def owns_process(self) -> bool:
+        """Whether this process started the shard (forked workers only connect to it)."""
+        return self.process is not None and os.getpid() == self._started_by
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        if self.owns_process() and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=5)
+
+
+class ShardedRetriever(MultiLevelRetriever):
+    """
+    Multi-level retrieval (BM25 + FAISS + reranker) over shard processes
+
+    A drop-in for MultiLevelRetriever: pass it to answer_question as
+    multi_level_retriever. Shard processes hold the chunk texts, BM25
+    statistics and vectors; this process keeps the reranker, the
+    embedding model and the shard connections.
+    """
+
+    def __init__(
+        self,
+        shards: List[ShardClient],
+        embedding_function,
+        num_chunks: int,
+        use_reranker: bool = True,
+        timeout: float = SHARDING_CONFIG["timeout"],
+        metric: str = "l2"
+    ):
+        """
+        Args:
+            shards: Connected shard clients
+            embedding_function: Model that embedded the chunks (embeds queries)
+            num_chunks: Chunks across all shards
+            use_reranker: Enable cross-encoder reranking
+            timeout: Seconds to wait for shards before merging without them
+            metric: Shard vector metric, "l2" (distance) or "ip" (similarity)
+        """
+        self.shards = shards
+        self.metric = metric
+        self.embedding_function = embedding_function
+        self.num_chunks = num_chunks
+        self.timeout = timeout
+        self.use_reranker = use_reranker
+        self.reranker = CrossEncoderReranker() if use_reranker else None
+        self._executor = self._new_executor()
+        self._pid = os.getpid()
+        self.partial_queries = 0
+        # MultiLevelRetriever this tier serves in place of (set by the index loader)
+        self.local_retriever = None
+        logger.info(f"✅ Sharded retriever ready ({len(shards)} shards, {num_chunks} chunks)")
+
+    def __getstate__(self):
+        raise TypeError("ShardedRetriever holds live shard processes and cannot be pickled")
+
+    def _new_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=max(4, len(self.shards) * 4), thread_name_prefix="shard-fanout")
+
+    def _fan_out_executor(self) -> ThreadPoolExecutor:
+        # Pool threads do not survive a fork (preloaded in the gunicorn master)
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._executor = self._new_executor()
+        return self._executor
+
+    def _query_context(self, query: str, query_context: Optional[QueryContext]) -> QueryContext:
+        if query_context is not None:
+            return query_context
+        return build_query_context(query, self.embedding_function)
+
+    # -------------------- Scatter-gather --------------------
+
+    def _fan_out(self, query_contexts: List[QueryContext], k: int) -> Tuple[list, list]:
+        """Global top-k BM25 and semantic candidates per query, merged from every shard that answered."""
+        message = (
+            "search",
+            [context.tokens for context in query_contexts],
+            np.stack([context.embedding for context in query_contexts]).astype(np.float32),
+            k
+        )
+        deadline = time.monotonic() + self.timeout
+        with span("retrieval.shard_fanout"):
+            executor = self._fan_out_executor()
+            futures = [executor.submit(shard.request, message, deadline) for shard in self.shards]
+            replies = [future.result() for future in futures]
+
+        missing = [shard.shard_id for shard, reply in zip(self.shards, replies) if reply is None]
+        if missing:
+            self.partial_queries += len(query_contexts)
+            logger.warning(f"⚠️ Shards {missing} missed the {self.timeout:g}s deadline; merging the rest")
+
+        bm25_batch, semantic_batch = [], []
+        for i in range(len(query_contexts)):
+            bm25 = [hit for reply in replies if reply is not None for hit in reply[i][0]]
+            semantic = [hit for reply in replies if reply is not None for hit in reply[i][1]]
+            # Scores are global (corpus-wide BM25 stats, one embedding space):
+            # the union of per-shard top-k lists holds the global top-k
+            bm25.sort(key=lambda hit: hit[1], reverse=True)
+            semantic.sort(key=lambda hit: hit[1], reverse=self.metric == "ip")
+            bm25_batch.append(bm25[:k])
+            semantic_batch.append(semantic[:k])
+        return bm25_batch, semantic_batch
+
+    # -------------------- Retrieval API --------------------
+
+    def retrieve_bm25(self, query: str, top_k: int = 20) -> List[Tuple[str, float]]:
+        """Level 1: BM25 keyword search across shards"""
+        return self._fan_out([self._query_context(query, None)], top_k)[0][0]
+
+    def retrieve_semantic(self, query: str, top_k: int = 20) -> List[Tuple[str, float]]:
+        """Level 2: Semantic search across shards"""
+        return self._fan_out([self._query_context(query, None)], top_k)[1][0]
+
+    def retrieve_semantic_by_vector(self, embedding: np.ndarray, top_k: int = 20) -> List[Tuple[str, float]]:
+        """Level 2 for a precomputed query embedding"""
+        return self.retrieve_semantic_by_vectors(np.asarray(embedding)[None, :], top_k)[0]
+
+    def retrieve_semantic_by_vectors(self, embeddings: np.ndarray, top_k: int = 20) -> List[List[Tuple[str, float]]]:
+        """Level 2 for a batch of query embeddings"""
+        contexts = [QueryContext("", "", [], np.asarray(e, dtype=np.float32)) for e in embeddings]
+        return self._fan_out(contexts, top_k)[1]
+
+    def retrieve_multi_level(
+        self,
+        query: str,
+        top_k: int = 5,
+        bm25_weight: float = 0.3,
+        semantic_weight: float = 0.7,
+        intermediate_k: int = 20,
+        query_context: Optional[QueryContext] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Multi-level retrieval with one round trip to every shard
+
+        Args:
+            query: Search query
+            top_k: Final number of results
+            bm25_weight: Weight for BM25 (keyword)
+            semantic_weight: Weight for semantic
+            intermediate_k: Number of candidates from each method
+            query_context: Precomputed tokens/embedding (built here if omitted)
+
+        Returns:
+            Top-k documents with scores
+        """
+        logger.info(f"🔍 Sharded retrieval for: {query[:50]}...")
+        query_context = self._query_context(query, query_context)
+        return self.retrieve_multi_level_batch(
+            [query_context], top_k, bm25_weight, semantic_weight, intermediate_k
+        )[0]
+
+    def retrieve_multi_level_batch(
+        self,
+        query_contexts: List[QueryContext],
+        top_k: int = 5,
+        bm25_weight: float = 0.3,
+        semantic_weight: float = 0.7,
+        intermediate_k: int = 20
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        retrieve_multi_level for a batch of queries (one request per shard)
+
+        Args:
+            query_contexts: Precomputed tokens/embedding per query
+            top_k: Final number of results per query
+            bm25_weight: Weight for BM25 (keyword)
+            semantic_weight: Weight for semantic
+            intermediate_k: Number of candidates from each method
+
+        Returns:
+            Top-k documents with scores, per query
+        """
+        if not query_contexts:
+            return []
+        bm25_batch, semantic_batch = self._fan_out(query_contexts, intermediate_k)
+        return self._ensemble_and_rerank_batch(
+            query_contexts, bm25_batch, semantic_batch, top_k, bm25_weight, semantic_weight
+        )
+
+    def get_retrieval_stats(self, query: str, query_context: Optional[QueryContext] = None) -> Dict:
+        query_context = self._query_context(query, query_context)
+        (bm25_results,), (semantic_results,) = self._fan_out([query_context], 10)
+        return {
+            "bm25": {
+                "count": len(bm25_results),
+                "avg_score": np.mean([s for _, s in bm25_results]) if bm25_results else 0,
+                "max_score": max([s for _, s in bm25_results]) if bm25_results else 0
+            },
+            "semantic": {
+                "count": len(semantic_results),
+                "avg_score": np.mean([s for _, s in semantic_results]) if semantic_results else 0,
+                "min_score": min([s for _, s in semantic_results]) if semantic_results else 0
+            }
+        }
+
+    def get_shard_stats(self) -> List[Dict]:
+        """Requests, timeouts and errors per shard."""
+        return [
+            {
+                "shard": shard.shard_id,
+                "alive": not shard.owns_process() or shard.process.is_alive(),
+                "requests": shard.requests,
+                "timeouts": shard.timeouts,
+                "errors": shard.errors
+            }
+            for shard in self.shards
+        ]
+
+    def close(self):
+        """Stop the shard processes."""
+        self._executor.shutdown(wait=False)
+        for shard in self.shards:
+            shard.close()
+
+    def retire(self, grace: float = SHARDING_CONFIG["retire_after"]):
+        """Stop the shard processes once queries already holding this retriever are done."""
+        timer = threading.Timer(grace, self.close)
+        timer.daemon = True
+        timer.start()
+
+
+def _shard_inputs(vector_store) -> Tuple[List[str], np.ndarray, str]:
+    """Chunk texts (chunk_id order), their vectors and the FAISS metric of a LangChain store."""
+    docstore = vector_store.docstore._dict
+    ids = [vector_store.index_to_docstore_id[i] for i in range(vector_store.index.ntotal)]
+    texts = [docstore[doc_id].page_content for doc_id in ids]
+    vectors = vector_store.index.reconstruct_n(0, vector_store.index.ntotal)
+    import faiss
+    metric = "ip" if vector_store.index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+    return texts, vectors, metric
+
+
+def create_sharded_retriever(
+    vector_store,
+    num_shards: int = SHARDING_CONFIG["num_shards"],
+    use_reranker: bool = True,
+    timeout: float = SHARDING_CONFIG["timeout"],
+    host: str = SHARDING_CONFIG["host"]
+) -> ShardedRetriever:
+    """
+    Factory function: partition an index's chunks across shard processes
+
+    Args:
+        vector_store: LangChain FAISS store with the chunks (quantized
+            indexes are reconstructed, so shards search the decoded vectors)
+        num_shards: Shard processes to start
+        use_reranker: Enable reranking in the coordinator
+        timeout: Seconds to wait for shards per query
+        host: Interface the shards listen on
+
+    Returns:
+        ShardedRetriever connected to its shards
+    """
+    texts, vectors, metric = _shard_inputs(vector_store)
+    num_shards = max(1, min(num_shards, len(texts)))
+    idf, avgdl = bm25_corpus_stats(text.lower().split() for text in texts)
+    authkey = secrets.token_bytes(16)
+    threads = max(1, (os.cpu_count() or 1) // num_shards)
+    context = get_context("spawn")
+
+    logger.info(f"🔧 Starting {num_shards} shards for {len(texts)} chunks...")
+    starting = []
+    for shard_id, positions in enumerate(partition(len(texts), num_shards)):
+        parent_conn, child_conn = context.Pipe()
+        data = {
+            "texts": [texts[i] for i in positions],
+            "embeddings": vectors[positions],
+            "idf": idf,
+            "avgdl": avgdl,
+            "metric": metric
+        }
+        process = context.Process(
+            target=_shard_main, args=(child_conn, data, authkey, host, threads),
+            name=f"shard-{shard_id}", daemon=True
+        )
+        process.start()
+        child_conn.close()
+        starting.append((shard_id, process, parent_conn))
+
+    shards = []
+    for shard_id, process, conn in starting:
+        if not conn.poll(SHARDING_CONFIG["start_timeout"]):
+            for _, other, _ in starting:
+                other.terminate()
+            raise RuntimeError(f"Shard {shard_id} did not start within {SHARDING_CONFIG['start_timeout']:g}s")
+        shards.append(ShardClient(shard_id, conn.recv(), authkey, process))
+        conn.close()
+
+    return ShardedRetriever(shards, vector_store.embedding_function, len(texts), use_reranker, timeout, metric)
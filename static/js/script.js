@@ -40,6 +40,8 @@ async function uploadFile(file) {
     try {
         const response = await fetch('/upload', {
             method: 'POST',
+            // Routing key for affinity_router.py: upload on the worker that will answer for this PDF
+            headers: { 'X-Document-Id': encodeURIComponent(file.name) },
             body: formData
         });
 
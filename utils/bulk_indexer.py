@@ -0,0 +1,439 @@
+# utils/bulk_indexer.py
+"""
+Offline bulk indexing of a directory of PDFs
+- Skips PDFs whose content hash (SHA-256) the manifest already lists
+  with the same index options
+- Indexes files in parallel across worker processes; each worker loads
+  the models once and indexes many files
+- A file that runs past its timeout has its worker killed and replaced,
+  so one bad PDF cannot stall the run
+- Writes a summary report (throughput, failures, slowest files)
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from dataclasses import dataclass, field
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Tuple
+
+from config.index_config import BULK_INDEX_CONFIG, RAPTOR_CONFIG
+
+logger = logging.getLogger(__name__)
+
+STATUS_INDEXED = "indexed"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Hex SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def find_pdfs(root: str, recursive: bool = True) -> List[str]:
+    """PDF files under root, sorted by path."""
+    if os.path.isfile(root):
+        return [root]
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        found.extend(os.path.join(dirpath, name) for name in filenames if name.lower().endswith(".pdf"))
+        if not recursive:
+            break
+    return sorted(found)
+
+
+def _write_json(path: str, data: dict):
+    # Temp file + rename: an interrupted run never leaves a truncated file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class IndexManifest:
+    """
+    Content hashes of indexed PDFs, persisted as JSON next to the indexes
+
+    {"files": {sha256: {"pdf", "index_file", "options", "chunks", "seconds", "indexed_at"}}}
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Manifest file (created on first save)
+        """
+        self.path = path
+        self.files: Dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.files = json.load(f).get("files", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Unreadable manifest {path}, starting empty: {e}")
+
+    def lookup(self, sha256: str, options: dict) -> Optional[dict]:
+        """Entry of a hash indexed with the same options whose index file still exists."""
+        entry = self.files.get(sha256)
+        if entry and entry.get("options") == options and os.path.exists(entry.get("index_file", "")):
+            return entry
+        return None
+
+    def owner(self, index_file: str) -> Optional[dict]:
+        """Entry of the PDF an index file was last built from."""
+        return next((e for e in self.files.values() if e.get("index_file") == index_file), None)
+
+    def record(self, sha256: str, entry: dict):
+        # An index file belongs to one content hash: drop entries it replaces
+        for old in [h for h, e in self.files.items() if e.get("index_file") == entry["index_file"]]:
+            del self.files[old]
+        self.files[sha256] = entry
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        _write_json(self.path, {"files": self.files})
+
+
+@dataclass
+class FileResult:
+    """
+    Outcome of one PDF
+
+    Attributes:
+        pdf: PDF path
+        status: "indexed", "skipped" or "failed"
+        size: File size in bytes
+        sha256: Content hash
+        seconds: Indexing time (0 when skipped)
+        chunks: Chunks in the index
+        error: Failure or skip reason
+    """
+    pdf: str
+    status: str
+    size: int = 0
+    sha256: str = ""
+    seconds: float = 0.0
+    chunks: int = 0
+    error: Optional[str] = None
+
+
+# -------------------- Worker process --------------------
+
+def _worker_main(conn, options: dict, index_dir: str, threads: int, log_level: int):
+    """
+    Indexing worker: load models once, then index PDFs sent over conn
+
+    Receives pdf paths (None to stop); sends back (pdf_path, result dict).
+    """
+    # Read by the configs on import: no nested embedding pool per worker
+    os.environ["EMBEDDING_NUM_WORKERS"] = "0"
+
+    from utils.preload import after_fork, preload_models
+    from utils.index_registry import get_index_registry
+    import rag_pipeline
+
+    logging.getLogger().setLevel(log_level)
+    after_fork(threads)
+    # Workers only write indexes; keeping them loaded would grow without bound
+    get_index_registry().max_entries = 0
+    try:
+        # FLAN-T5 is only needed for abstractive RAPTOR summaries
+        abstractive = options.get("raptor_summarization", RAPTOR_CONFIG["summarization"]) == "abstractive"
+        preload_models(summarizer=options.get("use_raptor", False) and abstractive)
+    except Exception as e:
+        logger.warning(f"⚠️ Model preload failed, loading on first use: {e}")
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            pdf_path = conn.recv()
+        except EOFError:
+            break
+        if pdf_path is None:
+            break
+
+        start = time.perf_counter()
+        index_file = rag_pipeline.index_file_path(pdf_path, index_dir)
+        try:
+            vector_store, _, _ = rag_pipeline.create_vectorstore_from_pdf(
+                pdf_path, use_cache=False, index_dir=index_dir, progressive=False, **options
+            )
+            if vector_store is None:
+                result = {"status": STATUS_FAILED, "error": "No text extracted or embedding failed"}
+            elif not os.path.exists(index_file):
+                result = {"status": STATUS_FAILED, "error": "Index file was not written"}
+            else:
+                result = {"status": STATUS_INDEXED, "chunks": int(vector_store.index.ntotal)}
+        except Exception as e:
+            result = {"status": STATUS_FAILED, "error": f"{type(e).__name__}: {e}"}
+        result["seconds"] = time.perf_counter() - start
+        conn.send((pdf_path, result))
+
+
+@dataclass
+class _Worker:
+    process: multiprocessing.Process
+    conn: object
+    ready: bool = False
+    pdf: Optional[str] = None
+    started: float = 0.0
+
+
+# -------------------- Coordinator --------------------
+
+@dataclass
+class BulkIndexer:
+    """
+    Index every new or changed PDF under a directory
+
+    Attributes:
+        index_dir: Where <pdf name>.pkl files, the manifest and the report go
+        workers: Indexing processes
+        timeout: Seconds one file may take before its worker is killed
+        options: create_vectorstore_from_pdf arguments (part of the skip check)
+        force: Re-index files the manifest already lists
+        worker_log_level: Log level inside workers (per-stage INFO logs are noisy)
+    """
+    index_dir: str = "."
+    workers: int = BULK_INDEX_CONFIG["workers"]
+    timeout: float = BULK_INDEX_CONFIG["timeout"]
+    options: dict = field(default_factory=dict)
+    force: bool = False
+    worker_log_level: int = logging.WARNING
+
+    def __post_init__(self):
+        self.manifest = IndexManifest(os.path.join(self.index_dir, BULK_INDEX_CONFIG["manifest"]))
+        self._context = multiprocessing.get_context("spawn")  # torch/OpenMP state does not survive fork
+
+    def _index_file(self, pdf_path: str) -> str:
+        return os.path.join(self.index_dir, f"{os.path.basename(pdf_path)}.pkl")
+
+    # -------------------- Planning --------------------
+
+    def plan(self, pdf_paths: List[str]) -> Tuple[List[FileResult], List[FileResult]]:
+        """
+        Hash files and split them into work and skips
+
+        Returns:
+            (to_index, skipped) FileResult lists
+        """
+        to_index, skipped = [], []
+        claimed: Dict[str, FileResult] = {}  # index file → file that will write it
+
+        for pdf_path in pdf_paths:
+            try:
+                item = FileResult(pdf_path, STATUS_FAILED, os.path.getsize(pdf_path), file_sha256(pdf_path))
+            except OSError as e:
+                skipped.append(FileResult(pdf_path, STATUS_FAILED, error=f"Unreadable: {e}"))
+                continue
+
+            index_file = self._index_file(pdf_path)
+            other = claimed.get(index_file)
+            if other is not None:
+                # Indexes are named after the PDF's file name
+                item.status = STATUS_SKIPPED if other.sha256 == item.sha256 else STATUS_FAILED
+                item.error = (f"Duplicate of {other.pdf}" if other.sha256 == item.sha256
+                              else f"Index name collides with {other.pdf}")
+                skipped.append(item)
+                continue
+            claimed[index_file] = item
+
+            entry = None if self.force else self.manifest.lookup(item.sha256, self.options)
+            if entry is not None:
+                item.status, item.chunks = STATUS_SKIPPED, entry.get("chunks", 0)
+                item.error = "Already indexed" if entry["index_file"] == index_file else f"Same content as {entry['pdf']}"
+                skipped.append(item)
+                continue
+
+            owner = None if self.force else self.manifest.owner(index_file)
+            if owner is not None and owner["pdf"] != pdf_path and os.path.exists(owner["pdf"]):
+                item.error = f"Index name collides with {owner['pdf']} (indexed earlier)"
+                skipped.append(item)
+                continue
+            to_index.append(item)
+
+        return to_index, skipped
+
+    # -------------------- Workers --------------------
+
+    def _threads_per_worker(self, workers: int) -> int:
+        from utils.preload import worker_threads
+        return worker_threads(workers)
+
+    def _spawn(self, threads: int) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.options, self.index_dir, threads, self.worker_log_level),
+            name="bulk-indexer",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    @staticmethod
+    def _stop(worker: _Worker, kill: bool = False):
+        if kill:
+            worker.process.kill()
+        else:
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        worker.process.join(timeout=None if kill else 30)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join()
+        worker.conn.close()
+
+    # -------------------- Run --------------------
+
+    def run(self, root: str, recursive: bool = True) -> dict:
+        """
+        Index the PDFs under root and write the report
+
+        Args:
+            root: Directory (or single PDF) to index
+            recursive: Descend into subdirectories
+
+        Returns:
+            Report dict (also written to <index_dir>/<report file>)
+        """
+        started_at = time.time()
+        start = time.perf_counter()
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        pdf_paths = find_pdfs(root, recursive)
+        to_index, skipped = self.plan(pdf_paths)
+        logger.info(f"📂 {len(pdf_paths)} PDFs: {len(to_index)} to index, {len(skipped)} skipped")
+
+        results: List[FileResult] = []
+        interrupted = False
+        try:
+            self._index_all(to_index, results)
+        except KeyboardInterrupt:
+            interrupted = True
+            logger.warning("⚠️ Interrupted: workers stopped, manifest keeps the files finished so far")
+        finally:
+            self.manifest.save()
+
+        report = self._report(pdf_paths, skipped + results, time.perf_counter() - start, started_at, interrupted)
+        _write_json(os.path.join(self.index_dir, BULK_INDEX_CONFIG["report"]), report)
+        return report
+
+    def _index_all(self, to_index: List[FileResult], results: List[FileResult]):
+        if not to_index:
+            return
+        workers = max(1, min(self.workers, len(to_index)))
+        threads = self._threads_per_worker(workers)
+        queue = list(reversed(to_index))
+        by_path = {item.pdf: item for item in to_index}
+        pool = [self._spawn(threads) for _ in range(workers)]
+        last_save = time.monotonic()
+
+        def finish(item: FileResult, status: str, seconds: float, chunks: int = 0, error: Optional[str] = None):
+            item.status, item.seconds, item.chunks, item.error = status, seconds, chunks, error
+            results.append(item)
+            done = len(results)
+            if status == STATUS_INDEXED:
+                self.manifest.record(item.sha256, {
+                    "pdf": item.pdf,
+                    "index_file": self._index_file(item.pdf),
+                    "options": self.options,
+                    "chunks": chunks,
+                    "seconds": round(seconds, 3),
+                    "indexed_at": time.time()
+                })
+                logger.info(f"✅ [{done}/{len(to_index)}] {item.pdf}: {chunks} chunks in {seconds:.1f}s")
+            else:
+                logger.error(f"❌ [{done}/{len(to_index)}] {item.pdf}: {error}")
+
+        try:
+            while queue or any(w.pdf for w in pool):
+                # Hand out work to idle workers
+                for worker in pool:
+                    if worker.ready and worker.pdf is None and queue:
+                        worker.pdf = queue.pop().pdf
+                        worker.started = time.monotonic()
+                        worker.conn.send(worker.pdf)
+
+                deadlines = [w.started + self.timeout - time.monotonic() for w in pool if w.pdf]
+                ready = wait([w.conn for w in pool], timeout=max(0.0, min(deadlines, default=1.0)))
+
+                for i, worker in enumerate(pool):
+                    if worker.conn in ready:
+                        try:
+                            message = worker.conn.recv()
+                        except (EOFError, OSError):
+                            # Crashed (e.g. out of memory or a native fault in a PDF parser)
+                            worker.process.join(timeout=5)
+                            code = worker.process.exitcode
+                            if worker.pdf:
+                                finish(by_path[worker.pdf], STATUS_FAILED, time.monotonic() - worker.started,
+                                       error=f"Worker crashed (exit code {code})")
+                            elif not worker.ready:
+                                raise RuntimeError(f"Indexing worker failed to start (exit code {code})")
+                            self._stop(worker, kill=True)
+                            pool[i] = self._spawn(threads) if queue else None
+                            continue
+                        if message[0] == "ready":
+                            worker.ready = True
+                            continue
+                        pdf_path, result = message
+                        finish(by_path[pdf_path], result["status"], result["seconds"],
+                               result.get("chunks", 0), result.get("error"))
+                        worker.pdf = None
+                    elif worker.pdf and time.monotonic() - worker.started > self.timeout:
+                        finish(by_path[worker.pdf], STATUS_FAILED, time.monotonic() - worker.started,
+                               error=f"Timed out after {self.timeout:g}s")
+                        self._stop(worker, kill=True)
+                        pool[i] = self._spawn(threads) if queue else None
+                pool = [worker for worker in pool if worker is not None]
+
+                if time.monotonic() - last_save > 5:
+                    self.manifest.save()
+                    last_save = time.monotonic()
+        finally:
+            for worker in pool:
+                self._stop(worker, kill=bool(worker.pdf))
+
+    # -------------------- Report --------------------
+
+    def _report(self, pdf_paths: List[str], results: List[FileResult], seconds: float,
+                started_at: float, interrupted: bool) -> dict:
+        indexed = [r for r in results if r.status == STATUS_INDEXED]
+        failed = [r for r in results if r.status == STATUS_FAILED]
+        indexed_bytes = sum(r.size for r in indexed)
+        chunks = sum(r.chunks for r in indexed)
+        return {
+            "started_at": started_at,
+            "seconds": round(seconds, 3),
+            "interrupted": interrupted,
+            "index_dir": self.index_dir,
+            "workers": self.workers,
+            "timeout": self.timeout,
+            "options": self.options,
+            "files_found": len(pdf_paths),
+            "indexed": len(indexed),
+            "skipped": sum(1 for r in results if r.status == STATUS_SKIPPED),
+            "failed": len(failed),
+            "timeouts": sum(1 for r in failed if r.error and r.error.startswith("Timed out")),
+            "chunks_indexed": chunks,
+            "files_per_second": round(len(indexed) / seconds, 3) if seconds else 0.0,
+            "mb_per_second": round(indexed_bytes / 1e6 / seconds, 3) if seconds else 0.0,
+            "chunks_per_second": round(chunks / seconds, 1) if seconds else 0.0,
+            "failures": [{"pdf": r.pdf, "error": r.error, "seconds": round(r.seconds, 3)} for r in failed],
+            "slowest": [
+                {"pdf": r.pdf, "seconds": round(r.seconds, 3), "chunks": r.chunks}
+                for r in sorted(indexed, key=lambda r: r.seconds, reverse=True)[:10]
+            ]
+        }
@@ -1,9 +1,9 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-
 def chunk_text(text, chunk_size=500, chunk_overlap=100):
     """
     Splits text into overlapping chunks for better context preservation
     """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
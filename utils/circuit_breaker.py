@@ -0,0 +1,170 @@
+# utils/circuit_breaker.py
+"""
+Circuit breaker for calls to an external service
+- closed: calls go through; consecutive failures are counted
+- open: calls are rejected until the reset timeout elapses
+- half_open: one probe call is let through; success closes the circuit,
+  failure reopens it with a doubled timeout (capped)
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Callable, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised by CircuitBreaker.call while the circuit rejects calls."""
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker with exponential backoff between probes
+
+    How it works:
+    1. failure_threshold consecutive failures open the circuit
+    2. After the reset timeout one caller is allowed through as a probe
+    3. Each failed probe doubles the timeout up to max_reset_timeout
+    4. A successful call closes the circuit and resets the backoff
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        reset_timeout: float = 5.0,
+        max_reset_timeout: float = 120.0,
+        failure_exceptions: Tuple[Type[BaseException], ...] = (Exception,),
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            name: Service name for logs and stats
+            failure_threshold: Consecutive failures before opening
+            reset_timeout: Seconds open before the first probe
+            max_reset_timeout: Upper bound for the backoff
+            failure_exceptions: Exceptions that count as failures in call()
+            clock: Time source (monotonic seconds)
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max(reset_timeout, max_reset_timeout)
+        self.failure_exceptions = failure_exceptions
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0  # Times opened since the last close (drives the backoff)
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.recoveries = 0
+        self.last_error: Optional[str] = None
+        self._opened_at = 0.0
+        self._open_for = 0.0
+        self._probe_in_flight = False
+
+    def _open(self, now: float):
+        self.trips += 1
+        timeout = min(self.reset_timeout * 2 ** (self.trips - 1), self.max_reset_timeout)
+        # Jitter so workers that failed together don't all probe together
+        self._open_for = timeout * random.uniform(0.9, 1.1)
+        self._opened_at = now
+        self.state = OPEN
+        logger.warning(f"⚠️ {self.name} circuit open for {self._open_for:.1f}s: {self.last_error}")
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now (claims the probe slot when half-open)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self._clock() - self._opened_at >= self._open_for:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.total_rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._probe_in_flight = False
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self.trips = 0
+                self.recoveries += 1
+                logger.info(f"✅ {self.name} recovered, circuit closed")
+
+    def record_failure(self, error: BaseException):
+        with self._lock:
+            self._probe_in_flight = False
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                self._open(self._clock())
+
+    def trip(self, error: BaseException):
+        """Open the circuit now (e.g. the service is down at startup)."""
+        with self._lock:
+            self._probe_in_flight = False
+            self.total_failures += 1
+            self.consecutive_failures = max(self.consecutive_failures, self.failure_threshold)
+            self.last_error = f"{type(error).__name__}: {error}"
+            if self.state != OPEN:
+                self._open(self._clock())
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """
+        Run fn through the breaker
+
+        Raises:
+            CircuitOpenError: The circuit is rejecting calls
+            Any exception from fn (failure_exceptions are recorded first)
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is {self.state}")
+        try:
+            result = fn(*args, **kwargs)
+        except self.failure_exceptions as e:
+            self.record_failure(e)
+            raise
+        except BaseException:
+            # Not a service failure; give the probe slot back undecided
+            with self._lock:
+                self._probe_in_flight = False
+            raise
+        self.record_success()
+        return result
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until the next probe is allowed (0 when closed)."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self._open_for - self._clock())
+
+    def get_stats(self) -> dict:
+        retry_in = self.retry_in
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "total_failures": self.total_failures,
+                "rejected_calls": self.total_rejected,
+                "recoveries": self.recoveries,
+                "retry_in": round(retry_in, 2),
+                "last_error": self.last_error
+            }
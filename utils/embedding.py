@@ -1,23 +1,356 @@
-from langchain_community.embeddings import HuggingFaceEmbeddings
+# utils/embedding.py
+"""
+Embedding models for the RAG pipeline
+- Length-bucketed batching under a padded-token budget
+- Explicit control of torch intra-op threads
+- Optional sharding of large jobs across a process pool
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config.model_config import EMBEDDING_CONFIG, INFERENCE_BACKEND
+from utils.inference_backend import load_sentence_transformer
+
+logger = logging.getLogger(__name__)
+
+
+def _set_torch_threads(num_threads: int):
+    """Pin torch intra-op parallelism (0 keeps the torch default)."""
+    if num_threads and num_threads > 0:
+        import torch
+        torch.set_num_threads(num_threads)
+
+
+def make_token_budget_batches(
+    lengths: List[int],
+    max_tokens_per_batch: int,
+    max_batch_size: int
+) -> List[List[int]]:
+    """
+    Group text indices into batches of similar length
+
+    Texts are sorted longest-first, so the first text of a batch sets its
+    padded width and a batch is closed once width * size exceeds the budget.
+
+    Args:
+        lengths: Token length of each text
+        max_tokens_per_batch: Padded token budget per batch
+        max_batch_size: Hard cap on texts per batch
+
+    Returns:
+        List of batches, each a list of original indices
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+
+    batches = []
+    current = []
+    width = 0
+    for idx in order:
+        if not current:
+            width = max(lengths[idx], 1)
+        if current and (
+            (len(current) + 1) * width > max_tokens_per_batch
+            or len(current) >= max_batch_size
+        ):
+            batches.append(current)
+            current = []
+            width = max(lengths[idx], 1)
+        current.append(idx)
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+# -------------------- Process Pool Workers --------------------
+
+_WORKER_MODEL = None
+
+
+def _init_worker(model_name: str, backend: str, num_threads: int):
+    """Load the model once per pool worker."""
+    global _WORKER_MODEL
+    _set_torch_threads(num_threads)
+    _WORKER_MODEL = load_sentence_transformer(model_name, backend)
+
+
+def _encode_shard(batches: List[List[str]], normalize: bool) -> List[np.ndarray]:
+    """Encode a shard of pre-formed batches inside a pool worker."""
+    return [
+        _WORKER_MODEL.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            normalize_embeddings=normalize,
+            show_progress_bar=False
+        ).astype(np.float32, copy=False)
+        for texts in batches
+    ]
+
+
+class BatchEmbeddingEngine(Embeddings):
+    """
+    CPU embedding engine built on sentence-transformers
+
+    How it works:
+    1. Measures the token length of every text
+    2. Sorts by length and forms batches under a padded-token budget
+    3. Encodes batches in-process or shards them across a process pool
+    4. Scatters results back into one contiguous float32 array
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_CONFIG["model_name"],
+        max_tokens_per_batch: int = EMBEDDING_CONFIG["max_tokens_per_batch"],
+        max_batch_size: int = EMBEDDING_CONFIG["max_batch_size"],
+        num_threads: int = EMBEDDING_CONFIG["num_threads"],
+        num_workers: int = EMBEDDING_CONFIG["num_workers"],
+        min_texts_per_worker: int = EMBEDDING_CONFIG["min_texts_per_worker"],
+        normalize: bool = True,
+        backend: str = INFERENCE_BACKEND["embedding"]
+    ):
+        """
+        Initialize embedding engine
+
+        Args:
+            model_name: SentenceTransformer model name
+            max_tokens_per_batch: Padded token budget per forward pass
+            max_batch_size: Maximum texts per forward pass
+            num_threads: Torch intra-op threads (0 = torch default)
+            num_workers: Process pool size for large jobs (0 = in-process)
+            min_texts_per_worker: Smallest job share worth sending to the pool
+            normalize: L2-normalize embeddings (for cosine similarity)
+            backend: Inference backend ("torch", "int8" or "onnx")
+        """
+        self.model_name = model_name
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.max_batch_size = max_batch_size
+        self.num_threads = num_threads
+        self.num_workers = num_workers
+        self.min_texts_per_worker = min_texts_per_worker
+        self.normalize = normalize
+        self.backend = backend
+
+        self._model = None
+        self._pool = None
+
+    # -------------------- Model / Pool Lifecycle --------------------
+
+    @property
+    def model(self):
+        """Underlying SentenceTransformer (loaded on first use)."""
+        if self._model is None:
+            _set_torch_threads(self.num_threads)
+            self._model = load_sentence_transformer(self.model_name, self.backend)
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        """Embedding dimension."""
+        return self.model.get_sentence_embedding_dimension()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawn avoids inheriting an initialized torch thread pool
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, self.backend, self.num_threads or 1)
+            )
+            logger.info(f"✅ Embedding pool started ({self.num_workers} workers)")
+        return self._pool
+
+    def close(self):
+        """Shut down the process pool, if any."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __getstate__(self):
+        # Weights are reloaded by name; pickled indexes stay small
+        state = self.__dict__.copy()
+        state["_model"] = None
+        state["_pool"] = None
+        return state
+
+    # -------------------- Encoding --------------------
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        """
+        Token length of each text, truncated to the model's max sequence length
+
+        Args:
+            texts: Input texts
+
+        Returns:
+            List of token counts
+        """
+        encoded = self.model.tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=self.model.max_seq_length,
+            return_attention_mask=False,
+            return_token_type_ids=False
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts
+
+        Args:
+            texts: Input texts
+
+        Returns:
+            Contiguous float32 array of shape (len(texts), dim), in input order
+        """
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        batches = make_token_budget_batches(
+            self.token_lengths(texts),
+            self.max_tokens_per_batch,
+            self.max_batch_size
+        )
+        output = np.empty((len(texts), self.dimension), dtype=np.float32)
+
+        if self.num_workers > 1 and len(texts) >= self.min_texts_per_worker * 2:
+            self._encode_pooled(texts, batches, output)
+        else:
+            for batch in batches:
+                output[batch] = self.model.encode(
+                    [texts[i] for i in batch],
+                    batch_size=len(batch),
+                    convert_to_numpy=True,
+                    normalize_embeddings=self.normalize,
+                    show_progress_bar=False
+                )
+
+        logger.debug(f"Embedded {len(texts)} texts in {len(batches)} batches")
+
+        return output
+
+    def _encode_pooled(self, texts: List[str], batches: List[List[int]], output: np.ndarray):
+        """Deal batches round-robin to workers so each gets a mix of lengths."""
+        n_shards = min(self.num_workers, max(1, len(texts) // self.min_texts_per_worker))
+        shards = [batches[i::n_shards] for i in range(n_shards)]
+
+        pool = self._get_pool()
+        futures = [
+            (shard, pool.submit(
+                _encode_shard,
+                [[texts[i] for i in batch] for batch in shard],
+                self.normalize
+            ))
+            for shard in shards
+        ]
+
+        for shard, future in futures:
+            for batch, vectors in zip(shard, future.result()):
+                output[batch] = vectors
+
+    # -------------------- LangChain Embeddings Interface --------------------
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+class MicroBatchedEmbeddings(Embeddings):
+    """
+    Wrapper that batches embed_query calls across concurrent requests
+
+    Document embedding goes straight to the wrapped model; single queries
+    are sent through a shared MicroBatcher so simultaneous requests share
+    one forward pass.
+    """
+
+    def __init__(self, base: Embeddings):
+        """
+        Args:
+            base: Embedding model to wrap
+        """
+        self.base = base
+        self.model_name = getattr(base, "model_name", type(base).__name__)
+        self.backend = getattr(base, "backend", "")
+        self.name = f"embed:{self.model_name}:{self.backend}"
+
+    @property
+    def batcher(self):
+        from utils.micro_batcher import get_micro_batcher
+        return get_micro_batcher(self.name, self.base.embed_documents)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.batcher(text)
+
+    def __reduce__(self):
+        # Pickles as the wrapped model: the batcher belongs to this process, not to a saved index
+        return _unwrapped, (self.base,)
+
+
+def _unwrapped(base: Embeddings) -> Embeddings:
+    return base
+
+
+def with_micro_batching(embedding_model) -> Embeddings:
+    """Wrap an embedding model in MicroBatchedEmbeddings (idempotent)."""
+    if isinstance(embedding_model, MicroBatchedEmbeddings):
+        return embedding_model
+    return MicroBatchedEmbeddings(embedding_model)
+
+
+def get_embedding_engine(**overrides) -> BatchEmbeddingEngine:
+    """
+    Factory function to create the batch embedding engine
+
+    Args:
+        **overrides: Any BatchEmbeddingEngine argument, over EMBEDDING_CONFIG
+
+    Returns:
+        BatchEmbeddingEngine instance
+    """
+    return BatchEmbeddingEngine(**overrides)
+
 
 def get_embedding_model():
     """
-    Using BGE-Large for state-of-the-art retrieval performance.
-    
-    BGE-Small-EN-v1.5:
+    Embedding model used across the pipeline (all-MiniLM-L6-v2).
+
+    all-MiniLM-L6-v2:
     - 384 dimensions (Memory efficient)
     - Good performance on MTEB benchmark
-    - Optimized for retrieval tasks
+    - Served by the length-bucketed BatchEmbeddingEngine
+    """
+    return get_embedding_engine()
+
+
+def get_langchain_embedding_model(batch_size: int = 32):
     """
-    model_name = "sentence-transformers/all-MiniLM-L6-v2"
+    Plain LangChain HuggingFaceEmbeddings with sentence-transformers defaults.
 
-    embeddings = HuggingFaceEmbeddings(
-        model_name=model_name,
+    Kept as the reference point for embedding benchmarks.
+    """
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_CONFIG["model_name"],
         model_kwargs={"device": "cpu"},
         encode_kwargs={
             "normalize_embeddings": True,  # Important for cosine similarity
-            "batch_size": 32  # Process multiple texts at once
+            "batch_size": batch_size
         }
     )
-
-    return embeddings
@@ -0,0 +1,108 @@
+# utils/hash_ring.py
+"""
+Consistent-hash ring for document → worker affinity
+- Each node is placed on the ring at many virtual points (vnodes) so
+  documents spread evenly
+- A document belongs to the first node clockwise from its hash
+- Adding or removing a node only moves the documents of the ring
+  segments it gains or loses (about 1/N of them)
+- get_nodes gives the failover order (next distinct nodes clockwise)
+"""
+
+import bisect
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional
+
+
+def _point(value: str) -> int:
+    """64-bit ring position of a string (stable across processes, unlike hash())."""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Thread-safe consistent-hash ring of node names
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 160):
+        """
+        Args:
+            nodes: Initial node names (e.g. backend URLs)
+            vnodes: Virtual points per node
+        """
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self._nodes: List[str] = []
+        self._lock = threading.Lock()
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        return list(self._nodes)
+
+    def add(self, node: str):
+        """Place a node on the ring (no-op if present)."""
+        with self._lock:
+            if node in self._nodes:
+                return
+            self._nodes.append(node)
+            for i in range(self.vnodes):
+                point = _point(f"{node}#{i}")
+                if point in self._owners:
+                    continue  # 64-bit collision: keep the first owner
+                self._owners[point] = node
+                bisect.insort(self._points, point)
+
+    def remove(self, node: str):
+        """Take a node off the ring; its documents move to their next node."""
+        with self._lock:
+            if node not in self._nodes:
+                return
+            self._nodes.remove(node)
+            self._points = [p for p in self._points if self._owners[p] != node]
+            self._owners = {p: self._owners[p] for p in self._points}
+
+    def get_node(self, key: str) -> Optional[str]:
+        """Node owning a key (None on an empty ring)."""
+        nodes = self.get_nodes(key, 1)
+        return nodes[0] if nodes else None
+
+    def get_nodes(self, key: str, count: Optional[int] = None) -> List[str]:
+        """
+        Distinct nodes clockwise from a key: the owner first, then failover order
+
+        Args:
+            key: Document id
+            count: Nodes to return (default all)
+        """
+        with self._lock:
+            if not self._points:
+                return []
+            count = len(self._nodes) if count is None else min(count, len(self._nodes))
+            start = bisect.bisect(self._points, _point(key))
+            found: List[str] = []
+            for offset in range(len(self._points)):
+                node = self._owners[self._points[(start + offset) % len(self._points)]]
+                if node not in found:
+                    found.append(node)
+                    if len(found) == count:
+                        break
+            return found
+
+    def get_stats(self, keys: Iterable[str]) -> Dict[str, int]:
+        """Keys owned per node (balance check)."""
+        counts = {node: 0 for node in self.nodes}
+        for key in keys:
+            node = self.get_node(key)
+            if node is not None:
+                counts[node] += 1
+        return counts
+
+
+def document_key(name: str) -> str:
+    """Routing key of a PDF: its secured file name, as the apps store uploads."""
+    from werkzeug.utils import secure_filename
+    return secure_filename(name.replace("\\", "/").rsplit("/", 1)[-1])
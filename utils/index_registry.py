@@ -0,0 +1,122 @@
+# utils/index_registry.py
+"""
+In-process registry of loaded indexes
+- Keeps (vector_store, multi_level_retriever, raptor_tree) per pickle file
+- LRU bounded; entries are dropped when the pickle on disk changes
+- Filled in the gunicorn master when preloading, so workers share the pages
+- Dropped entries retire retrievers that hold processes (the shard tier)
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from config.server_config import SERVER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _retire(indexes: tuple, replacement: Optional[tuple] = None):
+    """Let a dropped entry's retriever release what it holds, unless the new entry reuses it."""
+    retriever = indexes[1]
+    if replacement is not None and replacement[1] is retriever:
+        return
+    retire = getattr(retriever, "retire", None)
+    if retire is not None:
+        retire()
+
+
+class IndexRegistry:
+    """
+    Thread-safe LRU of loaded indexes keyed by pickle path
+
+    An entry is only served while the pickle's mtime matches the one it was
+    loaded from, so a re-upload handled by another worker is picked up.
+    """
+
+    def __init__(self, max_entries: int = SERVER_CONFIG["index_registry_size"]):
+        """
+        Args:
+            max_entries: Indexes kept in memory (0 disables the registry)
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[float], tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, pickle_path: str) -> Optional[tuple]:
+        """Loaded (vector_store, multi_level_retriever, raptor_tree), or None."""
+        key = os.path.abspath(pickle_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != _mtime(key):
+                if entry is not None:
+                    del self._entries[key]
+                    _retire(entry[1])
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, pickle_path: str) -> Optional[tuple]:
+        """Registered indexes without touching LRU order, stats or the file (hot path)."""
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(pickle_path))
+            return entry[1] if entry is not None else None
+
+    def put(self, pickle_path: str, indexes: tuple):
+        """Register loaded indexes for a pickle path."""
+        if self.max_entries <= 0:
+            return
+        key = os.path.abspath(pickle_path)
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                _retire(previous[1], indexes)
+            self._entries[key] = (_mtime(key), indexes)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, (_, dropped) = self._entries.popitem(last=False)
+                _retire(dropped)
+                logger.info(f"🗑️ Index registry evicted {os.path.basename(evicted)}")
+
+    def evict(self, pickle_path: str):
+        """Drop one entry (e.g. before re-indexing an uploaded file)."""
+        with self._lock:
+            entry = self._entries.pop(os.path.abspath(pickle_path), None)
+            if entry is not None:
+                _retire(entry[1])
+
+    def clear(self):
+        with self._lock:
+            for _, indexes in self._entries.values():
+                _retire(indexes)
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_registry = IndexRegistry()
+
+
+def get_index_registry() -> IndexRegistry:
+    """Process-wide index registry."""
+    return _registry
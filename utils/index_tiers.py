@@ -0,0 +1,255 @@
+# utils/index_tiers.py
+"""
+Readiness of each retrieval tier of an index (progressive indexing)
+- faiss: flat/quantized chunk vectors, served as soon as embeddings finish
+- multi_level: BM25 + reranker, built in the background
+- raptor: RAPTOR tree, built in the background after multi_level
+- States are persisted in the index pickle, so workers that load it see
+  what the building worker had finished at the time
+- The process upgrading an index holds a lease file next to the pickle;
+  a pickle with unfinished tiers and a dead lease holder is resumed by
+  whichever process loads it next
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+TIERS = ("faiss", "multi_level", "raptor")
+
+DISABLED = "disabled"  # Not requested for this index
+PENDING = "pending"  # Queued behind another tier
+BUILDING = "building"
+READY = "ready"
+FAILED = "failed"
+
+
+UNFINISHED = (PENDING, BUILDING)
+
+
+def initial_tiers(use_multi_level: bool, use_raptor: bool) -> Dict[str, str]:
+    """Tier states right after the FAISS tier is built."""
+    return {
+        "faiss": READY,
+        "multi_level": PENDING if use_multi_level else DISABLED,
+        "raptor": PENDING if use_raptor else DISABLED,
+    }
+
+
+def tiers_of(multi_level_retriever, raptor_tree) -> Dict[str, str]:
+    """Tier states of a fully built index (pickles written before progressive indexing)."""
+    return {
+        "faiss": READY,
+        "multi_level": READY if multi_level_retriever is not None else DISABLED,
+        "raptor": READY if raptor_tree is not None else DISABLED,
+    }
+
+
+def unfinished_tiers(tiers: Dict[str, str]) -> List[str]:
+    """Background tiers of an index that were never finished."""
+    return [tier for tier in TIERS if tiers.get(tier) in UNFINISHED]
+
+
+# -------------------- Upgrade lease --------------------
+
+def _lease_file(index_file: str) -> str:
+    return f"{index_file}.upgrading"
+
+
+def _new_token() -> str:
+    # Unique per claim: a re-upload in the same process must not be released by the old upgrade
+    return f"{socket.gethostname()} {os.getpid()} {uuid.uuid4().hex[:12]}"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _lease_alive(path: str, stale_after: float) -> bool:
+    """
+    Whether a lease's holder may still be upgrading
+
+    Same host: the holder's pid is alive. Other host (shared index dir):
+    the lease was taken less than stale_after seconds ago.
+    """
+    try:
+        with open(path) as f:
+            host, pid, _ = f.read().split()
+        age = time.time() - os.path.getmtime(path)
+    except (OSError, ValueError):
+        return False
+    if host == socket.gethostname():
+        return _pid_alive(int(pid))
+    return age < stale_after
+
+
+def claim_upgrade(index_file: str, stale_after: float, force: bool = False) -> Optional[str]:
+    """
+    Take the upgrade lease of an index file
+
+    Args:
+        index_file: Index pickle path
+        stale_after: Seconds after which another host's lease is considered dead
+        force: Take it unconditionally (a fresh build supersedes any upgrade)
+
+    Returns:
+        Lease token (pass to release_upgrade), or None if another process holds it
+    """
+    path = _lease_file(index_file)
+    token = _new_token()
+    if force:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(token)
+        os.replace(tmp, path)
+        return token
+    if _lease_alive(path, stale_after):
+        return None
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    try:
+        # O_EXCL: of several processes finding the same dead lease, one wins
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except OSError:
+        return None
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    return token
+
+
+def release_upgrade(index_file: str, token: str):
+    """Drop the upgrade lease if it is still the one claimed with token."""
+    path = _lease_file(index_file)
+    try:
+        with open(path) as f:
+            if f.read() != token:
+                return
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def renew_upgrade(index_file: str, token: str):
+    """Refresh the lease's age (seen by other hosts) if it is still ours."""
+    path = _lease_file(index_file)
+    try:
+        with open(path) as f:
+            if f.read() == token:
+                os.utime(path)
+    except OSError:
+        pass
+
+
+def upgrade_in_progress(index_file: str, stale_after: float) -> bool:
+    """Whether some process (this or another) holds a live upgrade lease."""
+    return _lease_alive(_lease_file(index_file), stale_after)
+
+
+class IndexTierTracker:
+    """
+    Thread-safe tier states per index file
+
+    Each build gets a generation number; an upgrade checks it before
+    publishing so a re-upload of the same PDF is never overwritten by the
+    background job of the previous build.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers: Dict[str, Dict[str, str]] = {}
+        self._errors: Dict[str, Dict[str, str]] = {}
+        self._updated: Dict[str, float] = {}
+        self._generations: Dict[str, int] = {}
+        self._upgrading: Dict[str, int] = {}  # Index file -> generation being upgraded here
+        self._next_generation = 0
+
+    def start(self, index_file: str, tiers: Dict[str, str]) -> int:
+        """Record a new build of an index; returns its generation."""
+        with self._lock:
+            self._next_generation += 1
+            generation = self._next_generation
+            self._generations[index_file] = generation
+            self._tiers[index_file] = dict(tiers)
+            self._errors[index_file] = {}
+            self._updated[index_file] = time.time()
+            if any(state in (PENDING, BUILDING) for state in tiers.values()):
+                self._upgrading[index_file] = generation
+            else:
+                self._upgrading.pop(index_file, None)
+            return generation
+
+    def load(self, index_file: str, tiers: Dict[str, str]):
+        """Adopt the states stored in a loaded pickle (unless this process is upgrading it)."""
+        with self._lock:
+            if index_file in self._upgrading:
+                return
+            self._tiers[index_file] = dict(tiers)
+            self._updated[index_file] = time.time()
+
+    def is_current(self, index_file: str, generation: int) -> bool:
+        with self._lock:
+            return self._generations.get(index_file) == generation
+
+    def set(self, index_file: str, generation: int, tier: str, state: str, error: Optional[str] = None) -> bool:
+        """Update one tier of a build; False if the build was superseded."""
+        with self._lock:
+            if self._generations.get(index_file) != generation:
+                return False
+            self._tiers[index_file][tier] = state
+            if error:
+                self._errors[index_file][tier] = error
+            self._updated[index_file] = time.time()
+            return True
+
+    def finish(self, index_file: str, generation: int):
+        """Mark a build's background upgrade as done."""
+        with self._lock:
+            if self._upgrading.get(index_file) == generation:
+                del self._upgrading[index_file]
+
+    def forget(self, index_file: str):
+        """Drop an index (evicted or re-uploaded); its running upgrade stops publishing."""
+        with self._lock:
+            self._generations.pop(index_file, None)
+            self._tiers.pop(index_file, None)
+            self._errors.pop(index_file, None)
+            self._updated.pop(index_file, None)
+            self._upgrading.pop(index_file, None)
+
+    def tiers(self, index_file: str) -> Optional[Dict[str, str]]:
+        """Copy of an index's tier states, or None if unknown."""
+        with self._lock:
+            tiers = self._tiers.get(index_file)
+            return dict(tiers) if tiers is not None else None
+
+    def get_status(self, index_file: str) -> Optional[dict]:
+        with self._lock:
+            tiers = self._tiers.get(index_file)
+            if tiers is None:
+                return None
+            return {
+                "tiers": dict(tiers),
+                "errors": dict(self._errors.get(index_file, {})),
+                "upgrading": index_file in self._upgrading,
+                "updated_at": self._updated.get(index_file),
+            }
+
+
+_tracker = IndexTierTracker()
+
+
+def get_tier_tracker() -> IndexTierTracker:
+    """Process-wide tier tracker."""
+    return _tracker
@@ -0,0 +1,155 @@
+# utils/inference_backend.py
+"""
+CPU inference backends for the pipeline's transformer models
+- torch: fp32 PyTorch (default)
+- int8: dynamic int8 quantization of nn.Linear layers
+- onnx: ONNX Runtime (needs sentence-transformers[onnx] / optimum[onnxruntime])
+
+Any backend that fails to load falls back to fp32 torch with a warning;
+loaded_backend tells which one a model actually runs on.
+"""
+
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_BACKENDS = ("torch", "int8", "onnx")
+
+# Loaded models keyed by (kind, model_name, backend), shared across the process
+_LOADED_MODELS = {}
+# Backend each entry of _LOADED_MODELS actually runs on (differs after a fallback)
+_ACTUAL_BACKENDS = {}
+# Serializes loads so concurrent first requests share one copy (re-entered by the torch fallback)
+_LOAD_LOCK = threading.RLock()
+
+
+def _check_backend(backend: str) -> str:
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {SUPPORTED_BACKENDS}")
+    return backend
+
+
+def quantize_int8(module):
+    """
+    Apply dynamic int8 quantization to every nn.Linear in a module
+
+    Args:
+        module: torch.nn.Module (fp32)
+
+    Returns:
+        Quantized module
+    """
+    import torch
+    return torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _cached(kind: str, model_name: str, backend: str, loader):
+    key = (kind, model_name, _check_backend(backend))
+    model = _LOADED_MODELS.get(key)
+    if model is not None:
+        return model
+    with _LOAD_LOCK:
+        if key not in _LOADED_MODELS:
+            try:
+                _LOADED_MODELS[key] = loader(backend)
+                _ACTUAL_BACKENDS[key] = backend
+                logger.info(f"✅ Loaded {model_name} ({backend})")
+            except Exception as e:
+                if backend == "torch":
+                    raise
+                logger.warning(f"⚠️ {backend} backend unavailable for {model_name}: {e}. Using fp32 torch.")
+                _LOADED_MODELS[key] = _cached(kind, model_name, "torch", loader)
+                _ACTUAL_BACKENDS[key] = "torch"
+        return _LOADED_MODELS[key]
+
+
+def loaded_backend(model_name: str, backend: str) -> Optional[str]:
+    """
+    Backend a model requested with `backend` actually runs on
+
+    Args:
+        model_name: HuggingFace model name
+        backend: Backend it was requested with
+
+    Returns:
+        The requested backend, "torch" if loading it fell back, or None if
+        the model has not been loaded with that backend
+    """
+    for (_, name, requested), actual in _ACTUAL_BACKENDS.items():
+        if name == model_name and requested == backend:
+            return actual
+    return None
+
+
+def load_sentence_transformer(model_name: str, backend: str = "torch"):
+    """
+    Load a SentenceTransformer bi-encoder on CPU
+
+    Args:
+        model_name: HuggingFace model name
+        backend: Inference backend
+
+    Returns:
+        SentenceTransformer instance
+    """
+    def loader(backend):
+        from sentence_transformers import SentenceTransformer
+        if backend == "onnx":
+            return SentenceTransformer(model_name, device="cpu", backend="onnx")
+        model = SentenceTransformer(model_name, device="cpu")
+        if backend == "int8":
+            model = quantize_int8(model)
+        return model
+
+    return _cached("bi-encoder", model_name, backend, loader)
+
+
+def load_cross_encoder(model_name: str, backend: str = "torch"):
+    """
+    Load a sentence-transformers CrossEncoder on CPU
+
+    Args:
+        model_name: HuggingFace model name
+        backend: Inference backend
+
+    Returns:
+        CrossEncoder instance
+    """
+    def loader(backend):
+        from sentence_transformers import CrossEncoder
+        if backend == "onnx":
+            return CrossEncoder(model_name, device="cpu", backend="onnx")
+        model = CrossEncoder(model_name, device="cpu")
+        if backend == "int8":
+            model.model = quantize_int8(model.model)
+        return model
+
+    return _cached("cross-encoder", model_name, backend, loader)
+
+
+def load_seq2seq(model_name: str, backend: str = "torch"):
+    """
+    Load a seq2seq generation model and its tokenizer
+
+    Args:
+        model_name: HuggingFace model name
+        backend: Inference backend
+
+    Returns:
+        (model, tokenizer) tuple
+    """
+    def loader(backend):
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if backend == "onnx":
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            return ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True), tokenizer
+        from transformers import AutoModelForSeq2SeqLM
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+        if backend == "int8":
+            model = quantize_int8(model)
+        return model, tokenizer
+
+    return _cached("seq2seq", model_name, backend, loader)
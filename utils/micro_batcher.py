@@ -0,0 +1,214 @@
+# utils/micro_batcher.py
+"""
+Cross-request micro-batching
+- Collects items submitted by concurrent requests for up to max_wait_ms
+- Runs them as one batched call (one forward pass)
+- Fans results back out to each caller through a Future
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from config.server_config import MICRO_BATCH_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Background thread that batches work from many callers
+
+    How it works:
+    1. Callers submit() an item and get a Future
+    2. The worker takes the first queued item and keeps collecting until
+       max_batch_size is reached or max_wait_ms has passed
+    3. batch_fn(items) runs once and must return one result per item
+    4. Each Future receives its own result (or the batch's exception,
+       including a result count that does not match the batch)
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        size_fn: Callable[[Any], int] = None,
+        name: str = "batcher"
+    ):
+        """
+        Initialize micro-batcher
+
+        Args:
+            batch_fn: Function mapping a list of items to a list of results
+            max_batch_size: Maximum batch size in size_fn units (default: MICRO_BATCH_CONFIG)
+            max_wait_ms: Maximum time to wait for more items (default: MICRO_BATCH_CONFIG)
+            size_fn: Size of one item (default: 1 per item)
+            name: Name used in logs and stats
+        """
+        if max_batch_size is None:
+            max_batch_size = MICRO_BATCH_CONFIG["max_batch_size"]
+        if max_wait_ms is None:
+            max_wait_ms = MICRO_BATCH_CONFIG["max_wait_ms"]
+
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.size_fn = size_fn or (lambda item: 1)
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._started_at = time.perf_counter()
+        self._items = 0
+        self._batches = 0
+        self._wait_times = deque(maxlen=2048)
+        self._batch_times = deque(maxlen=2048)
+        self._batch_sizes = deque(maxlen=2048)
+
+        self._thread = threading.Thread(target=self._run, name=f"micro-batcher-{name}", daemon=True)
+        self._thread.start()
+
+        logger.info(f"✅ Micro-batcher '{name}' started (max_batch={max_batch_size}, max_wait={max_wait_ms}ms)")
+
+    def submit(self, item: Any) -> Future:
+        """Queue one item; the returned Future resolves to its result."""
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item: Any) -> Any:
+        """Submit one item and block until its result is ready."""
+        return self.submit(item).result()
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        size = self.size_fn(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(entry)
+            size += self.size_fn(entry[0])
+
+        return batch
+
+    @staticmethod
+    def _settle(future: Future, result: Any = None, error: Optional[BaseException] = None):
+        # A future that is already done (e.g. cancelled) must not kill the worker thread
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _, _ in batch]
+            started = time.perf_counter()
+
+            try:
+                results = list(self.batch_fn(items))
+                if len(results) != len(batch):
+                    raise ValueError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                logger.error(f"Micro-batch '{self.name}' failed: {e}")
+                for _, future, _ in batch:
+                    self._settle(future, error=e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    self._settle(future, result)
+
+            finished = time.perf_counter()
+            with self._lock:
+                self._items += len(batch)
+                self._batches += 1
+                self._batch_sizes.append(len(batch))
+                self._batch_times.append(finished - started)
+                self._wait_times.extend(started - submitted for _, _, submitted in batch)
+
+    def get_stats(self) -> Dict:
+        """
+        Throughput and latency metrics
+
+        Returns:
+            Dict with counts, mean batch size, items/sec and p50/p95 timings (ms)
+        """
+        with self._lock:
+            waits = np.array(self._wait_times) * 1000
+            runs = np.array(self._batch_times) * 1000
+            sizes = list(self._batch_sizes)
+            items, batches = self._items, self._batches
+
+        elapsed = time.perf_counter() - self._started_at
+        return {
+            "name": self.name,
+            "items": items,
+            "batches": batches,
+            "mean_batch_size": float(np.mean(sizes)) if sizes else 0.0,
+            "items_per_sec": items / elapsed if elapsed > 0 else 0.0,
+            "queue_wait_ms_p50": float(np.percentile(waits, 50)) if len(waits) else 0.0,
+            "queue_wait_ms_p95": float(np.percentile(waits, 95)) if len(waits) else 0.0,
+            "batch_ms_p50": float(np.percentile(runs, 50)) if len(runs) else 0.0,
+            "batch_ms_p95": float(np.percentile(runs, 95)) if len(runs) else 0.0,
+        }
+
+
+# -------------------- Shared Batchers --------------------
+
+_BATCHERS: Dict[str, MicroBatcher] = {}
+_BATCHERS_LOCK = threading.Lock()
+
+
+def get_micro_batcher(name: str, batch_fn: Callable[[List[Any]], List[Any]], **kwargs) -> MicroBatcher:
+    """
+    Get (or start) the process-wide batcher for a name
+
+    Requests that share a model must share its batcher, so the first caller's
+    batch_fn is kept for the lifetime of the process.
+
+    Args:
+        name: Batcher key, e.g. "embed:<model>:<backend>"
+        batch_fn: Batch function used if the batcher does not exist yet
+        **kwargs: MicroBatcher arguments
+
+    Returns:
+        MicroBatcher instance
+    """
+    with _BATCHERS_LOCK:
+        if name not in _BATCHERS:
+            _BATCHERS[name] = MicroBatcher(batch_fn, name=name, **kwargs)
+        return _BATCHERS[name]
+
+
+def get_all_batcher_stats() -> List[Dict]:
+    """Stats for every running batcher."""
+    with _BATCHERS_LOCK:
+        batchers = list(_BATCHERS.values())
+    return [batcher.get_stats() for batcher in batchers]
+
+
+def reset_micro_batchers():
+    """
+    Forget every batcher without stopping it
+
+    For use in a forked child: the parent's batcher threads do not exist
+    there, so new batchers are started on first use.
+    """
+    global _BATCHERS_LOCK
+    _BATCHERS_LOCK = threading.Lock()
+    _BATCHERS.clear()
@@ -0,0 +1,111 @@
+# utils/preload.py
+"""
+Model and index preloading for pre-fork servers
+- Loads the embedder, cross-encoder (and optionally FLAN-T5) and hot
+  indexes once in the gunicorn master
+- Freezes the GC so collections in workers do not touch the shared pages
+- Resets thread pools and per-process state in each forked worker
+"""
+
+import gc
+import logging
+import os
+import sys
+from typing import Iterable
+
+from config.model_config import EMBEDDING_CONFIG, INFERENCE_BACKEND
+from config.server_config import PRELOAD_CONFIG
+
+logger = logging.getLogger(__name__)
+
+RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+SUMMARIZER_MODEL = "google/flan-t5-base"
+
+
+def preload_models(summarizer: bool = PRELOAD_CONFIG["summarizer"]):
+    """
+    Load the shared models into the process-wide model cache
+
+    Args:
+        summarizer: Also load FLAN-T5 (only needed for RAPTOR builds)
+    """
+    from utils.inference_backend import load_cross_encoder, load_sentence_transformer, load_seq2seq
+
+    load_sentence_transformer(EMBEDDING_CONFIG["model_name"], INFERENCE_BACKEND["embedding"])
+    load_cross_encoder(RERANKER_MODEL, INFERENCE_BACKEND["reranker"])
+    if summarizer:
+        load_seq2seq(SUMMARIZER_MODEL, INFERENCE_BACKEND["summarizer"])
+
+
+def preload_indexes(pdf_paths: Iterable[str] = PRELOAD_CONFIG["indexes"]):
+    """Load cached indexes into the index registry (never builds new ones)."""
+    from rag_pipeline import create_vectorstore_from_pdf, index_file_path
+
+    for pdf_path in pdf_paths:
+        pdf_path = pdf_path.strip()
+        if not os.path.exists(index_file_path(pdf_path)):
+            logger.warning(f"⚠️ No cached index for {pdf_path}, skipping preload")
+            continue
+        create_vectorstore_from_pdf(pdf_path)
+        logger.info(f"✅ Preloaded index for {os.path.basename(pdf_path)}")
+
+
+def warm_up(
+    models: bool = PRELOAD_CONFIG["models"],
+    indexes: Iterable[str] = PRELOAD_CONFIG["indexes"],
+    before_fork: bool = True
+):
+    """
+    Preload models and indexes
+
+    Args:
+        models: Load the shared models
+        indexes: PDF paths whose cached indexes to load
+        before_fork: Running in the master; torch is limited to one thread
+            so no intra-op thread pool exists at fork time (OpenMP pools do
+            not survive fork). Workers pick their own count in after_fork.
+    """
+    if models:
+        try:
+            if before_fork:
+                from utils.embedding import _set_torch_threads
+                _set_torch_threads(1)
+            preload_models()
+        except Exception as e:
+            logger.warning(f"⚠️ Model preload failed, workers will load models on first use: {e}")
+    preload_indexes(indexes)
+
+    # Objects loaded so far live for the whole process; moving them to the
+    # permanent generation keeps GC passes in workers from dirtying them
+    gc.collect()
+    gc.freeze()
+    logger.info(f"✅ Preload complete ({gc.get_freeze_count()} objects frozen)")
+
+
+def worker_threads(workers: int) -> int:
+    """torch intra-op threads per worker: configured, else CPUs / workers."""
+    configured = PRELOAD_CONFIG["torch_threads_per_worker"]
+    if configured > 0:
+        return configured
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def after_fork(threads: int):
+    """
+    Reset per-process state in a freshly forked worker
+
+    Args:
+        threads: torch intra-op threads for this worker
+    """
+    from utils.micro_batcher import reset_micro_batchers
+    import rag_pipeline
+
+    if "torch" in sys.modules:
+        from utils.embedding import _set_torch_threads
+        _set_torch_threads(threads)
+    else:
+        # torch reads this when it is first imported
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+    reset_micro_batchers()
+    rag_pipeline.reset_cpu_executor()
+    rag_pipeline.reset_upgrade_executor()
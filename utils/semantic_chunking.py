@@ -8,9 +8,6 @@ LlamaIndex Semantic Chunking
 
 import logging
 from typing import List
-from llama_index.core.node_parser import SemanticSplitterNodeParser
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.core import Document as LlamaDocument
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +38,11 @@ def semantic_chunk_text(
     """
     
     try:
+        # LlamaIndex is only needed for semantic chunking
+        from llama_index.core.node_parser import SemanticSplitterNodeParser
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+        from llama_index.core import Document as LlamaDocument
+
         # Initialize embedding model
         embed_model = HuggingFaceEmbedding(
             model_name=embed_model_name,
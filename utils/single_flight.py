@@ -0,0 +1,337 @@
+# utils/single_flight.py
+"""
+Single-flight request coalescing
+- Concurrent calls with the same key run the work once; the others wait
+  and receive the leader's result (or its exception)
+- In-process for threads (do) and for asyncio tasks (do_async)
+- Optionally across workers: the leader holds a Redis lock (renewed while
+  it runs), and leaders in other workers wait for it and then read the
+  shared result (recheck)
+- Every wait is bounded; after wait_timeout a follower does the work itself
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if we still own it (it may have expired and been re-taken)
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Extend the lock only if we still own it
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class _Call:
+    """One in-flight execution that followers wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent identical work by key
+
+    How it works:
+    1. The first caller for a key becomes the leader; later callers wait
+    2. With a Redis client, the leader also takes lock sf:<name>:<key>
+       (SET NX PX). If another worker holds it, the leader waits for it
+       to be released and returns recheck() (e.g. a cache lookup)
+    3. The lock has a short TTL (lock_ttl) that the leader renews while
+       its work runs, so a slow leader keeps it and a crashed leader holds
+       up other workers for at most lock_ttl
+    """
+
+    def __init__(
+        self,
+        name: str,
+        wait_timeout: float = 90.0,
+        redis_client_factory: Optional[Callable[[], Any]] = None,
+        poll_interval: float = 0.2,
+        lock_ttl: float = 30.0
+    ):
+        """
+        Args:
+            name: Namespace for lock keys and logs
+            wait_timeout: Max seconds a follower waits before running the work itself
+            redis_client_factory: Returns a Redis client, or None for in-process only
+            poll_interval: Seconds between checks of another worker's lock
+            lock_ttl: Seconds the Redis lock outlives its last renewal (renewed every lock_ttl / 3)
+        """
+        self.name = name
+        self.wait_timeout = wait_timeout
+        self.redis_client_factory = redis_client_factory
+        self.poll_interval = poll_interval
+        self.lock_ttl = lock_ttl
+
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[tuple, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.coalesced = 0
+        self.remote_waits = 0
+        self.timeouts = 0
+
+    # -------------------- Redis lock --------------------
+
+    def _redis(self):
+        if self.redis_client_factory is None:
+            return None
+        try:
+            return self.redis_client_factory()
+        except Exception as e:
+            logger.debug(f"No Redis client for single-flight: {e}")
+            return None
+
+    def _lock_key(self, key: str) -> str:
+        return f"sf:{self.name}:{key}"
+
+    def _acquire(self, client, lock_key: str, token: str) -> Optional[bool]:
+        """True if acquired, False if held elsewhere, None if Redis failed."""
+        try:
+            return bool(client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000)))
+        except Exception as e:
+            logger.warning(f"⚠️ Single-flight lock unavailable, coalescing in-process only: {e}")
+            return None
+
+    def _renew(self, client, lock_key: str, token: str) -> bool:
+        """Extend our lock; False once it is lost (expired and re-taken) or Redis fails."""
+        ttl_ms = int(self.lock_ttl * 1000)
+        try:
+            return bool(client.eval(_RENEW_SCRIPT, 1, lock_key, token, ttl_ms))
+        except Exception:
+            # Servers without scripting: non-atomic check-and-extend
+            try:
+                current = client.get(lock_key)
+                if current is None or (current.decode() if isinstance(current, bytes) else current) != token:
+                    return False
+                return bool(client.pexpire(lock_key, ttl_ms))
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to renew single-flight lock {lock_key}: {e}")
+                return False
+
+    def _keep_alive(self, client, lock_key: str, token: str) -> threading.Event:
+        """Renew the lock in the background until the returned event is set."""
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(self.lock_ttl / 3):
+                if not self._renew(client, lock_key, token):
+                    logger.warning(f"⚠️ {self.name}: lost single-flight lock {lock_key}")
+                    return
+
+        threading.Thread(target=renew, name=f"sf-renew-{self.name}", daemon=True).start()
+        return stop
+
+    def _held(self, client, lock_key: str) -> bool:
+        try:
+            return bool(client.exists(lock_key))
+        except Exception:
+            return False
+
+    def _release(self, client, lock_key: str, token: str):
+        try:
+            client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+        except Exception:
+            # Servers without scripting: non-atomic check-and-delete
+            try:
+                current = client.get(lock_key)
+                if current is not None and (current.decode() if isinstance(current, bytes) else current) == token:
+                    client.delete(lock_key)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to release single-flight lock {lock_key}: {e}")
+
+    def _after_remote(self, fn: Callable, recheck: Optional[Callable]):
+        """Result once another worker's lock is gone (or we gave up waiting)."""
+        if recheck is not None:
+            value = recheck()
+            if value is not None:
+                return value
+        return fn()
+
+    def _lead(self, key: str, fn: Callable, recheck: Optional[Callable]):
+        client = self._redis()
+        if client is None:
+            return fn()
+
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        acquired = self._acquire(client, lock_key, token)
+        if acquired is None:
+            return fn()
+        if acquired:
+            stop_renewing = self._keep_alive(client, lock_key, token)
+            try:
+                return fn()
+            finally:
+                stop_renewing.set()
+                self._release(client, lock_key, token)
+
+        self.remote_waits += 1
+        logger.info(f"⏳ {self.name}: waiting for another worker on {key[:60]}")
+        deadline = time.monotonic() + self.wait_timeout
+        while self._held(client, lock_key):
+            if time.monotonic() >= deadline:
+                self.timeouts += 1
+                logger.warning(f"⚠️ {self.name}: gave up waiting for another worker on {key[:60]}")
+                break
+            time.sleep(self.poll_interval)
+        return self._after_remote(fn, recheck)
+
+    async def _lead_async(self, key: str, coro_fn: Callable, recheck: Optional[Callable]):
+        client = self._redis()
+        if client is None:
+            return await coro_fn()
+
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        acquired = await asyncio.to_thread(self._acquire, client, lock_key, token)
+        if acquired is None:
+            return await coro_fn()
+        if acquired:
+            stop_renewing = self._keep_alive(client, lock_key, token)
+            try:
+                return await coro_fn()
+            finally:
+                stop_renewing.set()
+                await asyncio.to_thread(self._release, client, lock_key, token)
+
+        self.remote_waits += 1
+        logger.info(f"⏳ {self.name}: waiting for another worker on {key[:60]}")
+        deadline = time.monotonic() + self.wait_timeout
+        while await asyncio.to_thread(self._held, client, lock_key):
+            if time.monotonic() >= deadline:
+                self.timeouts += 1
+                logger.warning(f"⚠️ {self.name}: gave up waiting for another worker on {key[:60]}")
+                break
+            await asyncio.sleep(self.poll_interval)
+        if recheck is not None:
+            value = await asyncio.to_thread(recheck)
+            if value is not None:
+                return value
+        return await coro_fn()
+
+    # -------------------- Public API --------------------
+
+    def do(self, key: str, fn: Callable[[], Any], recheck: Optional[Callable[[], Any]] = None):
+        """
+        Run fn once for all concurrent callers with the same key
+
+        Args:
+            key: Deduplication key (e.g. the cache key of the result)
+            fn: Work to run; called without arguments
+            recheck: Reads the result another worker produced (None = not there)
+
+        Returns:
+            fn's result (shared with every caller that waited on it)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if call.event.wait(self.wait_timeout):
+                return call.result()
+            self.timeouts += 1
+            logger.warning(f"⚠️ {self.name}: leader still running after {self.wait_timeout:g}s, running {key[:60]} here")
+            return fn()
+
+        try:
+            call.value = self._lead(key, fn, recheck)
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.event.set()
+
+    async def do_async(self, key: str, coro_fn: Callable[[], Any], recheck: Optional[Callable[[], Any]] = None):
+        """
+        Awaitable counterpart of do for tasks on one event loop
+
+        Args:
+            key: Deduplication key
+            coro_fn: Returns the coroutine to run
+            recheck: Blocking read of a result another worker produced (run in a thread)
+
+        Returns:
+            The coroutine's result (shared with every task that waited on it)
+        """
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        future = self._async_calls.get(slot)
+
+        if future is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.wait_timeout)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader was cancelled, not us
+                return await coro_fn()
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                logger.warning(f"⚠️ {self.name}: leader still running after {self.wait_timeout:g}s, running {key[:60]} here")
+                return await coro_fn()
+
+        future = self._async_calls[slot] = loop.create_future()
+        self.leaders += 1
+        try:
+            value = await self._lead_async(key, coro_fn, recheck)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved; the leader re-raises it
+            raise
+        finally:
+            if self._async_calls.get(slot) is future:
+                del self._async_calls[slot]
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._async_calls)
+
+    def get_stats(self) -> dict:
+        return {
+            "name": self.name,
+            "in_flight": self.in_flight(),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "remote_waits": self.remote_waits,
+            "timeouts": self.timeouts
+        }
@@ -0,0 +1,180 @@
+# utils/tracing.py
+"""
+Lightweight per-stage latency tracing
+- span("stage") context managers around pipeline stages
+- In-memory histograms exported in Prometheus text format
+- Optional per-request timing breakdown
+
+When tracing is disabled and no request trace is active, span() returns a
+shared no-op object, so instrumented code pays one attribute check and
+one ContextVar lookup per stage.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence
+
+from config.server_config import TRACING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Timing breakdown of the request being served (stage → milliseconds)
+_current_trace: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "rag_current_trace", default=None
+)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "trace", "start")
+
+    def __init__(self, tracer, name: str, trace: Optional[Dict[str, float]]):
+        self.tracer = tracer
+        self.name = name
+        self.trace = trace
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if self.tracer.enabled:
+            self.tracer.observe(self.name, elapsed)
+        if self.trace is not None:
+            self.trace[self.name] = self.trace.get(self.name, 0.0) + elapsed * 1000
+        return False
+
+
+class Tracer:
+    """
+    Collects stage durations into per-stage histograms
+
+    How it works:
+    1. span(name) times a block of code
+    2. Durations feed an in-memory histogram per stage (when enabled)
+    3. The active request trace (if any) accumulates milliseconds per stage
+    4. render_prometheus() exports all histograms for /metrics
+    """
+
+    def __init__(self, enabled: bool = TRACING_CONFIG["enabled"], buckets: Sequence[float] = TRACING_CONFIG["buckets"]):
+        """
+        Args:
+            enabled: Record histograms
+            buckets: Histogram bucket upper bounds in seconds
+        """
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str):
+        """Context manager timing one stage."""
+        trace = _current_trace.get()
+        if not self.enabled and trace is None:
+            return _NOOP_SPAN
+        return _Span(self, name, trace)
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render_prometheus(self, metric: str = "rag_stage_duration_seconds") -> str:
+        """
+        Export histograms in the Prometheus text exposition format
+
+        Returns:
+            Metrics text
+        """
+        lines = [
+            f"# HELP {metric} Time spent in each RAG pipeline stage.",
+            f"# TYPE {metric} histogram",
+        ]
+        with self._lock:
+            for name in sorted(self._histograms):
+                histogram = self._histograms[name]
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {histogram.sum:.6f}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+tracer = Tracer()
+
+
+def span(name: str):
+    """Time a stage with the process-wide tracer."""
+    return tracer.span(name)
+
+
+@contextmanager
+def request_trace(enabled: bool = True):
+    """
+    Collect a timing breakdown for the current request
+
+    Args:
+        enabled: When False, yield an empty dict and leave spans untouched
+
+    Yields:
+        Dict filled with stage → milliseconds as spans finish
+    """
+    trace: Dict[str, float] = {}
+    if not enabled:
+        yield trace
+        return
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def render_metrics() -> str:
+    """Prometheus text for the process-wide tracer."""
+    return tracer.render_prometheus()
@@ -0,0 +1,178 @@
+# utils/vector_storage.py
+"""
+Compressed FAISS storage for chunk embeddings
+- int8 scalar quantization (SQ8) or product quantization (PQ)
+- Optional re-scoring of a k * factor shortlist against fp16 or float32 vectors
+- Size reporting in bytes per chunk
+- Batched search of a LangChain FAISS store (one index.search for many queries)
+"""
+
+import logging
+import numpy as np
+from config.index_config import VECTOR_STORAGE
+
+logger = logging.getLogger(__name__)
+
+STORAGE_TYPES = ("flat", "sq8", "pq")
+REFINE_TYPES = ("none", "fp16", "flat")
+
+
+def index_factory_string(
+    storage: str,
+    dim: int,
+    pq_m: int = VECTOR_STORAGE["pq_m"],
+    pq_nbits: int = VECTOR_STORAGE["pq_nbits"],
+    refine: str = VECTOR_STORAGE["refine"]
+) -> str:
+    """
+    Build the faiss.index_factory description for a storage setting
+
+    Args:
+        storage: "flat", "sq8" or "pq"
+        dim: Embedding dimension
+        pq_m: PQ sub-quantizers (must divide dim)
+        pq_nbits: Bits per PQ code
+        refine: Shortlist re-scoring store ("none", "fp16" or "flat")
+
+    Returns:
+        Factory string, e.g. "PQ48x8,Refine(SQfp16)"
+    """
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown vector storage '{storage}', expected one of {STORAGE_TYPES}")
+    if refine not in REFINE_TYPES:
+        raise ValueError(f"Unknown refine mode '{refine}', expected one of {REFINE_TYPES}")
+
+    if storage == "flat":
+        return "Flat"
+
+    if storage == "sq8":
+        base = "SQ8"
+    else:
+        if dim % pq_m != 0:
+            raise ValueError(f"pq_m={pq_m} must divide embedding dimension {dim}")
+        base = f"PQ{pq_m}x{pq_nbits}"
+
+    if refine == "fp16":
+        return f"{base},Refine(SQfp16)"
+    if refine == "flat":
+        return f"{base},RFlat"
+    return base
+
+
+def build_index(
+    vectors: np.ndarray,
+    storage: str = VECTOR_STORAGE["type"],
+    pq_m: int = VECTOR_STORAGE["pq_m"],
+    pq_nbits: int = VECTOR_STORAGE["pq_nbits"],
+    refine: str = VECTOR_STORAGE["refine"],
+    rescore_factor: int = VECTOR_STORAGE["rescore_factor"],
+    min_train_size: int = VECTOR_STORAGE["min_train_size"]
+):
+    """
+    Train and fill a FAISS index (L2 metric, like LangChain's default)
+
+    Args:
+        vectors: (n, dim) embeddings
+        storage: "flat", "sq8" or "pq"
+        pq_m: PQ sub-quantizers
+        pq_nbits: Bits per PQ code
+        refine: Shortlist re-scoring store
+        rescore_factor: Shortlist size multiplier for re-scoring
+        min_train_size: Minimum vectors needed to train PQ codebooks
+
+    Returns:
+        faiss.Index
+    """
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+
+    if storage == "pq" and n < max(min_train_size, 2 ** pq_nbits):
+        logger.warning(f"⚠️ Only {n} vectors, too few to train PQ codebooks. Using flat storage.")
+        storage = "flat"
+
+    description = index_factory_string(storage, dim, pq_m, pq_nbits, refine)
+    index = faiss.index_factory(dim, description, faiss.METRIC_L2)
+    index.train(vectors)
+    index.add(vectors)
+
+    if "Refine" in description or "RFlat" in description:
+        # Downcast in place: the factory wrapper owns the C++ index, so it
+        # must hand ownership over before it is garbage collected
+        refined = faiss.downcast_index(index)
+        if refined is not index:
+            index.this.disown()
+            refined.this.own(True)
+        index = refined
+        index.k_factor = float(rescore_factor)
+
+    logger.info(f"✅ FAISS index '{description}': {bytes_per_vector(index):.1f} bytes/chunk")
+
+    return index
+
+
+def quantize_vector_store(vector_store, storage: str = VECTOR_STORAGE["type"], **kwargs):
+    """
+    Replace a LangChain FAISS store's flat index with a compressed one (in place)
+
+    Args:
+        vector_store: LangChain FAISS vector store with a flat index
+        storage: "flat", "sq8" or "pq"
+        **kwargs: Extra build_index arguments
+
+    Returns:
+        The same vector store
+    """
+    if storage == "flat" or vector_store.index.ntotal == 0:
+        return vector_store
+
+    vectors = vector_store.index.reconstruct_n(0, vector_store.index.ntotal)
+    vector_store.index = build_index(vectors, storage=storage, **kwargs)
+
+    return vector_store
+
+
+def bytes_per_vector(index) -> float:
+    """Serialized index size divided by the number of stored vectors."""
+    import faiss
+
+    if index.ntotal == 0:
+        return 0.0
+    return faiss.serialize_index(index).nbytes / index.ntotal
+
+
+def search_by_vectors(vector_store, embeddings: np.ndarray, k: int = 4) -> list:
+    """
+    similarity_search_with_score_by_vector for a matrix of query embeddings
+
+    One index.search call scores every query, so FAISS parallelizes over
+    the batch instead of being called once per query.
+
+    Args:
+        vector_store: LangChain FAISS vector store
+        embeddings: (num_queries, dim) query embeddings
+        k: Results per query
+
+    Returns:
+        List of (Document, score) tuples per query, scores as LangChain returns them
+    """
+    import faiss
+
+    vectors = np.array(embeddings, dtype=np.float32, ndmin=2)
+    if len(vectors) == 0:
+        return []
+    if getattr(vector_store, "_normalize_L2", False):
+        faiss.normalize_L2(vectors)
+    scores, indices = vector_store.index.search(vectors, k)
+
+    results = []
+    for row_scores, row_indices in zip(scores, indices):
+        row = []
+        for score, i in zip(row_scores, row_indices):
+            if i == -1:
+                continue  # Fewer than k vectors in the index
+            doc = vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+            row.append((doc, float(score)))
+        results.append(row)
+    return results